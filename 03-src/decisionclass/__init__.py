@@ -0,0 +1,7 @@
+"""
+Help Me Decide: weigh options against the features that matter to you.
+
+Import the modules you need, e.g. ``import decisionclass.decision_functions as hmd``.
+Nothing is imported here, so scoring and loading decisions only load NumPy;
+pandas, matplotlib and matplotlib_venn are loaded the first time they are used.
+"""
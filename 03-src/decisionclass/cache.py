@@ -0,0 +1,246 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from .ratings import PackedNames
+
+#---------------------------------------------------------------------
+def content_hash(ratings, options):
+    """
+    A stable hex digest of a rating matrix and its option names
+
+    The same ratings and names give the same digest in any process, so it can key results saved to disk.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D rating matrix
+
+    options: list or PackedNames
+        option name of every row
+
+    Returns
+    -------
+    digest: str
+        32 hex characters
+    """
+    ratings = np.ascontiguousarray(ratings)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{ratings.dtype.str}{ratings.shape}'.encode('utf-8'))
+    digest.update(ratings.data)
+    names = options if isinstance(options, PackedNames) else PackedNames.from_names(options)
+    digest.update(np.ascontiguousarray(names.offsets, dtype='<u8').data)
+    digest.update(np.ascontiguousarray(names.blob).data)
+    return digest.hexdigest()
+
+
+#---------------------------------------------------------------------
+def result_key(content, kind, weights, rows=None, *extra):
+    """
+    Key of one cached result: the decision content, what was computed, the weight vector
+    and the options it was computed for
+
+    Parameters
+    ----------
+    content: str
+        content_hash of the decision
+
+    kind: str
+        name of the result, e.g. 'scores' or 'ranking'
+
+    weights: ndarray
+        weight of every rating matrix column
+
+    rows: ndarray
+        rows the result covers, None for every row
+
+    extra:
+        any other arguments the result depends on, e.g. k
+
+    Returns
+    -------
+    key: str
+        starts with content, so every result of one decision can be found by prefix
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(weights, dtype='<f8').data)
+    if rows is not None:
+        digest.update(np.ascontiguousarray(rows, dtype='<i8').data)
+    digest.update(repr((rows is None,) + extra).encode('utf-8'))
+    return f'{content}-{kind}-{digest.hexdigest()}'
+
+
+#---------------------------------------------------------------------
+# SCORE CACHE
+#---------------------------------------------------------------------
+class ScoreCache():
+    """
+    Remembers scores and rankings so that repeating a request does not repeat the matrix product
+
+    Entries are tuples of arrays under keys from result_key. The in-memory tier keeps the most
+    recently used entries up to max_entries and max_bytes and evicts the least recently used
+    beyond that. With a directory, every entry is also written there as an .npz file, and a
+    memory miss checks the directory before giving up, so results survive a restart. The directory
+    is kept under max_disk_bytes by deleting the least recently used files.
+    Keys include the content hash, so a changed decision never sees results of its old ratings.
+    Those results stay valid for the old ratings, e.g. after reloading the original file, so an
+    edit only drops them from memory (discard) and leaves the files to the disk limit.
+
+    Parameters
+    ----------
+    max_entries: int
+        most results kept in memory
+
+    max_bytes: int
+        most bytes of arrays kept in memory
+
+    directory: str
+        optional folder for the on-disk tier, created if needed
+
+    max_disk_bytes: int
+        most bytes of .npz files kept in directory
+    """
+    def __init__(self, max_entries=256, max_bytes=2**28, directory=None, max_disk_bytes=2**30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._files())
+        return
+
+    def _files(self):
+        # (last use, size, path) of every result file. Other processes may share the folder, so it is listed afresh.
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.npz') and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _prune_disk(self):
+        # Deletes the least recently used files until the folder is back under max_disk_bytes
+        files = sorted(self._files())
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_bytes -= size
+            self.disk_evictions += 1
+        return
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """
+        The cached result for key, or None
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.directory is not None:
+            # Loaded here rather than at import, like np.load does itself
+            from zipfile import BadZipFile
+            try:
+                with np.load(self._path(key)) as saved:
+                    value = tuple(saved[f'arr_{i}'] for i in range(len(saved.files)))
+            except (OSError, ValueError, KeyError, BadZipFile):
+                # Missing, or damaged by something other than this cache, which only renames whole files in
+                value = None
+            if value is not None:
+                # A file's modification time is its last use, for _prune_disk
+                try:
+                    os.utime(self._path(key))
+                except OSError:
+                    pass
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Stores a result, a tuple of arrays, and returns it. The stored arrays are read-only copies.
+        """
+        value = tuple(np.array(array) for array in value)
+        self._remember(key, value)
+        if self.directory is not None:
+            # Written under a temporary name and renamed, so a reader never sees half a file
+            handle, temporary = tempfile.mkstemp(suffix='.npz', dir=self.directory)
+            try:
+                with os.fdopen(handle, 'wb') as f:
+                    np.savez(f, *value)
+                    size = f.tell()
+                os.replace(temporary, self._path(key))
+                self.disk_bytes += size
+            except OSError:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+        return value
+
+    def _remember(self, key, value):
+        # Results are shared by every caller, so none of them may change one
+        for array in value:
+            array.setflags(write=False)
+        if key in self._entries:
+            self.nbytes -= sum(array.nbytes for array in self._entries.pop(key))
+        size = sum(array.nbytes for array in value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value
+        self.nbytes += size
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in evicted)
+            self.evictions += 1
+        return
+
+    def discard(self, content):
+        """
+        Drops every result of one decision content from memory, making room for the new content's results.
+        Files on disk are kept: they are still right for that content, and max_disk_bytes bounds them.
+        """
+        prefix = content + '-'
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self.nbytes -= sum(array.nbytes for array in self._entries.pop(key))
+        return
+
+    def clear(self):
+        """
+        Empties the in-memory tier and resets the counters. Files on disk are kept.
+        """
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = self.disk_evictions = 0
+        return
+
+    def stats(self):
+        """
+        Hit and miss counters and the current size, as a dict
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'disk_evictions': self.disk_evictions,
+                'entries': len(self._entries), 'bytes': self.nbytes, 'disk_bytes': self.disk_bytes}
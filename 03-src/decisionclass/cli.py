@@ -0,0 +1,35 @@
+import argparse
+
+#---------------------------------------------------------------------
+def help_me_decide():
+    """
+    Walks through a new decision at the prompt and prints the results
+    """
+    from .decision_functions import Decision
+    decision = Decision()
+    decision.build_decision()
+    decision.print_results()
+    return
+
+
+#---------------------------------------------------------------------
+def decision_service(argv=None):
+    """
+    Serves every decision saved in a directory over HTTP/JSON until interrupted
+    """
+    parser = argparse.ArgumentParser(description='Serve saved decisions (*.hmd) over HTTP/JSON.')
+    parser.add_argument('path', nargs='?', default='.', help='directory of *.hmd files')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4, help='scoring threads')
+    parser.add_argument('--cache-size', type=int, default=256, help='results kept in memory, 0 turns the cache off')
+    parser.add_argument('--cache-dir', default=None, help='folder where results are also saved across restarts')
+    parser.add_argument('--metrics', action='store_true', help='collect operation timers for GET /metrics')
+    args = parser.parse_args(argv)
+
+    from .service import serve
+    if args.metrics:
+        from .instrument import metrics
+        metrics.enable()
+    serve(args.path, args.host, args.port, workers=args.workers, cache_size=args.cache_size, cache_dir=args.cache_dir)
+    return
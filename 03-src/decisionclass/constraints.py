@@ -0,0 +1,105 @@
+import numpy as np
+
+#---------------------------------------------------------------------
+def constraint_bounds(constraint):
+    """
+    Turns one feature's constraint into an inclusive (low, high) range
+
+    Parameters
+    ----------
+    constraint: number or tuple
+        A number keeps options rated exactly that. A (low, high) tuple keeps options rated
+        from low to high, both included. Use None for an open end, e.g. (None, 120) or (3, None).
+
+    Returns
+    -------
+    low, high: float
+        -inf and inf stand in for open ends
+    """
+    if isinstance(constraint, (tuple, list)):
+        if len(constraint) != 2:
+            raise ValueError(f'A range constraint needs (low, high), not {constraint}')
+        low, high = constraint
+        return (-np.inf if low is None else float(low)), (np.inf if high is None else float(high))
+    return float(constraint), float(constraint)
+
+
+#---------------------------------------------------------------------
+# SORTED INDEX
+#---------------------------------------------------------------------
+class SortedIndex():
+    """
+    Answers range and equality constraints on the rating matrix without scanning it
+
+    Each feature column is sorted once, the first time it is constrained, keeping the row order
+    and the sorted ratings. A range is then two binary searches into the sorted ratings, and the
+    matching rows are one slice of the row order. Several constraints start from the smallest of
+    those slices and check only its rows against the other ranges, so a selective query costs
+    about the size of its smallest candidate set rather than the size of the catalog.
+    Missing (NaN) ratings never meet a constraint.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+    """
+    def __init__(self, ratings):
+        self.ratings = ratings
+        self._columns = {}
+        return
+
+    def _column(self, column):
+        if column not in self._columns:
+            values = np.asarray(self.ratings[:, column], dtype=float)
+            # NaN sorts last, so the rated options are the front of the order
+            order = np.argsort(values, kind='stable')
+            n_rated = len(values) - int(np.isnan(values).sum())
+            self._columns[column] = (order[:n_rated], values[order[:n_rated]])
+        return self._columns[column]
+
+    def _span(self, column, low, high):
+        order, values = self._column(column)
+        start = np.searchsorted(values, low, side='left')
+        stop = np.searchsorted(values, high, side='right')
+        return order, start, max(start, stop)
+
+    def count(self, column, low, high):
+        """
+        Number of options rated from low to high on a column
+        """
+        _, start, stop = self._span(column, low, high)
+        return int(stop - start)
+
+    def rows(self, column, low, high):
+        """
+        Rows of the options rated from low to high on a column, in rating order
+        """
+        order, start, stop = self._span(column, low, high)
+        return order[start:stop]
+
+    def select(self, bounds):
+        """
+        Rows of the options meeting every constraint
+
+        Parameters
+        ----------
+        bounds: list
+            (column, low, high) tuples, all of which must hold
+
+        Returns
+        -------
+        rows: ndarray
+            sorted row numbers
+        """
+        if not bounds:
+            return np.arange(len(self.ratings))
+
+        # Start from the most selective constraint, then only check its rows against the others
+        bounds = sorted(bounds, key=lambda bound: self.count(*bound))
+        rows = self.rows(*bounds[0])
+        for column, low, high in bounds[1:]:
+            if not len(rows):
+                break
+            values = np.asarray(self.ratings[rows, column], dtype=float)
+            rows = rows[(values >= low) & (values <= high)]
+        return np.sort(rows)
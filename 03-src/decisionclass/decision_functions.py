@@ -1,10 +1,39 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+import json
+import os
 import time
-from itertools import combinations
+import weakref
 from math import pi, ceil
-from matplotlib_venn import venn2, venn3
+from .ratings import RatingStore
+from .scoring import (calculate_scores, importance_points, rank_scores, top_k_scores,
+                      calculate_profile_scores, top_k_profile_scores, aggregate_scores, AGGREGATES)
+from .parallel import ParallelScorer
+from .persistence import save_store, load_store, read_header
+from .journal import Journal, JOURNAL_SUFFIX, read_journal, write_snapshot
+from .normalize import FeatureScaler
+from .overlap import OverlapIndex
+from .similarity import SimilarityIndex
+from .pairwise import PairwiseMatrix, METRICS as PAIRWISE_METRICS
+from .plotting import rating_sets, draw_venn2, draw_venn3, render_plots
+from .constraints import SortedIndex, constraint_bounds
+from .pareto import pareto_front
+from .sensitivity import sample_weights, rank_counts, smallest_flips
+from .cache import ScoreCache, content_hash, result_key
+from .instrument import instrumented, count_first, metrics, profile
+
+#---------------------------------------------------------------------
+def _option_rows(position):
+    # rows callable for instrumented Decision methods: the option_list argument at position
+    # (counting from after self) when given, otherwise every option in the rating matrix
+    def rows(result, self, *args, **kwargs):
+        option_list = kwargs.get('option_list', args[position] if len(args) > position else None)
+        return len(self.store.options if option_list is None else option_list)
+    return rows
+
+
+def _all_rows(result, self, *args, **kwargs):
+    return len(self.store.options)
+
 
 #---------------------------------------------------------------------
 def ask_more_values(value):
@@ -180,6 +209,111 @@ def rate_each_option(feature_list, option_list):
     return option_dict
 
 
+#---------------------------------------------------------------------
+def validate_decision(features, weights, options, ratings, rating_range=(0, 10)):
+    """
+    Checks a programmatically built decision all at once, instead of prompting value by value
+    
+    Parameters
+    ----------
+    features: list
+        feature names
+        
+    weights: ndarray
+        absolute importance (points) of each feature
+        
+    options: list
+        option names
+        
+    ratings: ndarray
+        2-D array of shape (number of options, number of features). NaN marks a missing rating.
+        
+    rating_range: tuple
+        lowest and highest allowed rating, or None to allow any value
+        
+    Raises
+    ------
+    ValueError
+        listing every problem found
+    """
+    problems = []
+    if len(set(features)) != len(features):
+        problems.append('feature names are not unique')
+    if len(set(options)) != len(options):
+        problems.append('option names are not unique')
+    if weights.shape != (len(features),):
+        problems.append(f'expected {len(features)} weights, got {weights.size}')
+    elif not np.isfinite(weights).all() or (weights < 0).any():
+        problems.append('weights must be nonnegative numbers')
+    if ratings.shape != (len(options), len(features)):
+        problems.append(f'expected ratings of shape {(len(options), len(features))}, got {ratings.shape}')
+    elif rating_range is not None and ratings.size:
+        low, high = rating_range
+        outside = (ratings < low) | (ratings > high)
+        if outside.any():
+            row, column = np.argwhere(outside)[0]
+            problems.append(f'{int(outside.sum())} ratings are outside {low} to {high}, '
+                            f'e.g. {options[row]} on {features[column]}')
+    if problems:
+        raise ValueError('Invalid decision: ' + '; '.join(problems))
+    return
+
+
+#---------------------------------------------------------------------
+@instrumented('report_scores', rows=count_first)
+def report_scores(option_list, scores, k=None):
+    """
+    Prints the scores as percentage matches, best match first
+    
+    Parameters
+    ----------
+    option_list: list
+        list of options, in the same order as scores
+        
+    scores: ndarray
+        1-D array with the score (out of 10) of every option
+        
+    k: int
+        Only print the k best matches. Default prints every option.
+    """
+    percents = np.round(np.asarray(scores)*10).astype(int)
+    ranking = rank_scores(percents) if k is None else top_k_scores(percents, k)
+    for index in ranking:
+        print(f'{option_list[index]} meets {percents[index]}% of your desired features.')
+    return
+
+
+#---------------------------------------------------------------------
+def report_sensitivity(sensitivity, k=5):
+    """
+    Prints how robust the best option is to changes in the importance points
+    
+    Parameters
+    ----------
+    sensitivity: dict
+        output of Decision.weight_sensitivity
+        
+    k: int
+        number of options listed by win probability
+    """
+    options = sensitivity['options']
+    win_probability = sensitivity['win_probability']
+    samples = int(sensitivity['rank_counts'].sum(axis=0)[0]) if len(options) else 0
+    print(f'{sensitivity["winner"]} is your best match.')
+    print(f'Over {samples} nearby choices of importance points:')
+    for index in top_k_scores(win_probability, k):
+        if win_probability[index] > 0:
+            print(f'  {options[index]} comes first {np.round(win_probability[index]*100, 1)}% of the time.')
+    
+    flip = sensitivity['flip']
+    if flip is None:
+        print('Moving importance from one feature to another never puts a different option first.')
+    else:
+        print(f'Moving {flip["points"]:.3g} points from {flip["from"]} to {flip["to"]} '
+              f'would tie {flip["option"]} with {sensitivity["winner"]}.')
+    return
+
+
 #---------------------------------------------------------------------
 def print_scores(option_value_df, option_list):
     """
@@ -193,17 +327,15 @@ def print_scores(option_value_df, option_list):
     option_list: list
         list of options. easier to hand in the options list then go back and determine options from column names.
     """
-    temp_dict = {}
-    for option in option_list:
-        total = option_value_df[option]*option_value_df['percent']
-        temp_dict[option] = round(total.sum()*10)
-    for option_value in sorted(temp_dict.items(), key=lambda x: x[1], reverse=True):
-        print(f'{option_value[0]} meets {option_value[1]}% of your desired features.')
+    ratings = option_value_df[list(option_list)].to_numpy(dtype=float).T
+    scores = calculate_scores(ratings, option_value_df['percent'].to_numpy(dtype=float))
+    report_scores(list(option_list), scores)
     return
 
 
 #---------------------------------------------------------------------
-def dual_radar_plot(df, comparison_pair):
+@instrumented('dual_radar_plot')
+def dual_radar_plot(df, comparison_pair, title=None):
     """
     Make a radar plot comparing feature values of two options
     
@@ -215,7 +347,12 @@ def dual_radar_plot(df, comparison_pair):
     comparison_pair: list
         two strings. Identify which options to compare. 
         Only use two because more comparisons on a radar plot looks messy.
+        
+    title: str
+        Optional title above the plot
     """
+    import matplotlib.pyplot as plt
+    
     # ------- PART 1: Create background
     feature_list = df.index.values
 
@@ -254,6 +391,8 @@ def dual_radar_plot(df, comparison_pair):
 
     # Add legend
     plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
+    if title:
+        plt.suptitle(title)
     plt.show()
     return
 
@@ -292,7 +431,8 @@ def get_options_for_radar(option_list):
 
 
 #---------------------------------------------------------------------
-def create_venn2(df, comparison_pair):
+@instrumented('create_venn2')
+def create_venn2(df, comparison_pair, sets=None, subsets=None, title=None):
     """
     Create a 2 circle Venn Diagram
     
@@ -303,49 +443,35 @@ def create_venn2(df, comparison_pair):
     
     comparison_pair: list
         Two strings. Determines which options to compare. 
+        
+    sets: dict
+        Optional output of rating_sets, so plotting many pairs builds each option's strings only once
+        
+    subsets: tuple
+        Optional region sizes in venn2 order (10, 01, 11), e.g. from Decision.pairwise_comparison.
+        Default counts the strings.
+        
+    title: str
+        Optional title instead of 'Venn Diagram'
     """
+    import matplotlib.pyplot as plt
     
-    list_of_dicts = df[comparison_pair].T.to_dict('records')
-    
-    list_of_strings = []
-    for key, value in list_of_dicts[0].items():
-        list_of_strings.append(str(key)+':'+str(value))
-    set_A = set(list_of_strings)
-    
-    try:
-        list_of_strings = []
-        for key, value in list_of_dicts[1].items():
-            list_of_strings.append(str(key)+':'+str(value))
-        set_B = set(list_of_strings)
-    except:
-        set_B=set_A
+    if sets is None:
+        sets = rating_sets(df, comparison_pair)
     
-    list_of_sets = [set_A, set_B]
+    set_A = sets[comparison_pair[0]]
+    set_B = sets[comparison_pair[1]] if len(comparison_pair) > 1 else set_A
     
     plt.figure(figsize=(10,10))
-
-    v = venn2(list_of_sets, set_labels=comparison_pair)
-    
-    alpha_strings = list(set_B.difference(set_A))
-    v.get_label_by_id('01').set_text('\n'.join(alpha_strings))
-    
-    beta_strings = list(set_A.difference(set_B))
-    v.get_label_by_id('10').set_text('\n'.join(beta_strings))
-    
-    intersection_strings = list(set_B.intersection(set_A))
-    try:
-        v.get_label_by_id('11').set_text('\n'.join(intersection_strings))
-    except:
-        pass #v.get_label_by_id('11').set_text('no overlap')
-    
-    plt.title('Venn Diagram')
+    draw_venn2(plt.gca(), set_A, set_B, comparison_pair, subsets, title)
     plt.show()
     
     return
 
 
 #---------------------------------------------------------------------
-def create_venn3(df, comparison_triple):
+@instrumented('create_venn3')
+def create_venn3(df, comparison_triple, sets=None, subsets=None):
     """
     Create a 3 circle venn diagram
     
@@ -356,81 +482,25 @@ def create_venn3(df, comparison_triple):
     
     comparison_pair: list
         Three strings. Determines which options to compare.
-    """
-    list_of_dicts = df[comparison_triple].T.to_dict('records')
-    
-    list_of_strings = []
-    for key, value in list_of_dicts[0].items():
-        list_of_strings.append(str(key)+':'+str(value))
-    set_A = set(list_of_strings)
-    
-    try:
-        list_of_strings = []
-        for key, value in list_of_dicts[1].items():
-            list_of_strings.append(str(key)+':'+str(value))
-        set_B = set(list_of_strings)
-    except:
-        set_B = set_A
-    
-    try:
-        list_of_strings = []
-        for key, value in list_of_dicts[2].items():
-            list_of_strings.append(str(key)+':'+str(value))
-        set_C = set(list_of_strings)
-    except:
-        set_C = set_A
-    
-    list_of_sets = [set_A, set_B, set_C]
-    # Careful! set_A is associated with 100, set_B is associated with 010, set_C is associated with 001
-    
-    strings_100 = list(set_A.difference(set_B).difference(set_C))
-    strings_010 = list(set_B.difference(set_A).difference(set_C))
-    strings_001 = list(set_C.difference(set_A).difference(set_B))
-    strings_110 = list(set_A.intersection(set_B).difference(set_C))
-    strings_101 = list(set_A.intersection(set_C).difference(set_B))
-    strings_011 = list(set_B.intersection(set_C).difference(set_A))
-    strings_111 = list(set_A.intersection(set_B).intersection(set_C))
-    
-    
-    plt.figure(figsize=(10,10))
-    
-    # Again, careful! the ordering is backwards in the same way as above
-    v=venn3(subsets = (len(strings_100),
-                       len(strings_010),
-                       len(strings_110),
-                       len(strings_001),
-                       len(strings_101),
-                       len(strings_011),
-                       len(strings_111)),
-                       set_labels = comparison_triple)
-    
-    v.get_label_by_id('001').set_text('\n'.join(strings_001))
-    v.get_label_by_id('010').set_text('\n'.join(strings_010))
-    v.get_label_by_id('100').set_text('\n'.join(strings_100))
-    
-    try:
-        v.get_label_by_id('011').set_text('\n'.join(strings_011))
-    except:
-        pass #v.get_label_by_id('011').set_text('no overlap')
-    
-    try:
-        v.get_label_by_id('101').set_text('\n'.join(strings_101))
-    except:
-        pass #v.get_label_by_id('101').set_text('no overlap')
-    
-    try:
-        v.get_label_by_id('110').set_text('\n'.join(strings_110))
-    except:
-        pass #v.get_label_by_id('110').set_text('no overlap')
         
-    try:
-        v.get_label_by_id('111').set_text('\n'.join(strings_111))
-    except:
-        pass #v.get_label_by_id('111').set_text('no overlap')
+    sets: dict
+        Optional output of rating_sets, so plotting many triples builds each option's strings only once
+        
+    subsets: tuple
+        Optional region sizes in venn3 order (100, 010, 110, 001, 101, 011, 111),
+        e.g. from OverlapIndex.triple_counts. Default counts the strings.
+    """
+    import matplotlib.pyplot as plt
     
+    if sets is None:
+        sets = rating_sets(df, comparison_triple)
     
-    plt.title('Venn Diagram')
+    set_A = sets[comparison_triple[0]]
+    set_B = sets[comparison_triple[1]] if len(comparison_triple) > 1 else set_A
+    set_C = sets[comparison_triple[2]] if len(comparison_triple) > 2 else set_A
     
+    plt.figure(figsize=(10,10))
+    draw_venn3(plt.gca(), set_A, set_B, set_C, comparison_triple, subsets)
     plt.show()
     
     return
@@ -442,8 +512,32 @@ def create_venn3(df, comparison_triple):
 class Decision():
     """
     A class to easily store previous decisions
+    
+    Ratings and importances are kept in a compact RatingStore. option_dict, feature_dict and
+    option_value_df are read-only views built from the store the first time they are used.
+    Assigning option_dict or feature_dict replaces the stored ratings or importances.
+    
+    Decision.metrics holds the timers and counters of every instrumented operation. They are
+    off until Decision.metrics.enable() is called, see decisionclass.instrument.
+    
+    An option can be a whole decision of its own, see add_subdecision. self.children maps those
+    options to their sub-decision, and the sub-decision's aggregated score is the option's rating.
+    
+    With start_journal or open_journaled, every edit is appended to a journal next to a saved
+    snapshot instead of saving the whole decision again, see decisionclass.journal.
     """
+    metrics = metrics
+    
     def __init__(self, example=False):
+        self.store = RatingStore()
+        self.scaler = None
+        self._views = {}
+        self.point_scores = None
+        self.score_cache = None
+        self.children = {}
+        self._parents = []
+        self._stale = set()
+        self.journal = None
         if example:
             self.feature_list = ['feature1', 'feature3', 'feature4', 'feature2']
             self.feature_dict = {'feature1': {'value': 1, 'percent': 0.1},
@@ -458,9 +552,7 @@ class Decision():
             self.update_option_value_df()
         else:
             self.feature_list = []
-            self.feature_dict = {}
             self.option_list = []
-            self.option_dict = {}
         return
         
     def build_decision(self):
@@ -474,204 +566,1770 @@ class Decision():
 
 
 #---------------------------------------------------------------------
-# UPDATING FEATURES AND OPTIONS
+# STORAGE
 #---------------------------------------------------------------------
-    def update_option_value_df(self):
-        self.option_value_df = pd.DataFrame.from_dict(self.option_dict).merge(
-            pd.DataFrame(self.feature_dict).T, left_index=True, right_index=True)
-        return 
+    @property
+    def option_dict(self):
+        """
+        key value pairs are option and a dictionary with a rating for each feature. Read-only view.
+        """
+        self._refresh_children()
+        if 'option_dict' not in self._views:
+            self._views['option_dict'] = self.store.option_dict()
+        return self._views['option_dict']
+    
+    @option_dict.setter
+    def option_dict(self, option_dict):
+        self.store.set_option_dict(option_dict)
+        self._changed()
+        if self.journal is not None:
+            # Every rating changed, so a snapshot is the smallest record of it
+            self.snapshot()
         
-    def update_option_dict(self, feature=None, option=None):
+    @property
+    def feature_dict(self):
         """
-        If the option is not in the keys, option will be added and function will request user input to rate.
-        if option is in the keys, option key value pair will be removed.
+        key value pairs are features and their 'value' and 'percent' importance. Read-only view.
+        """
+        if 'feature_dict' not in self._views:
+            self._views['feature_dict'] = self.store.feature_dict()
+        return self._views['feature_dict']
+    
+    @feature_dict.setter
+    def feature_dict(self, feature_dict):
+        self.store.set_feature_dict(feature_dict)
+        self._changed()
+        if self.journal is not None:
+            self._log('set_feature_dict', feature_dict=self.store.feature_dict(), feature_list=list(self.feature_list))
+        
+    @property
+    def option_value_df(self):
+        """
+        Rows are features. Columns are options, absolute importances, and percent importances. Read-only view.
+        """
+        self._refresh_children()
+        if 'option_value_df' not in self._views:
+            self._views['option_value_df'] = self._build_option_value_df()
+        return self._views['option_value_df']
+    
+    @instrumented('Decision.option_value_df', rows=_all_rows)
+    def _build_option_value_df(self):
+        import pandas as pd
+        store = self.store
+        active = np.flatnonzero(store.active())
+        ratings = store.ratings[:, active].T
+        option_value_df = pd.DataFrame(ratings.astype(float if ratings.dtype.kind == 'f' else np.int64),
+                                       index=[store.features[column] for column in active],
+                                       columns=store.options)
+        option_value_df['value'] = store.values[active]
+        option_value_df['percent'] = store.percents[active]
+        return option_value_df
+    
+    @property
+    def rating_matrix(self):
+        """
+        The options by features ratings array every score is calculated from
+        """
+        self._refresh_children()
+        return self.store.ratings
+    
+    @property
+    def option_index(self):
+        return self.store.option_index
+    
+    @property
+    def feature_index(self):
+        return self.store.feature_index
+    
+    @instrumented('Decision.save', rows=_all_rows)
+    def save(self, path):
+        """
+        Saves the decision in the memory-mappable decision format.
+        Much faster to load than a pickle of the whole object.
         
         Parameters
         ----------
-        feature: str
-            The feature key that will be added or removed. 
-            If added, will rate all options on this new feature
-        
-        option: str
-            The key that will be added or removed. 
-            If added, will rate all features in this new option
+        path: str
+            file to write, e.g. '01-data/03-decisions/cereal_decision.hmd'.
+            Saving over the snapshot of this decision's journal takes a snapshot instead.
         """
-        if feature != None:
-            try:
-                for k in self.option_dict.keys:
-                    self.option_dict[k].pop(feature)
-            except:
-                for k, v in rate_each_option([feature], self.option_list).items():
-                    self.option_dict[k].update(v)
-        
-        elif option != None:
-            try:
-                self.option_dict.pop(option)            
-            except:
-                self.option_dict.update(rate_each_option(self.feature_list, [option]))
-        
-        print('New option dict:\n', self.option_dict)
-        self.update_option_value_df()
+        if self.journal is not None and os.path.abspath(path) == os.path.abspath(self.journal.snapshot_path):
+            self.snapshot()
+            return
+        save_store(self.store, path, self.feature_list, self.option_list, self.scaler)
+        # A journal left next to the file recorded edits to the decision that was just overwritten
+        if os.path.exists(path + JOURNAL_SUFFIX):
+            os.remove(path + JOURNAL_SUFFIX)
         return
     
-    def update_option_list(self, option):
+    @classmethod
+    @instrumented('Decision.load', rows=lambda decision, *args, **kwargs: len(decision.store.options))
+    def load(cls, path):
         """
-        If option is not in the list, option will be added to list
-        If option is in list, option will be removed.
+        Opens a decision saved with Decision.save.
+        The ratings and option names are memory-mapped, so opening takes the same time for any number of options.
+        Edits journaled since the last snapshot are replayed on top.
         
         Parameters
         ----------
-        option: str
-            the feature that will be added or removed
+        path: str
+            file written by Decision.save
+            
+        Returns
+        -------
+        decision: Decision
         """
-        try:
-            self.option_list.remove(option)
-        except:
-            self.option_list.append(option)
-                                    
-        print('New option list:\n', self.option_list)
-        
-        self.update_option_dict(None, option)
-        return
+        store, header = load_store(path)
+        decision = cls()
+        decision.store = store
+        decision.feature_list = header['feature_list']
+        decision.option_list = store.options if header['option_list'] is None else header['option_list']
+        if header.get('scaler') is not None:
+            decision.scaler = FeatureScaler.from_dict(header['scaler'])
+        for edit in read_journal(path + JOURNAL_SUFFIX, header.get('journal_sequence', 0)):
+            decision._apply_edit(edit)
+        return decision
     
-    def update_feature_dict(self, feature):
+    @classmethod
+    def open_journaled(cls, path, sync_every=64, sync_interval=1.0, snapshot_every=None):
         """
-        If the feature is not in the keys, feature will be added and function will request user input to rate.
-        If feature is in the keys, feature key value pair will be removed.
+        Opens a decision saved with start_journal, replaying its journal, and keeps journaling every edit
         
         Parameters
         ----------
-        feature: str
-            the key that will be added or removed
+        path: str
+            the snapshot file
+            
+        sync_every, sync_interval, snapshot_every:
+            see start_journal
+            
+        Returns
+        -------
+        decision: Decision
         """
-        if feature == 'null':
-            self.feature_dict.update(set_feature_importance(self.feature_list))
-        else:
-            try:
-                self.feature_dict.pop(feature)
-                self.feature_dict.update(set_feature_importance(self.feature_list))
-                self.update_option_dict(None, None)
-            except:
-                self.feature_dict.update(set_feature_importance(self.feature_list))
-                self.update_option_dict(feature, None)
+        decision = cls.load(path)
+        decision.journal = Journal(path, sync_every, sync_interval, snapshot_every,
+                                   read_header(path).get('journal_sequence', 0))
+        return decision
+    
+    def start_journal(self, path, sync_every=64, sync_interval=1.0, snapshot_every=None):
+        """
+        Saves a snapshot of the decision at path, then records every later edit in a journal
+        next to it (path + '.journal') instead of saving the whole decision again.
         
-        print('New feature dict:\n', self.feature_dict)
+        Journaled edits: set_rating, set_feature_weight, append_options, feature_dict assignments
+        and the options and features added or removed by update_option_dict (and so by update_option_list,
+        update_feature_list and feature_list_keep). Replacing every rating, with option_dict or
+        normalize, takes a new snapshot instead. Sub-decisions are not saved.
         
+        Parameters
+        ----------
+        path: str
+            snapshot file, in the Decision.save format
+            
+        sync_every: int
+            most edits written between two fsyncs of the journal. 1 makes every edit durable before it returns.
+            
+        sync_interval: float
+            most seconds an edit waits for its fsync, checked at the next edit. close_journal syncs the rest.
+            
+        snapshot_every: int
+            Optional. A new snapshot is taken once the journal holds this many edits, so loading never
+            replays more than that.
+            
+        Returns
+        -------
+        journal: Journal
+        """
+        self.close_journal()
+        self.journal = Journal(path, sync_every, sync_interval, snapshot_every)
+        self.snapshot()
+        return self.journal
+    
+    def snapshot(self):
+        """
+        Saves the whole decision over the journal's snapshot and empties the journal.
+        The old snapshot stays in place until the new one is complete.
+        """
+        if self.journal is None:
+            raise ValueError('The decision has no journal, see start_journal')
+        journal = self.journal
+        journal.sync()
+        write_snapshot(journal.snapshot_path, self.store, self.feature_list, self.option_list, self.scaler,
+                       journal.sequence)
+        journal.reset(journal.sequence)
         return
     
-    def update_feature_list(self, feature):
+    def close_journal(self):
         """
-        If feature is not in the list, feature will be added to list
-        If feature is in list, feature will be removed.
+        Syncs the journal and stops journaling. Later edits are only kept in memory.
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        return
+    
+    def _log(self, op, **fields):
+        # Records an edit in the journal, if there is one
+        if self.journal is not None:
+            self.journal.append(op, **fields)
+            if self.journal.snapshot_due():
+                self.snapshot()
+        return
+    
+    def _apply_edit(self, edit):
+        # Makes one journaled edit. Used both to edit and to replay a journal.
+        op = edit['op']
+        store = self.store
+        if op == 'set_rating':
+            self.set_rating(edit['option'], edit['feature'], edit['rating'])
+        elif op == 'set_weight':
+            self.set_feature_weight(edit['feature'], edit['value'])
+        elif op == 'append_options':
+            self.append_options(edit['options'], edit['ratings'])
+        elif op == 'set_feature_dict':
+            self.feature_list = list(edit['feature_list'])
+            self.feature_dict = edit['feature_dict']
+        elif op == 'add_option':
+            store.add_option(edit['option'], edit['ratings'])
+            if edit['option'] not in self.option_list:
+                self.option_list = list(self.option_list) + [edit['option']]
+            self._changed()
+        elif op == 'remove_option':
+            self._unlink(edit['option'])
+            store.remove_option(edit['option'])
+            if edit['option'] in self.option_list:
+                self.option_list = list(self.option_list)
+                self.option_list.remove(edit['option'])
+            self._changed()
+        elif op == 'add_feature':
+            store.add_feature(edit['feature'], edit['ratings'])
+            self._changed()
+        elif op == 'remove_feature':
+            store.remove_feature(edit['feature'])
+            self._changed()
+        else:
+            raise ValueError(f'Unknown journal edit {op}')
+        return
+    
+    @classmethod
+    def from_ratings(cls, features, weights, options, ratings, total_importance=None,
+                     normalize=None, lower_is_better=()):
+        """
+        Builds a decision from arguments alone, without any prompts or pauses.
+        Every input is validated in one pass before anything is stored.
         
         Parameters
         ----------
-        feature: str
-            the feature that will be added or removed
+        features: list
+            feature names
+            
+        weights: list or dict
+            absolute importance (points) of each feature, in feature order or as key value pairs
+            
+        options: list
+            option names
+            
+        ratings: array-like or dict
+            2-D array of shape (number of options, number of features) with ratings out of 10,
+            or key value pairs of option and a dictionary with a rating for each feature
+            
+        total_importance: float
+            Points the weights are a share of, so percent = weight / total_importance.
+            Default is the sum of the weights.
+            
+        normalize: str or dict
+            If provided, ratings are raw values rated out of 10 with Decision.normalize
+            
+        lower_is_better: list
+            features where a smaller raw value is better. Only used with normalize.
+            
+        Returns
+        -------
+        decision: Decision
         """
-        try:
-            self.feature_list.remove(feature)
-        except:
-            self.feature_list.append(feature)
-                                    
-        print('New feature list:\n', self.feature_list)
+        features = list(features)
+        options = list(options)
+        if isinstance(weights, dict):
+            weights = [weights.get(feature, np.nan) for feature in features]
+        weights = np.asarray(weights, dtype=float)
+        if isinstance(ratings, dict):
+            ratings = [[ratings.get(option, {}).get(feature, np.nan) for feature in features] for option in options]
+        ratings = np.asarray(ratings, dtype=float)
+        validate_decision(features, weights, options, ratings, None if normalize is not None else (0, 10))
         
-        self.update_feature_dict(feature)
-        return
+        if total_importance is None:
+            total_importance = weights.sum() if weights.sum() > 0 else 1
+        decision = cls()
+        decision.store = RatingStore.from_arrays(options, features, ratings, weights, weights/total_importance)
+        decision.feature_list = list(decision.store.features)
+        decision.option_list = list(decision.store.options)
+        if normalize is not None:
+            decision.normalize(normalize, lower_is_better)
+        return decision
     
-    def feature_list_keep(self, list_of_features):
+    @classmethod
+    def from_spec(cls, spec):
         """
-        Reduces self.feature_list to the provided list of features.
+        Builds a decision from a spec, without any prompts or pauses
         
         Parameters
         ----------
-        list_of_features: list
-            List of strings of feature names from self.feature_list.
-            These features will remain, all other features will be removed
+        spec: dict or str
+            A dictionary, or the path to a JSON file holding one, with the keys 'features', 'weights',
+            'options' and 'ratings', and optionally 'total_importance', 'normalize' and 'lower_is_better'.
+            See Decision.from_ratings for what each one holds.
+            
+        Returns
+        -------
+        decision: Decision
         """
-        try:
-            assert set(list_of_features).issubset(set(self.feature_list))
-        except:
-            print('Please only use features provided in feature_list attribute.')
-            return
-        self.feature_list = list_of_features
-        self.feature_dict = set_feature_importance(self.feature_list)
-        self.update_option_value_df()
-        
-        return
-
-
-#---------------------------------------------------------------------
-# DISPLAYING RESULTS
-#---------------------------------------------------------------------
-    def print_results(self, option_list=None):
+        if isinstance(spec, str):
+            with open(spec) as f:
+                spec = json.load(f)
+        missing = {'features', 'weights', 'options', 'ratings'}.difference(spec)
+        if missing:
+            raise ValueError(f'Invalid decision: spec is missing {sorted(missing)}')
+        return cls.from_ratings(**spec)
+    
+    @classmethod
+    @instrumented('Decision.from_csv', rows=lambda decision, *args, **kwargs: len(decision.store.options))
+    def from_csv(cls, path, index_col, feature_cols=None, chunksize=100000, encoding=None,
+                 normalize=None, lower_is_better=(), duplicates='raise'):
         """
-        Prints the percentage match for options in the provided option list. 
-        Default prints the percentage match for every option.
+        Builds a decision from a CSV file with one option per row, reading it in chunks.
+        Feature importances still need to be set, e.g. with update_feature_dict('null').
         
         Parameters
         ----------
-        option_list: list
-            List containing the options whose results will be printed. 
-            If no option list is provided, all results will be printed.
+        path: str
+            CSV file, e.g. '01-data/01-raw/grocery-store/cereal.csv'
+            
+        index_col: str, int, or list
+            Column name or position holding the option names.
+            With a list of columns, the option name is their values joined by ', '.
+            
+        feature_cols: list
+            Columns to use as features. Default uses every numeric column other than index_col,
+            leaving out text columns like a manufacturer or serving size.
+            
+        chunksize: int
+            rows parsed at a time
+            
+        encoding: str
+            Text encoding. Default detects UTF-16 and UTF-8 from the byte order mark.
+            
+        normalize: str or dict
+            If provided, raw values are rated out of 10 with Decision.normalize right after reading
+            
+        lower_is_better: list
+            features where a smaller raw value is better. Only used with normalize.
+            
+        duplicates: str
+            'raise' rejects repeated option names, like from_ratings does.
+            'number' keeps them, renaming the repeats 'name (2)', 'name (3)', ...
+            
+        Returns
+        -------
+        decision: Decision
         """
-        if option_list==None:
-            option_list=self.option_list
-        
-        print_scores(self.option_value_df, option_list)
-        
-    def plot_radar2(self, option_list=None):
+        from .ingest import read_ratings_csv
+        decision = cls()
+        decision.store = read_ratings_csv(path, index_col, feature_cols, chunksize, encoding, duplicates)
+        decision.feature_list = list(decision.store.features)
+        decision.option_list = list(decision.store.options)
+        if normalize is not None:
+            decision.normalize(normalize, lower_is_better)
+        return decision
+    
+    @instrumented('Decision.normalize', rows=_all_rows)
+    def normalize(self, methods='minmax', lower_is_better=(), block_size=65536):
         """
-        Prints the overlapping radar plots for each pair in the provided option list. 
-        Default prints the radar plot for every pair of options. 
-        If the provided option list only contains one option, prints this option's radar plot.
+        Rates every option out of 10 on features measured in raw units, like sodium in mg.
+        The fitted scaler is kept in self.scaler so options added later are rated on the same scale.
         
         Parameters
         ----------
-        option_list: list
-            List containing the options whose radar plots will be printed. 
-            If no option list is provided, all pairs of radar plots will be printed.
+        methods: str or dict
+            'minmax', 'rank' or 'none' for every feature, or key value pairs of feature and method
+            
+        lower_is_better: list
+            features where a smaller raw value is better, e.g. ['sodium', 'sugars']
+            
+        block_size: int
+            rows rescaled at a time
         """
-        if option_list==None:
-            option_list=self.option_list
-        
-        if len(option_list)==1:
-            dual_radar_plot(self.option_value_df, option_list)
-        else:
-            for pair in list(combinations(option_list, 2)):
-                dual_radar_plot(self.option_value_df, pair)
+        store = self.store
+        columns = np.flatnonzero(store.rated)
+        scaler = FeatureScaler([store.features[column] for column in columns], methods, lower_is_better)
+        scaler.fit(store.ratings[:, columns])
         
-    def plot_venn2(self, option_list=None):
+        ratings = np.array(store.ratings, dtype=np.float32)
+        for start in range(0, len(ratings), block_size):
+            block = ratings[start:start + block_size]
+            block[:, columns] = scaler.transform(block[:, columns])
+        store.ratings = ratings
+        self.scaler = scaler
+        self._changed()
+        if self.journal is not None:
+            self.snapshot()
+        return
+    
+    @instrumented('Decision.append_options', rows=_option_rows(0))
+    def append_options(self, option_list, ratings):
         """
-        Prints the venn diagram for each pair in the provided option list. 
-        Default prints the venn diagram for every pair of options.
+        Adds many rated options at once. Only the new options are scored.
         
         Parameters
         ----------
         option_list: list
-            List containing the options whose pairs venn diagrams will be printed. 
-            If no option list is provided, all pairs of venn diagrams will be printed.
+            names of the new options
+            
+        ratings: array-like
+            2-D array with one row per new option and one column per feature in self.scaler.features
+            (or in rated column order when the decision was never normalized).
+            Raw values are put on the 0-10 scale with the fitted scaler.
         """
-        if option_list==None:
-            option_list=self.option_list
-        
-        for pair in list(combinations(option_list, 2)):
-            create_venn2(self.option_value_df, list(pair))
+        ratings = np.asarray(ratings, dtype=np.float32).reshape(len(option_list), -1)
+        raw_ratings = ratings
+        if self.scaler is not None:
+            ratings = self.scaler.transform(ratings)
         
-    def plot_venn3(self, option_list=None):
+        first_new_row = len(self.store.options)
+        self.store.append_options(option_list, ratings)
+        self.option_list = list(self.option_list) + list(option_list)
+        self._clear_views()
+        if self.point_scores is not None:
+            new_scores = calculate_scores(self.store.ratings[first_new_row:], self.feature_points)
+            self.point_scores = np.concatenate([self.point_scores, new_scores])
+        self._log('append_options', options=list(option_list), ratings=raw_ratings.tolist())
+        return
+    
+    def memory_usage(self):
         """
-        Prints the venn diagram for each triple in the provided option list. 
-        Default prints the venn diagram for every triple of options.
+        Bytes used by the stored ratings, importances and names, not counting cached views
+        """
+        return self.store.nbytes()
+    
+    def profile(self, method=None, output=None, sort='cumulative', limit=25):
+        """
+        Context manager that runs cProfile while a with block runs and prints the slowest functions at the end
         
         Parameters
         ----------
-        option_list: list
-            List containing the options whose triples venn diagrams will be printed. 
-            If no option list is provided, all triples of venn diagrams will be printed.
+        method: str
+            Only profile calls to this Decision method or instrumented function, e.g. 'update_scores'
+            or 'calculate_scores'. Default profiles everything in the block.
+            
+        output: str
+            Optional file to save the raw profile to instead of printing it
+            
+        sort, limit:
+            pstats sort order and number of rows printed
+        """
+        operation = f'Decision.{method}' if method is not None and hasattr(Decision, method) else method
+        return profile(operation, output, sort, limit)
+    
+    def use_score_cache(self, max_entries=256, max_bytes=2**28, directory=None, cache=None, max_disk_bytes=2**30):
+        """
+        Remembers the scores, rankings and top k computed for custom weights, so asking again is a lookup.
+        The cached results of the old ratings are dropped from memory whenever the decision changes.
+        Saved files are kept, since they still hold for the old ratings, until max_disk_bytes pushes them out.
+        
+        Parameters
+        ----------
+        max_entries, max_bytes: int
+            most results and most bytes kept in memory before the least recently used are evicted
+            
+        directory: str
+            Optional folder where results are also saved, so they survive a restart
+            
+        cache: ScoreCache
+            Optional cache to share with other decisions instead of making a new one
+            
+        max_disk_bytes: int
+            most bytes of saved results kept in directory, least recently used deleted first
+            
+        Returns
+        -------
+        cache: ScoreCache
+            the cache in use, with hit and miss counters in cache.stats()
+        """
+        self.score_cache = ScoreCache(max_entries, max_bytes, directory, max_disk_bytes) if cache is None else cache
+        return self.score_cache
+    
+    def content_hash(self):
+        """
+        Hex digest of the rating matrix and option names, the same in every process while they are unchanged
+        """
+        self._refresh_children()
+        if 'content_hash' not in self._views:
+            self._views['content_hash'] = content_hash(self.store.ratings, self.store.options)
+        return self._views['content_hash']
+    
+    def _weight_vector(self, weights):
+        # Percent importances in rating matrix column order, from a dict keyed by feature or an array
+        if not isinstance(weights, dict):
+            return np.asarray(weights, dtype=float).reshape(len(self.store.features))
+        vector = np.zeros(len(self.store.features))
+        for feature, percent in weights.items():
+            vector[self.store.feature_index[feature]] = percent
+        return vector
+    
+    def _cached(self, kind, weights, rows, compute, *extra):
+        # compute() returns a tuple of arrays; with a score cache it only runs on a miss
+        if self.score_cache is None:
+            return compute()
+        key = result_key(self.content_hash(), kind, weights, rows, *extra)
+        value = self.score_cache.get(key)
+        return self.score_cache.put(key, compute()) if value is None else value
+    
+    def _changed(self):
+        # Views and cached scores are rebuilt the next time they are needed
+        self._clear_views()
+        self.point_scores = None
+        return
+    
+    def _clear_views(self):
+        # Results cached for the old ratings are dropped along with the views,
+        # and every decision this one is a sub-decision of learns that its score may have moved
+        if self.score_cache is not None and 'content_hash' in self._views:
+            self.score_cache.discard(self._views['content_hash'])
+        self._views = {}
+        self._notify_parents()
+        return
+    
+    def __getstate__(self):
+        return {'store': self.store, 'scaler': self.scaler, 'children': self.children,
+                'feature_list': self.feature_list, 'option_list': self.option_list}
+    
+    def __setstate__(self, state):
+        self.store = RatingStore()
+        self.scaler = state.get('scaler')
+        self._views = {}
+        self.point_scores = None
+        self.score_cache = None
+        self.children = {}
+        self._parents = []
+        self._stale = set()
+        self.journal = None
+        if 'store' in state:
+            self.store = state['store']
+        else:
+            # Decisions pickled before the rating store held plain dictionaries
+            self.feature_dict = state.get('feature_dict', {})
+            self.option_dict = state.get('option_dict', {})
+        self.feature_list = state.get('feature_list', [])
+        self.option_list = state.get('option_list', [])
+        for option, child in state.get('children', {}).items():
+            self._link(option, child)
+            self._stale.add(option)
+        return
+        
+
+
+#---------------------------------------------------------------------
+# UPDATING FEATURES AND OPTIONS
+#---------------------------------------------------------------------
+    @instrumented('Decision.update_option_value_df', rows=_all_rows)
+    def update_option_value_df(self):
+        """
+        Refreshes option_value_df and recalculates every score from the stored ratings
+        """
+        self._clear_views()
+        self.update_scores()
+        return 
+        
+    @instrumented('Decision.update_scores', rows=_all_rows)
+    def update_scores(self, workers=None):
+        """
+        Recalculates the cached score of every option from the rating matrix
+        
+        Parameters
+        ----------
+        workers: int
+            If provided, the rating matrix is split across this many worker processes
+        """
+        self._refresh_children()
+        self._update_weights()
+        if workers is None:
+            self.point_scores = calculate_scores(self.store.ratings, self.feature_points)
+        else:
+            with ParallelScorer(self.store.ratings, workers) as scorer:
+                self.point_scores = scorer.scores(self.feature_points)
+        return
+        
+    def _update_weights(self):
+        store = self.store
+        active = store.active()
+        points, self.total_importance = importance_points(store.values[active], store.percents[active])
+        self.feature_points = np.zeros(len(store.features))
+        self.feature_points[active] = points
+        return
+        
+    def _ensure_scores(self):
+        if self.point_scores is None:
+            self.update_scores()
+        elif self._stale:
+            self._refresh_children()
+        return
+        
+    def set_rating(self, option, feature, rating):
+        """
+        Changes a single rating without rebuilding option_value_df.
+        Only the score of this option is recalculated.
+        
+        Parameters
+        ----------
+        option: str
+            The option being rated
+            
+        feature: str
+            The feature the option is being rated on
+            
+        rating: int
+            New rating (out of 10)
+        """
+        store = self.store
+        if feature not in store.feature_index or not store.rated[store.feature_index[feature]]:
+            # A brand new feature changes which features are scored
+            store.add_feature(feature, {option: rating})
+            self._changed()
+            self._log('set_rating', option=option, feature=feature, rating=float(rating))
+            return
+        
+        self._ensure_scores()
+        row = store.option_index[option]
+        column = store.feature_index[feature]
+        old_rating = store.set_rating(row, column, rating)
+        # The store may round the rating (float32), so the score moves by what was actually kept
+        self.point_scores[row] += (float(np.nan_to_num(store.ratings[row, column])) - old_rating)*self.feature_points[column]
+        self._clear_views()
+        self._log('set_rating', option=option, feature=feature, rating=float(rating))
+        return
+        
+    def set_feature_weight(self, feature, value):
+        """
+        Changes the importance of a single feature without rebuilding option_value_df.
+        Every score moves by the feature's ratings times the change in importance.
+        
+        Parameters
+        ----------
+        feature: str
+            The feature whose importance changes
+            
+        value: int
+            New absolute importance. The percent importance is value divided by the total importance points.
+        """
+        self._ensure_scores()
+        store = self.store
+        column = store.feature_index[feature]
+        if store.rated[column]:
+            self.point_scores += store.column(column)*(value - self.feature_points[column])
+            self.feature_points[column] = value
+        store.weighted[column] = True
+        store.values[column] = value
+        store.percents[column] = value/self.total_importance
+        self._clear_views()
+        self._log('set_weight', feature=feature, value=float(value))
+        return
+        
+    def update_option_dict(self, feature=None, option=None):
+        """
+        If the option is not in the keys, option will be added and function will request user input to rate.
+        if option is in the keys, option key value pair will be removed.
+        
+        Parameters
+        ----------
+        feature: str
+            The feature key that will be added or removed. 
+            If added, will rate all options on this new feature
+        
+        option: str
+            The key that will be added or removed. 
+            If added, will rate all features in this new option
+        """
+        store = self.store
+        edit = None
+        if feature != None:
+            if feature in store.feature_index and store.rated[store.feature_index[feature]]:
+                edit = {'op': 'remove_feature', 'feature': feature}
+            else:
+                ratings = rate_each_option([feature], self.option_list)
+                edit = {'op': 'add_feature', 'feature': feature, 'ratings': {k: v[feature] for k, v in ratings.items()}}
+        
+        elif option != None:
+            if option in store.option_index:
+                edit = {'op': 'remove_option', 'option': option}
+            else:
+                edit = {'op': 'add_option', 'option': option,
+                        'ratings': rate_each_option(self.feature_list, [option])[option]}
+        
+        if edit is not None:
+            self._apply_edit(edit)
+            self._log(**edit)
+        print('New option dict:\n', self.option_dict)
+        self.update_option_value_df()
+        return
+    
+    def update_option_list(self, option):
+        """
+        If option is not in the list, option will be added to list
+        If option is in list, option will be removed.
+        
+        Parameters
+        ----------
+        option: str
+            the feature that will be added or removed
+        """
+        # Options loaded from disk are a read-only sequence until the first edit
+        self.option_list = list(self.option_list)
+        try:
+            self.option_list.remove(option)
+        except:
+            self.option_list.append(option)
+                                    
+        print('New option list:\n', self.option_list)
+        
+        self.update_option_dict(None, option)
+        return
+    
+    def update_feature_dict(self, feature):
+        """
+        If the feature is not in the keys, feature will be added and function will request user input to rate.
+        If feature is in the keys, feature key value pair will be removed.
+        
+        Parameters
+        ----------
+        feature: str
+            the key that will be added or removed
+        """
+        feature_dict = dict(self.feature_dict)
+        if feature == 'null':
+            feature_dict.update(set_feature_importance(self.feature_list))
+            self.feature_dict = feature_dict
+        else:
+            try:
+                feature_dict.pop(feature)
+                feature_dict.update(set_feature_importance(self.feature_list))
+                self.feature_dict = feature_dict
+                self.update_option_dict(None, None)
+            except KeyError:
+                feature_dict.update(set_feature_importance(self.feature_list))
+                self.feature_dict = feature_dict
+                self.update_option_dict(feature, None)
+        
+        print('New feature dict:\n', self.feature_dict)
+        
+        return
+    
+    def update_feature_list(self, feature):
+        """
+        If feature is not in the list, feature will be added to list
+        If feature is in list, feature will be removed.
+        
+        Parameters
+        ----------
+        feature: str
+            the feature that will be added or removed
+        """
+        try:
+            self.feature_list.remove(feature)
+        except:
+            self.feature_list.append(feature)
+                                    
+        print('New feature list:\n', self.feature_list)
+        
+        self.update_feature_dict(feature)
+        return
+    
+    def feature_list_keep(self, list_of_features):
+        """
+        Reduces self.feature_list to the provided list of features.
+        
+        Parameters
+        ----------
+        list_of_features: list
+            List of strings of feature names from self.feature_list.
+            These features will remain, all other features will be removed
+        """
+        try:
+            assert set(list_of_features).issubset(set(self.feature_list))
+        except:
+            print('Please only use features provided in feature_list attribute.')
+            return
+        self.feature_list = list_of_features
+        self.feature_dict = set_feature_importance(self.feature_list)
+        self.update_option_value_df()
+        
+        return
+
+
+#---------------------------------------------------------------------
+# SUB-DECISIONS
+#---------------------------------------------------------------------
+    def add_subdecision(self, option, decision, aggregate='max', k=3, feature='score'):
+        """
+        Makes an option stand for a whole decision, e.g. a restaurant standing for the decision between its menu items.
+        The option is rated on feature with the sub-decision's aggregated score.
+        
+        The aggregated score is kept until the sub-decision's ratings or importances change. An edit
+        anywhere below only marks the options above it as changed, and the next score re-aggregates
+        just those, so re-scoring after one leaf edit touches one branch of the tree.
+        
+        Parameters
+        ----------
+        option: str
+            option standing for the sub-decision. Added if it is not an option yet.
+            
+        decision: Decision
+            the sub-decision. It can have sub-decisions of its own and be shared by several decisions.
+            
+        aggregate: str
+            'max' (score of its best option), 'mean' or 'top_k_mean', see scoring.aggregate_scores
+            
+        k: int
+            options averaged by 'top_k_mean'
+            
+        feature: str
+            Feature the option is rated on. A new feature has no importance until set_feature_weight is called.
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f'{aggregate} is not one of {AGGREGATES}')
+        if decision is self or any(child is self for child in decision._descendants()):
+            raise ValueError(f'{option} would make the decision a sub-decision of itself')
+        if option in self.children:
+            self._unlink(option)
+        
+        store = self.store
+        if option not in store.option_index:
+            # A placeholder rating, replaced by the aggregated score before anything reads it
+            store.add_option(option, {feature: 0})
+            self.option_list = list(self.option_list) + [option]
+            self._changed()
+        elif feature not in store.feature_index or not store.rated[store.feature_index[feature]]:
+            store.add_feature(feature, {option: 0})
+            self._changed()
+        if feature not in self.feature_list:
+            self.feature_list = list(self.feature_list) + [feature]
+        self._link(option, {'decision': decision, 'aggregate': aggregate, 'k': k, 'feature': feature})
+        self._child_changed(option)
+        return
+    
+    def remove_subdecision(self, option):
+        """
+        Turns a sub-decision option back into a plain option, keeping its last aggregated score as its rating
+        """
+        self._refresh_children()
+        self._unlink(option)
+        return
+    
+    @classmethod
+    def from_subdecisions(cls, children, aggregate='max', k=3, feature='score'):
+        """
+        Builds a decision between sub-decisions, rated on one feature: their aggregated score
+        
+        Parameters
+        ----------
+        children: dict
+            key value pairs are option name and the Decision it stands for
+            
+        aggregate, k, feature:
+            see add_subdecision
+            
+        Returns
+        -------
+        decision: Decision
+        """
+        decision = cls.from_ratings([feature], [1], list(children), np.zeros((len(children), 1)))
+        for option, child in children.items():
+            decision.add_subdecision(option, child, aggregate, k, feature)
+        return decision
+    
+    @classmethod
+    @instrumented('Decision.from_csv_groups', rows=lambda decision, *args, **kwargs: len(decision.store.options))
+    def from_csv_groups(cls, path, index_col, group_col, feature_cols=None, weights=None, aggregate='max', k=3,
+                        feature='score', normalize='minmax', lower_is_better=(), encoding=None, duplicates='raise'):
+        """
+        Builds a decision between the groups of a CSV file, each group a sub-decision between its rows,
+        e.g. the McDonald's menu grouped by 'Category'
+        
+        Parameters
+        ----------
+        path: str
+            CSV file with one option per row, e.g. '01-data/01-raw/fast-food/mcdonalds-menu.csv'
+            
+        index_col: str, int, or list
+            column(s) holding the option names, see from_csv
+            
+        group_col: str
+            column holding the group of each row. Groups become options in the order they first appear.
+            
+        feature_cols: list
+            Columns to use as features. Default uses every numeric column other than index_col and group_col.
+            
+        weights: list or dict
+            Absolute importance (points) of each feature, shared by every group.
+            Default makes every feature equally important.
+            
+        aggregate, k, feature:
+            how each group is scored, see add_subdecision
+            
+        normalize: str or dict
+            Raw values are rated out of 10 with Decision.normalize over the whole file, so groups are
+            rated on the same scale. None keeps the raw values.
+            
+        lower_is_better: list
+            features where a smaller raw value is better
+            
+        encoding: str
+            Text encoding. Default detects UTF-16 and UTF-8 from the byte order mark.
+            
+        duplicates: str
+            'raise' or 'number', see from_csv
+            
+        Returns
+        -------
+        decision: Decision
+            one option per group, with the group decisions in decision.children
+        """
+        import pandas as pd
+        from .ingest import sniff_encoding, csv_columns
+        encoding = encoding or sniff_encoding(path)
+        columns = {str(column).strip(): column for column in pd.read_csv(path, encoding=encoding, nrows=0).columns}
+        if group_col not in columns:
+            raise KeyError(f'{group_col} is not a column of {path}')
+        if feature_cols is None:
+            index_cols = index_col if isinstance(index_col, list) else [index_col]
+            _, _, feature_cols = csv_columns(path, index_cols + [group_col], encoding=encoding)
+        whole = cls.from_csv(path, index_col, feature_cols, encoding=encoding,
+                             normalize=normalize, lower_is_better=lower_is_better, duplicates=duplicates)
+        
+        store = whole.store
+        if weights is None:
+            weights = np.ones(len(store.features))
+        elif isinstance(weights, dict):
+            weights = [weights.get(feature, 0) for feature in store.features]
+        weights = np.asarray(weights, dtype=float)
+        groups = pd.read_csv(path, encoding=encoding, usecols=[columns[group_col]], dtype=str)[columns[group_col]]
+        codes, names = pd.factorize(groups.fillna('').str.strip())
+        
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        children = {}
+        for code, name in enumerate(names):
+            rows = order[bounds[code]:bounds[code + 1]]
+            child = cls()
+            child.store = RatingStore.from_arrays([store.options[row] for row in rows], store.features,
+                                                  store.ratings[rows], weights, weights/max(weights.sum(), 1e-12))
+            child.feature_list = list(child.store.features)
+            child.option_list = list(child.store.options)
+            child.scaler = whole.scaler
+            children[name] = child
+        return cls.from_subdecisions(children, aggregate, k, feature)
+    
+    @instrumented('Decision.aggregate_score', rows=_all_rows)
+    def aggregate_score(self, aggregate='max', k=3):
+        """
+        One score (out of 10) for the whole decision, kept until its ratings or importances change
+        
+        Parameters
+        ----------
+        aggregate: str
+            'max', 'mean' or 'top_k_mean', see scoring.aggregate_scores
+            
+        k: int
+            options averaged by 'top_k_mean'
+            
+        Returns
+        -------
+        score: float
+        """
+        self._ensure_scores()
+        key = ('aggregate_score', aggregate, k)
+        if key not in self._views:
+            self._views[key] = aggregate_scores(self.point_scores/self.total_importance, aggregate, k)
+        return self._views[key]
+    
+    def _descendants(self):
+        # Every decision below this one, once each
+        seen = {}
+        pending = [child['decision'] for child in self.children.values()]
+        while pending:
+            decision = pending.pop()
+            if id(decision) not in seen:
+                seen[id(decision)] = decision
+                pending += [child['decision'] for child in decision.children.values()]
+        return list(seen.values())
+    
+    def _link(self, option, child):
+        self.children[option] = child
+        child['decision']._parents.append((weakref.ref(self), option))
+        return
+    
+    def _unlink(self, option):
+        child = self.children.pop(option, None)
+        self._stale.discard(option)
+        if child is not None:
+            child['decision']._parents = [(parent, name) for parent, name in child['decision']._parents
+                                          if not (parent() is self and name == option)]
+        return
+    
+    def _notify_parents(self):
+        for parent, option in self._parents:
+            parent = parent()
+            if parent is not None:
+                parent._child_changed(option)
+        return
+    
+    def _child_changed(self, option):
+        # An option already marked has already told the decisions above, so the walk up stops there
+        if option not in self._stale:
+            self._stale.add(option)
+            self._notify_parents()
+        return
+    
+    def _refresh_children(self):
+        # Re-rates the sub-decision options marked as changed. Only their rows of the scores are updated.
+        store = self.store
+        while self._stale:
+            option = next(iter(self._stale))
+            if option not in store.option_index:
+                self._unlink(option)
+                continue
+            child = self.children[option]
+            # Refreshing the sub-decision first can mark this option again, so it is only cleared afterwards
+            rating = child['decision'].aggregate_score(child['aggregate'], child['k'])
+            self._stale.discard(option)
+            row, column = store.option_index[option], store.feature_index[child['feature']]
+            old_rating = store.set_rating(row, column, rating)
+            if self.point_scores is not None:
+                self.point_scores[row] += (float(np.nan_to_num(store.ratings[row, column])) - old_rating)*self.feature_points[column]
+            metrics.count('subdecision_refreshes')
+            self._clear_views()
+        return
+
+
+
+#---------------------------------------------------------------------
+# DISPLAYING RESULTS
+#---------------------------------------------------------------------
+    def print_results(self, option_list=None, k=None):
+        """
+        Prints the percentage match for options in the provided option list. 
+        Default prints the percentage match for every option.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options whose results will be printed. 
+            If no option list is provided, all results will be printed.
+            
+        k: int
+            Only print the k best matches. Default prints every match.
         """
         if option_list==None:
             option_list=self.option_list
         
-        for triple in list(combinations(option_list, 3)):
-            create_venn3(self.option_value_df, list(triple))
-    
\ No newline at end of file
+        report_scores(list(option_list), self.score_options(option_list), k)
+        
+    @instrumented('Decision.score_options', rows=_option_rows(0))
+    def score_options(self, option_list=None, weights=None):
+        """
+        Calculates the score (out of 10) of every option in the provided option list.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options to score, in the order the scores are returned.
+            If no option list is provided, every option in the rating matrix is scored.
+            
+        weights: dict or ndarray
+            Optional percent importances to score with instead of the decision's own, keyed by feature
+            (features left out get no importance) or in rating matrix column order.
+            Kept in the score cache when use_score_cache is on.
+            
+        Returns
+        -------
+        scores: ndarray
+            1-D array of scores, one per option
+        """
+        if weights is not None:
+            weights = self._weight_vector(weights)
+            self._refresh_children()
+            rows = None if option_list is None else np.asarray(self.store.rows(option_list))
+            ratings = self.store.ratings if rows is None else self.store.ratings[rows]
+            return self._cached('scores', weights, rows, lambda: (calculate_scores(ratings, weights),))[0]
+        
+        self._ensure_scores()
+        if option_list is None:
+            return self.point_scores/self.total_importance
+        
+        return self.point_scores[self.store.rows(option_list)]/self.total_importance
+        
+    @instrumented('Decision.rank_options', rows=_option_rows(0))
+    def rank_options(self, option_list=None, weights=None):
+        """
+        Ranks the options in the provided option list from best to worst score.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options to rank.
+            If no option list is provided, every option in the rating matrix is ranked.
+            
+        weights: dict or ndarray
+            Optional percent importances to rank with instead of the decision's own, see score_options
+            
+        Returns
+        -------
+        ranked_options: ndarray
+            Option names, best first
+            
+        ranked_scores: ndarray
+            Scores (out of 10) in the same order as ranked_options
+        """
+        rows = None
+        if option_list is None:
+            option_list = self.store.options
+        else:
+            rows = np.asarray(self.store.rows(option_list))
+        scores = self.score_options(None if rows is None else option_list, weights)
+        if weights is None:
+            ranking = rank_scores(scores)
+        else:
+            ranking, = self._cached('ranking', self._weight_vector(weights), rows, lambda: (rank_scores(scores),))
+        return np.asarray(option_list, dtype=object)[ranking], scores[ranking]
+        
+    @instrumented('Decision.top_k', rows=_option_rows(1))
+    def top_k(self, k, option_list=None, workers=None, weights=None):
+        """
+        Yields the k best options in rank order, without sorting the whole option list.
+        
+        Parameters
+        ----------
+        k: int
+            Number of options to return
+            
+        option_list: list
+            List containing the options to choose from.
+            If no option list is provided, every option in the rating matrix is considered.
+            
+        workers: int
+            If provided and no option list is given, the rating matrix is scored and ranked
+            across this many worker processes instead of using the cached scores.
+            Worth it for catalogs of millions of options.
+            
+        weights: dict or ndarray
+            Optional percent importances to rank with instead of the decision's own, see score_options
+            
+        Yields
+        ------
+        option, score: tuple
+            Option name and its score (out of 10), best option first
+        """
+        if weights is not None:
+            rows = None if option_list is None else np.asarray(self.store.rows(option_list))
+            scores = self.score_options(option_list, weights)
+            ranking, = self._cached('top_k', self._weight_vector(weights), rows,
+                                    lambda: (top_k_scores(scores, k),), int(k))
+            names = self.store.options if option_list is None else option_list
+            for index in ranking:
+                yield names[index], scores[index]
+            return
+        
+        if workers is not None and option_list is None:
+            self._refresh_children()
+            self._update_weights()
+            with ParallelScorer(self.store.ratings, workers) as scorer:
+                ranking, points = scorer.top_k(self.feature_points, k)
+            for row, point_score in zip(ranking, points):
+                yield self.store.options[row], point_score/self.total_importance
+            return
+        
+        # Scoring every option straight from the cached scores skips looking up each name
+        scores = self.score_options(option_list)
+        if option_list is None:
+            option_list = self.store.options
+        for index in top_k_scores(scores, k):
+            yield option_list[index], scores[index]
+        
+    def score_file(self, path, index_col, k=10, batch_size=65536, encoding=None):
+        """
+        Finds the k best options of a catalog on disk with this decision's importances, reading and scoring
+        one batch at a time so the catalog never has to fit in memory. Only the weighted feature columns are read.
+        
+        Parameters
+        ----------
+        path: str
+            Parquet or Arrow file or partitioned directory (needs pyarrow), or a CSV file,
+            with a column for every weighted feature
+            
+        index_col: str, int, or list
+            column(s) holding the option names
+            
+        k: int
+            number of best options kept
+            
+        batch_size: int
+            rows read and scored at a time
+            
+        encoding: str
+            text encoding of a CSV file
+            
+        Returns
+        -------
+        result: dict
+            'top_k' (option, score) tuples, the number of 'rows' scored, 'seconds', 'rows_per_second'
+            and score 'stats', see streaming.score_batches. Raw values are rated with self.scaler
+            when the decision was normalized, so scores match options of the decision itself.
+            Features added after normalize were rated out of 10 by hand, so their values are used as they are.
+        """
+        from .streaming import score_file
+        store = self.store
+        weights = {store.features[column]: store.percents[column] for column in np.flatnonzero(store.active())}
+        scaler = None if self.scaler is None else self.scaler.select(list(weights), missing='none')
+        return score_file(path, index_col, weights, k, scaler, batch_size=batch_size, encoding=encoding)
+        
+    def _constraint_bounds(self, constraints):
+        # (column, low, high) on the stored ratings. Decisions normalized from raw values take raw limits.
+        bounds = []
+        for feature, constraint in constraints.items():
+            if feature not in self.store.feature_index:
+                raise KeyError(f'{feature} is not a feature')
+            low, high = constraint_bounds(constraint)
+            if self.scaler is not None and feature in self.scaler.features:
+                low, high = self.scaler.scale_bounds(feature, low, high)
+            bounds.append((self.store.feature_index[feature], low, high))
+        return bounds
+        
+    @instrumented('Decision.filter_options', rows=_all_rows)
+    def filter_options(self, constraints):
+        """
+        Finds the options that meet hard limits on some features, using per-feature sorted indexes
+        that are built once and kept until the decision changes
+        
+        Parameters
+        ----------
+        constraints: dict
+            key value pairs are feature and its limit. A number keeps options rated exactly that.
+            A (low, high) tuple keeps options rated from low to high, both included, with None for an open end.
+            e.g. {'calories': (None, 120), 'sugars': (None, 5), 'fiber': (3, None)}
+            For a decision made with normalize, the limits are raw values like the ones in the CSV.
+            
+        Returns
+        -------
+        option_list: list
+            the options meeting every limit, in rating matrix order
+        """
+        return [self.store.options[row] for row in self._filter_rows(constraints)]
+        
+    def _filter_rows(self, constraints):
+        self._refresh_children()
+        if 'constraint_index' not in self._views:
+            self._views['constraint_index'] = SortedIndex(self.store.ratings)
+        return self._views['constraint_index'].select(self._constraint_bounds(constraints))
+        
+    @instrumented('Decision.query', rows=_all_rows)
+    def query(self, constraints, k=None):
+        """
+        Scores only the options that meet hard limits on some features
+        
+        Parameters
+        ----------
+        constraints: dict
+            feature limits, see filter_options
+            
+        k: int
+            only return the k best options. Default returns every option meeting the limits.
+            
+        Returns
+        -------
+        results: list
+            (option, score) tuples with scores out of 10, best option first
+        """
+        rows = self._filter_rows(constraints)
+        if self.point_scores is not None:
+            point_scores = self.point_scores[rows]
+        else:
+            self._update_weights()
+            point_scores = calculate_scores(self.store.ratings[rows], self.feature_points)
+        order = rank_scores(point_scores) if k is None else top_k_scores(point_scores, k)
+        return [(self.store.options[rows[index]], point_scores[index]/self.total_importance) for index in order]
+        
+    @instrumented('Decision.pareto_front', rows=_option_rows(2))
+    def pareto_front(self, feature_list=None, lower_is_better=(), option_list=None):
+        """
+        Finds the options that no other option beats on every feature, before any weights are chosen
+        
+        Parameters
+        ----------
+        feature_list: list
+            Features to compare on. Default is every feature in option_value_df.
+            
+        lower_is_better: list
+            Features where a smaller rating is better. Ratings from normalize are already 10-is-best,
+            so this is only needed for raw ratings such as calories from Decision.from_csv.
+            
+        option_list: list
+            Options to compare. Default compares every option.
+            
+        Returns
+        -------
+        front: list
+            the non-dominated options, in rating matrix order
+        """
+        self._refresh_children()
+        store = self.store
+        columns = np.flatnonzero(store.active()) if feature_list is None else \
+            np.array([store.feature_index[feature] for feature in feature_list], dtype=np.intp)
+        unknown = set(lower_is_better).difference(store.features[column] for column in columns)
+        if unknown:
+            raise KeyError(f'{sorted(unknown)} are not features being compared')
+        
+        rows = np.arange(len(store.options)) if option_list is None else np.sort(store.rows(list(option_list)))
+        front = pareto_front(store.ratings[rows][:, columns],
+                             [store.features[column] in lower_is_better for column in columns])
+        return [store.options[row] for row in rows[front]]
+        
+    @instrumented('Decision.weight_sensitivity', rows=_option_rows(3))
+    def weight_sensitivity(self, samples=10000, concentration=100.0, top_ranks=10, option_list=None, seed=0):
+        """
+        Checks how much the results depend on the exact importance points.
+        The options are rescored for many random importances scattered around the current ones,
+        and the smallest change of importance that would unseat the best option is worked out.
+        
+        Parameters
+        ----------
+        samples: int
+            number of random sets of importances to score
+            
+        concentration: float
+            How close the random importances stay to the current ones. A feature holding share p
+            varies with standard deviation sqrt(p(1 - p)/(concentration + 1)).
+            
+        top_ranks: int
+            places counted in rank_counts
+            
+        option_list: list
+            Options to compare. Default compares every option.
+            
+        seed: int
+            seed for the random importances
+            
+        Returns
+        -------
+        sensitivity: dict
+            'options': the options compared
+            'winner': the best option with the current importances
+            'win_probability': share of samples each option comes first in, in options order
+            'rank_counts': array of shape (number of options, top_ranks) counting the samples each
+                option comes in each place
+            'flip': None if no single move of importance between two features unseats the winner, otherwise a dict of
+                'option' (the option that catches up), 'from' and 'to' (the features), and 'percent' and 'points'
+                (the importance moved, as a share and in importance points)
+        """
+        self._ensure_scores()
+        store = self.store
+        rows = np.arange(len(store.options)) if option_list is None else np.asarray(store.rows(list(option_list)))
+        ratings = store.ratings[rows]
+        percents = np.where(store.active(), store.percents, 0)
+        
+        counts = rank_counts(ratings, sample_weights(percents, samples, concentration, seed), top_ranks)
+        winner = int(rank_scores(self.point_scores[rows])[0])
+        amount, source, target = smallest_flips(ratings, percents, winner)
+        challenger = int(amount.argmin())
+        flip = None
+        if np.isfinite(amount[challenger]):
+            flip = {'option': store.options[rows[challenger]], 'from': store.features[source[challenger]],
+                    'to': store.features[target[challenger]], 'percent': float(amount[challenger]),
+                    'points': float(amount[challenger]*self.total_importance)}
+        return {'options': [store.options[row] for row in rows], 'winner': store.options[rows[winner]],
+                'win_probability': counts[:, 0]/samples, 'rank_counts': counts, 'flip': flip}
+        
+    def weight_matrix(self, feature_dicts):
+        """
+        Stacks the percent importances of many users into one users by features array.
+        Columns follow the rating matrix, so the result can be handed to score_profiles and top_k_profiles.
+        
+        Parameters
+        ----------
+        feature_dicts: list
+            one feature_dict per user, like the one set_feature_importance returns.
+            Features a user left out get no importance.
+            
+        Returns
+        -------
+        weight_matrix: ndarray
+            2-D array of shape (number of users, number of features in the rating matrix)
+        """
+        features = self.store.features
+        return np.array([[feature_dict[feature]['percent'] if feature in feature_dict else 0.0
+                          for feature in features] for feature_dict in feature_dicts], dtype=float).reshape(-1, len(features))
+    
+    def _profile_ratings(self, weight_matrix, feature_list):
+        # Lines the weight columns up with the rating matrix columns; unlisted features get no weight
+        weight_matrix = np.atleast_2d(np.asarray(weight_matrix, dtype=float))
+        self._refresh_children()
+        if feature_list is None:
+            return self.store.ratings, weight_matrix
+        columns = [self.store.feature_index[feature] for feature in feature_list]
+        return self.store.ratings[:, columns], weight_matrix
+    
+    @instrumented('Decision.score_profiles', rows=_all_rows)
+    def score_profiles(self, weight_matrix, feature_list=None):
+        """
+        Scores every option for many users at once
+        
+        Parameters
+        ----------
+        weight_matrix: ndarray
+            2-D array of shape (number of users, number of features) with each user's percent importances
+            
+        feature_list: list
+            Feature of each weight_matrix column. Default is the rating matrix column order (see weight_matrix).
+            
+        Returns
+        -------
+        scores: ndarray
+            2-D array of shape (number of users, number of options) with scores out of 10,
+            options in the order of self.store.options
+        """
+        ratings, weight_matrix = self._profile_ratings(weight_matrix, feature_list)
+        return calculate_profile_scores(ratings, weight_matrix)
+    
+    @instrumented('Decision.top_k_profiles', rows=_all_rows)
+    def top_k_profiles(self, weight_matrix, k, feature_list=None):
+        """
+        Finds each user's k best options, scoring users in blocks so memory stays bounded
+        
+        Parameters
+        ----------
+        weight_matrix: ndarray
+            2-D array of shape (number of users, number of features) with each user's percent importances
+            
+        k: int
+            options returned per user
+            
+        feature_list: list
+            Feature of each weight_matrix column. Default is the rating matrix column order (see weight_matrix).
+            
+        Returns
+        -------
+        top_options: ndarray
+            2-D array of option names of shape (number of users, k), best first
+            
+        top_scores: ndarray
+            2-D array of the matching scores out of 10
+        """
+        ratings, weight_matrix = self._profile_ratings(weight_matrix, feature_list)
+        ranking, top_scores = top_k_profile_scores(ratings, weight_matrix, k)
+        options = np.asarray(self.store.options, dtype=object) if len(ranking) else np.empty(0, dtype=object)
+        return options[ranking], top_scores
+        
+    def overlap_index(self):
+        """
+        Index of which options share exact ratings on the features in option_value_df.
+        Built once and kept until the decision changes.
+        
+        Returns
+        -------
+        index: OverlapIndex
+            rows follow self.store.options
+        """
+        self._refresh_children()
+        if 'overlap_index' not in self._views:
+            self._views['overlap_index'] = OverlapIndex(self.store.ratings[:, self.store.active()])
+        return self._views['overlap_index']
+        
+    @instrumented('Decision.pairwise_overlaps', rows=_option_rows(0))
+    def pairwise_overlaps(self, option_list=None):
+        """
+        Counts the features each pair of options rates identically, without plotting anything
+        
+        Parameters
+        ----------
+        option_list: list
+            options to compare. Default compares every option.
+            
+        Returns
+        -------
+        overlaps: ndarray
+            2-D array. overlaps[i, j] is the number of shared ratings of option_list[i] and option_list[j].
+            The diagonal is the number of features each option has a rating for.
+        """
+        rows = None if option_list is None else self.store.rows(list(option_list))
+        return self.overlap_index().pairwise_overlaps(rows)
+        
+    @instrumented('Decision.triple_overlaps', rows=_option_rows(0))
+    def triple_overlaps(self, option_list=None):
+        """
+        Venn diagram region sizes for every triple of options, without plotting anything
+        
+        Parameters
+        ----------
+        option_list: list
+            options to compare. Default compares every option.
+            
+        Returns
+        -------
+        triples: ndarray
+            2-D array of option names of shape (number of triples, 3), in the order plot_venn3 draws them
+            
+        counts: ndarray
+            2-D array of shape (number of triples, 7) with region sizes in venn3 order
+            (100, 010, 110, 001, 101, 011, 111)
+        """
+        if option_list is None:
+            option_list = self.store.options
+        option_list = list(option_list)
+        positions, counts = self.overlap_index().triple_overlaps(self.store.rows(option_list))
+        options = np.empty(len(option_list), dtype=object)
+        options[:] = option_list
+        return options[positions], counts
+        
+    def similarity_index(self, metric='cosine', approximate=False):
+        """
+        Normalized rating matrix for most_similar, built once per metric and kept until the decision changes
+        
+        Parameters
+        ----------
+        metric: str
+            'cosine', 'euclidean' (weighted by percent importance) or 'overlap' (exactly matching ratings)
+            
+        approximate: bool
+            also build a random projection, so queries over millions of options only rerank a few candidates exactly
+            
+        Returns
+        -------
+        index: SimilarityIndex
+            rows follow self.store.options, columns are the features in option_value_df
+        """
+        self._refresh_children()
+        key = ('similarity_index', metric, approximate)
+        if key not in self._views:
+            store = self.store
+            active = store.active()
+            self._views[key] = SimilarityIndex(store.ratings[:, active], metric, weights=store.percents[active],
+                                               approximate=approximate)
+        return self._views[key]
+        
+    @instrumented('Decision.most_similar', rows=_option_rows(3))
+    def most_similar(self, option, k=5, metric='cosine', option_list=None, approximate=False):
+        """
+        Finds the options most alike a given option
+        
+        Parameters
+        ----------
+        option: str
+            The option to compare against
+            
+        k: int
+            Number of options to return
+            
+        metric: str
+            'cosine' compares the shape of the ratings, 'euclidean' the distance between them with
+            each feature scaled by its percent importance, 'overlap' counts exactly matching ratings
+            like the Venn diagrams
+            
+        option_list: list
+            Options to search. Default searches every option.
+            
+        approximate: bool
+            Search a random projection first. Worth it for catalogs of millions of options.
+            
+        Returns
+        -------
+        similar: list
+            (option, value) tuples, most alike first. The value is the cosine similarity,
+            the weighted distance or the number of matching features.
+        """
+        store = self.store
+        rows = None if option_list is None else store.rows(list(option_list))
+        neighbours, values = self.similarity_index(metric, approximate).query(store.option_index[option], k, rows)
+        return [(store.options[row], value) for row, value in zip(neighbours, values.tolist())]
+        
+    def pairwise_matrix(self):
+        """
+        Score differences, features won, lost and tied and weighted dominance margins between options.
+        Built once and kept until the decision changes.
+        
+        Returns
+        -------
+        matrix: PairwiseMatrix
+            rows follow self.store.options, features are the ones in option_value_df
+        """
+        self._ensure_scores()
+        if 'pairwise_matrix' not in self._views:
+            store = self.store
+            active = store.active()
+            self._views['pairwise_matrix'] = PairwiseMatrix(store.ratings[:, active], store.percents[active],
+                                                            scores=self.point_scores/self.total_importance)
+        return self._views['pairwise_matrix']
+        
+    @instrumented('Decision.pairwise_comparison', rows=_option_rows(0))
+    def pairwise_comparison(self, option_list=None, metrics=PAIRWISE_METRICS):
+        """
+        Compares every pair of options in one blockwise pass, without plotting anything
+        
+        Parameters
+        ----------
+        option_list: list
+            options to compare. Default compares every option, which needs memory for
+            the square of the number of options; see pairwise_matrix().blocks to go block by block.
+            
+        metrics: tuple
+            any of 'score_difference', 'features_won', 'features_lost', 'features_tied' and 'margin'
+            
+        Returns
+        -------
+        comparison: dict
+            metric name to a 2-D array. comparison['features_won'][i, j] is the number of features
+            option_list[i] is rated higher on than option_list[j], comparison['margin'][i, j] the
+            percent importance of those features minus that of the features option_list[j] wins.
+        """
+        rows = None if option_list is None else self.store.rows(list(option_list))
+        return self.pairwise_matrix().matrix(rows, metrics)
+        
+    @instrumented('Decision.options_beating', rows=_option_rows(2))
+    def options_beating(self, option, k=10, option_list=None):
+        """
+        Finds the options that beat a given option on the most features
+        
+        Parameters
+        ----------
+        option: str
+            The option to beat
+            
+        k: int
+            Most options returned. None returns every option better on at least one feature.
+            
+        option_list: list
+            Options to search. Default searches every option.
+            
+        Returns
+        -------
+        winners: list
+            (option, features won, features lost, margin) tuples, most features won first and
+            the largest margin first among ties. Options better on no feature are left out.
+        """
+        store = self.store
+        rows = None if option_list is None else store.rows(list(option_list))
+        winners, comparison = self.pairwise_matrix().beating(store.option_index[option], k, rows)
+        return [(store.options[row], won, lost, margin) for row, won, lost, margin in
+                zip(winners.tolist(), comparison['features_won'].tolist(), comparison['features_lost'].tolist(),
+                    comparison['margin'].tolist())]
+        
+    def _compared_pairs(self, option_list):
+        # Every pair in itertools.combinations order, with a title and venn2 region sizes from one pairwise pass
+        comparison = self.pairwise_comparison(option_list, ('score_difference', 'features_won', 'features_lost',
+                                                            'features_tied'))
+        won, lost, tied = comparison['features_won'], comparison['features_lost'], comparison['features_tied']
+        difference = comparison['score_difference']
+        rated = np.diagonal(tied)
+        pairs, titles, subsets = [], [], []
+        for i, j in zip(*[positions.tolist() for positions in np.triu_indices(len(option_list), 1)]):
+            first, second = option_list[i], option_list[j]
+            pairs.append((first, second))
+            titles.append(f'{first} wins {won[i, j]} features, {second} wins {lost[i, j]}, '
+                          f'score difference {difference[i, j]:+.2f}')
+            subsets.append((int(rated[i] - tied[i, j]), int(rated[j] - tied[i, j]), int(tied[i, j])))
+        return pairs, titles, subsets
+        
+    @instrumented('Decision.plot_radar2')
+    def plot_radar2(self, option_list=None, output=None, format='png', workers=None):
+        """
+        Prints the overlapping radar plots for each pair in the provided option list. 
+        Default prints the radar plot for every pair of options. 
+        If the provided option list only contains one option, prints this option's radar plot.
+        Each pair is titled with the features each option wins and their score difference,
+        all taken from one pairwise_comparison of the option list.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options whose radar plots will be printed. 
+            If no option list is provided, all pairs of radar plots will be printed.
+            
+        output: str
+            If provided, the plots are written here instead of shown: a directory gets one file per plot,
+            a path ending in .pdf gets one multi-page PDF. Works without a display.
+            
+        format: str
+            'png' or 'svg' when output is a directory
+            
+        workers: int
+            With output, spread the plots over this many processes
+            
+        Returns
+        -------
+        paths: list
+            With output, the file written for every plot
+        """
+        if option_list==None:
+            option_list=self.option_list
+        
+        if len(option_list)==1:
+            pairs, titles = [option_list], [None]
+        else:
+            pairs, titles, _ = self._compared_pairs(list(option_list))
+        if output is not None:
+            return render_plots(self.option_value_df, 'radar', pairs, output, format, workers=workers, titles=titles)
+        
+        for pair, title in zip(pairs, titles):
+            dual_radar_plot(self.option_value_df, pair, title)
+        
+    @instrumented('Decision.plot_venn2')
+    def plot_venn2(self, option_list=None, output=None, format='png', workers=None):
+        """
+        Prints the venn diagram for each pair in the provided option list. 
+        Default prints the venn diagram for every pair of options.
+        Region sizes and titles come from one pairwise_comparison of the option list.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options whose pairs venn diagrams will be printed. 
+            If no option list is provided, all pairs of venn diagrams will be printed.
+            
+        output, format, workers:
+            Write the diagrams to files instead of showing them, see plot_radar2
+        """
+        if option_list==None:
+            option_list=self.option_list
+        
+        pairs, titles, subsets = self._compared_pairs(list(option_list))
+        if output is not None:
+            return render_plots(self.option_value_df, 'venn2', pairs, output, format, workers=workers,
+                                subsets=subsets, titles=titles)
+        
+        sets = rating_sets(self.option_value_df, option_list)
+        for pair, title, pair_subsets in zip(pairs, titles, subsets):
+            create_venn2(self.option_value_df, list(pair), sets, pair_subsets, title)
+        
+    @instrumented('Decision.plot_venn3')
+    def plot_venn3(self, option_list=None, output=None, format='png', workers=None):
+        """
+        Prints the venn diagram for each triple in the provided option list. 
+        Default prints the venn diagram for every triple of options.
+        
+        Parameters
+        ----------
+        option_list: list
+            List containing the options whose triples venn diagrams will be printed. 
+            If no option list is provided, all triples of venn diagrams will be printed.
+            
+        output, format, workers:
+            Write the diagrams to files instead of showing them, see plot_radar2
+        """
+        if option_list==None:
+            option_list=self.option_list
+        
+        triples, subsets = self.triple_overlaps(option_list)
+        if output is not None:
+            return render_plots(self.option_value_df, 'venn3', triples.tolist(), output, format,
+                                workers=workers, subsets=subsets.tolist())
+        
+        sets = rating_sets(self.option_value_df, option_list)
+        for triple, triple_subsets in zip(triples.tolist(), subsets.tolist()):
+            create_venn3(self.option_value_df, triple, sets, triple_subsets)
@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+from .ratings import RatingStore, intern_names
+from .instrument import instrumented
+
+#---------------------------------------------------------------------
+def sniff_encoding(path):
+    """
+    Picks a text encoding from the file's byte order mark
+    
+    Parameters
+    ----------
+    path: str
+        file to inspect
+        
+    Returns
+    -------
+    encoding: str
+        'utf-16' or 'utf-8-sig' when the file starts with their byte order mark, otherwise 'utf-8'
+    """
+    with open(path, 'rb') as f:
+        start = f.read(3)
+    if start[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return 'utf-16'
+    if start == b'\xef\xbb\xbf':
+        return 'utf-8-sig'
+    return 'utf-8'
+
+
+#---------------------------------------------------------------------
+def parse_ratings(column):
+    """
+    Converts a column of raw CSV values into float32 ratings
+    
+    Handles the quirks of the raw data: percentage strings like "0%", padding spaces,
+    and placeholders like "-" or "varies", which become missing (NaN) ratings.
+    
+    Parameters
+    ----------
+    column: Series
+        one chunk of one feature column
+        
+    Returns
+    -------
+    ratings: ndarray
+        float32 array of the same length
+    """
+    if column.dtype.kind not in 'biuf':
+        column = pd.to_numeric(column.astype(str).str.strip().str.rstrip('%'), errors='coerce')
+    return column.to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+#---------------------------------------------------------------------
+def numeric_columns(path, columns, encoding=None, sample_rows=1000):
+    """
+    Picks the columns that hold numbers, judging from the first rows of a CSV file
+    
+    A column counts as numeric when at least half of its non-empty values in the sample parse as
+    ratings (see parse_ratings), so placeholders like "varies" are allowed but names, categories
+    and serving sizes like "1 cup (240 ml)" are not.
+    
+    Parameters
+    ----------
+    path: str
+        CSV file
+        
+    columns: list
+        header names to check, exactly as in the file
+        
+    encoding: str
+        Text encoding. Default detects UTF-16 and UTF-8 from the byte order mark.
+        
+    sample_rows: int
+        rows read to decide
+        
+    Returns
+    -------
+    numeric: list
+        the numeric columns, in the order given
+    """
+    if not columns:
+        return []
+    sample = pd.read_csv(path, encoding=encoding or sniff_encoding(path), usecols=columns, nrows=sample_rows,
+                         dtype=str, keep_default_na=False)
+    numeric = []
+    for column in columns:
+        values = sample[column].str.strip()
+        values = values[values != '']
+        if len(values) and np.isfinite(parse_ratings(values)).sum() >= len(values)/2:
+            numeric.append(column)
+    return numeric
+
+
+#---------------------------------------------------------------------
+def unique_names(names, duplicates='raise'):
+    """
+    Checks that option names are unique, or numbers the repeats
+    
+    Parameters
+    ----------
+    names: list
+        option names in file order
+        
+    duplicates: str
+        'raise' rejects repeated names. 'number' keeps the first and renames the next ones
+        'name (2)', 'name (3)', ...
+        
+    Returns
+    -------
+    names: list
+        unique option names
+    """
+    if duplicates not in ('raise', 'number'):
+        raise ValueError(f"duplicates must be 'raise' or 'number', got {duplicates!r}")
+    seen = {}
+    repeated = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] == 2:
+            repeated.append(name)
+    if not repeated:
+        return names
+    if duplicates == 'raise':
+        raise ValueError(f'Invalid decision: option names are not unique, e.g. {repeated[:5]}. '
+                         "Name options by more columns, or pass duplicates='number'.")
+    taken = set(seen)
+    count = {}
+    renamed = []
+    for name in names:
+        count[name] = count.get(name, 0) + 1
+        if count[name] > 1:
+            number = count[name]
+            while f'{name} ({number})' in taken:
+                number += 1
+            count[name] = number
+            name = f'{name} ({number})'
+            taken.add(name)
+        renamed.append(name)
+    return renamed
+
+
+#---------------------------------------------------------------------
+def csv_columns(path, index_col, feature_cols=None, encoding=None):
+    """
+    Matches the requested name and feature columns against a CSV header
+    
+    Parameters
+    ----------
+    path: str
+        CSV file with one option per row
+        
+    index_col: str, int, or list
+        Column name or position holding the option names, or a list of them
+        
+    feature_cols: list
+        Columns to use as features. Column names are matched with surrounding spaces removed.
+        Default uses every numeric column other than index_col, see numeric_columns.
+        
+    encoding: str
+        Text encoding. Default detects UTF-16 and UTF-8 from the byte order mark.
+        
+    Returns
+    -------
+    encoding: str
+        the encoding to read the file with
+        
+    index_cols, features: list
+        header names of the name columns and of the feature columns, exactly as in the file
+    """
+    encoding = encoding or sniff_encoding(path)
+    columns = list(pd.read_csv(path, encoding=encoding, nrows=0).columns)
+    stripped = {str(column).strip(): column for column in columns}
+    
+    def find(column):
+        if isinstance(column, int):
+            return columns[column]
+        if column in columns:
+            return column
+        if column in stripped:
+            return stripped[column]
+        raise KeyError(f'{column} is not a column of {path}')
+    
+    index_cols = [find(column) for column in (index_col if isinstance(index_col, list) else [index_col])]
+    if feature_cols is None:
+        features = numeric_columns(path, [column for column in columns if column not in index_cols], encoding)
+    else:
+        features = [find(column) for column in feature_cols]
+    return encoding, index_cols, features
+
+
+#---------------------------------------------------------------------
+def read_csv_batches(path, index_col, feature_cols=None, chunksize=100000, encoding=None):
+    """
+    Reads a CSV file one chunk at a time, parsing only the name and feature columns
+    
+    Parameters
+    ----------
+    path, index_col, feature_cols, encoding:
+        see csv_columns
+        
+    chunksize: int
+        rows parsed at a time
+        
+    Yields
+    ------
+    names: list
+        option name of every row in the chunk
+        
+    ratings: ndarray
+        float32 array of shape (rows in the chunk, number of features), NaN where a value is missing
+    """
+    encoding, index_cols, features = csv_columns(path, index_col, feature_cols, encoding)
+    reader = pd.read_csv(path, encoding=encoding, usecols=index_cols + features, chunksize=chunksize,
+                         dtype={column: str for column in index_cols})
+    for chunk in reader:
+        ratings = np.empty((len(chunk), len(features)), dtype=np.float32)
+        for column_number, feature in enumerate(features):
+            ratings[:, column_number] = parse_ratings(chunk[feature])
+        
+        names = chunk[index_cols].fillna('').astype(str)
+        if len(index_cols) == 1:
+            names = names[index_cols[0]].str.strip()
+        else:
+            names = names.apply(lambda row: ', '.join(value.strip() for value in row), axis=1)
+        yield names.tolist(), ratings
+    return
+
+
+#---------------------------------------------------------------------
+@instrumented('read_ratings_csv', rows=lambda store, *args, **kwargs: len(store.options))
+def read_ratings_csv(path, index_col, feature_cols=None, chunksize=100000, encoding=None, duplicates='raise'):
+    """
+    Streams a CSV file into a rating store, one chunk at a time
+    
+    Parameters
+    ----------
+    path: str
+        CSV file with one option per row
+        
+    index_col: str, int, or list
+        Column name or position holding the option names.
+        With a list of columns, the option name is their values joined by ', '.
+        
+    feature_cols: list
+        Columns to use as features. Column names are matched with surrounding spaces removed.
+        Default uses every numeric column other than index_col.
+        
+    chunksize: int
+        rows parsed at a time. Memory use is the ratings matrix plus one chunk.
+        
+    encoding: str
+        Text encoding. Default detects UTF-16 and UTF-8 from the byte order mark.
+        
+    duplicates: str
+        'raise' rejects repeated option names, 'number' renames repeats 'name (2)', ... see unique_names
+        
+    Returns
+    -------
+    store: RatingStore
+        store holding the ratings. No feature has an importance yet.
+    """
+    encoding, index_cols, features = csv_columns(path, index_col, feature_cols, encoding)
+    capacity = chunksize
+    ratings = np.empty((capacity, len(features)), dtype=np.float32)
+    options = []
+    n_options = 0
+    for names, chunk in read_csv_batches(path, index_cols, features, chunksize, encoding):
+        if n_options + len(chunk) > capacity:
+            capacity = max(2*capacity, n_options + len(chunk))
+            ratings.resize((capacity, len(features)), refcheck=False)
+        ratings[n_options:n_options + len(chunk)] = chunk
+        options.extend(intern_names(names))
+        n_options += len(chunk)
+    
+    ratings.resize((n_options, len(features)), refcheck=False)
+    options = unique_names(options, duplicates)
+    return RatingStore.from_arrays(options, [str(feature).strip() for feature in features], ratings)
@@ -0,0 +1,326 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Same as inspect.CO_GENERATOR, without importing inspect
+CO_GENERATOR = 0x20
+
+#---------------------------------------------------------------------
+# METRICS
+#---------------------------------------------------------------------
+class Metrics():
+    """
+    Per-operation timers and counters for the functions and Decision methods marked with @instrumented
+
+    Collection is off until enable() is called. While it is off, an instrumented call costs one
+    attribute check on top of the plain call. While it is on, every operation records its number
+    of calls, errors, total and longest time and rows processed. With trace_memory, tracemalloc
+    also records the bytes each operation allocated at its peak, above what was in use when it started.
+    Times and bytes of an operation include the operations it calls.
+
+    Use the shared instance, decisionclass.instrument.metrics.
+    """
+    def __init__(self):
+        self.active = False
+        self.collecting = False
+        self.trace_memory = False
+        self._started_tracemalloc = False
+        self._operations = {}
+        self._counters = {}
+        self._profilers = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        return
+
+    def enable(self, trace_memory=False):
+        """
+        Starts collecting. trace_memory starts tracemalloc too, which slows every allocation down.
+        """
+        self.collecting = True
+        if trace_memory and not self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self.trace_memory = True
+        self._update_active()
+        return self
+
+    def disable(self):
+        """
+        Stops collecting, keeping what was collected so far
+        """
+        self.collecting = False
+        if self.trace_memory:
+            import tracemalloc
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            self._started_tracemalloc = False
+            self.trace_memory = False
+        self._update_active()
+        return self
+
+    def reset(self):
+        """
+        Forgets everything collected so far
+        """
+        with self._lock:
+            self._operations = {}
+            self._counters = {}
+        return self
+
+    @contextmanager
+    def collect(self, trace_memory=False):
+        """
+        Collects only inside a with block
+        """
+        was_collecting = self.collecting
+        self.enable(trace_memory)
+        try:
+            yield self
+        finally:
+            if not was_collecting:
+                self.disable()
+
+    def _update_active(self):
+        self.active = self.collecting or bool(self._profilers)
+        return
+
+    def count(self, name, value=1):
+        """
+        Adds to a free-form counter, e.g. cache hits. Does nothing while collection is off.
+        """
+        if self.collecting:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+        return
+
+    def _record(self, name, seconds, rows, error, allocated):
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                  'rows': 0, 'allocated_bytes': 0, 'max_allocated_bytes': 0}
+            stats['calls'] += 1
+            stats['errors'] += error
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['rows'] += rows
+            stats['allocated_bytes'] += allocated
+            stats['max_allocated_bytes'] = max(stats['max_allocated_bytes'], allocated)
+        return
+
+    def _memory_start(self):
+        # tracemalloc keeps one peak, so each operation resets it and hands its own peak back to the caller.
+        # Threads share that peak, so bytes are only exact when one thread at a time is traced.
+        import tracemalloc
+        if not hasattr(self._local, 'frames'):
+            self._local.frames = []
+        frames = self._local.frames
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            frames[-1][1] = max(frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        frames.append([current, 0])
+        return
+
+    def _memory_stop(self):
+        import tracemalloc
+        frames = self._local.frames
+        _, peak = tracemalloc.get_traced_memory()
+        start, child_peak = frames.pop()
+        peak = max(peak, child_peak)
+        if frames:
+            frames[-1][1] = max(frames[-1][1], peak)
+        return max(peak - start, 0)
+
+    def _enter(self, name):
+        profiler = self._profilers.get(name)
+        if profiler is not None:
+            profiler.enable()
+        trace = self.trace_memory and self.collecting
+        if trace:
+            self._memory_start()
+        return profiler, trace
+
+    def _exit(self, name, profiler, trace, seconds, rows, error):
+        allocated = self._memory_stop() if trace else 0
+        if profiler is not None:
+            profiler.disable()
+        if self.collecting:
+            self._record(name, seconds, rows, error, allocated)
+        return
+
+    def _call(self, name, function, rows, args, kwargs):
+        profiler, trace = self._enter(name)
+        result, error = None, True
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            n_rows = rows(result, *args, **kwargs) if rows is not None and not error else 0
+            self._exit(name, profiler, trace, seconds, n_rows, error)
+
+    def _generate(self, name, function, rows, args, kwargs):
+        # Only the time spent producing items counts, not the time the caller spends between them
+        seconds, allocated, error = 0.0, 0, False
+        iterator = function(*args, **kwargs)
+        try:
+            while True:
+                profiler, trace = self._enter(name)
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    seconds += time.perf_counter() - start
+                    if trace:
+                        allocated = max(allocated, self._memory_stop())
+                    if profiler is not None:
+                        profiler.disable()
+                yield item
+        finally:
+            if self.collecting:
+                n_rows = rows(None, *args, **kwargs) if rows is not None and not error else 0
+                self._record(name, seconds, n_rows, error, allocated)
+
+    def to_dict(self):
+        """
+        Everything collected so far
+
+        Returns
+        -------
+        metrics: dict
+            'operations': operation name to its 'calls', 'errors', 'seconds', 'max_seconds', 'rows',
+            'allocated_bytes' and 'max_allocated_bytes'. 'counters': counter name to value.
+        """
+        with self._lock:
+            return {'operations': {name: dict(stats) for name, stats in self._operations.items()},
+                    'counters': dict(self._counters)}
+
+    def to_prometheus(self, prefix='decisionclass'):
+        """
+        Everything collected so far in the Prometheus text exposition format
+
+        Returns
+        -------
+        text: str
+            one metric family per statistic, labelled by operation
+        """
+        families = (('calls', 'counter', 'calls_total', 'Calls per operation'),
+                    ('errors', 'counter', 'errors_total', 'Calls that raised an exception'),
+                    ('seconds', 'counter', 'seconds_total', 'Seconds spent per operation'),
+                    ('max_seconds', 'gauge', 'max_seconds', 'Longest single call'),
+                    ('rows', 'counter', 'rows_total', 'Option rows processed'),
+                    ('allocated_bytes', 'counter', 'allocated_bytes_total', 'Peak bytes allocated, summed over calls'),
+                    ('max_allocated_bytes', 'gauge', 'max_allocated_bytes', 'Largest peak allocation of a single call'))
+        collected = self.to_dict()
+        lines = []
+        for key, kind, suffix, description in families:
+            name = f'{prefix}_operation_{suffix}'
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for operation, stats in sorted(collected['operations'].items()):
+                lines.append(f'{name}{{operation="{operation}"}} {stats[key]!r}')
+        for counter, value in sorted(collected['counters'].items()):
+            name = f'{prefix}_{counter}_total'
+            lines += [f'# TYPE {name} counter', f'{name} {value!r}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+#---------------------------------------------------------------------
+def instrumented(name, rows=None):
+    """
+    Marks a function or method as an operation for metrics and profile
+
+    Parameters
+    ----------
+    name: str
+        operation name in the metrics, e.g. 'Decision.update_scores'
+
+    rows: callable
+        Optional. Called as rows(result, *args, **kwargs) after a successful call, returns the
+        number of option rows it processed. For generators result is None.
+    """
+    def decorate(function):
+        if function.__code__.co_flags & CO_GENERATOR:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not metrics.active:
+                    return function(*args, **kwargs)
+                return metrics._generate(name, function, rows, args, kwargs)
+        else:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not metrics.active:
+                    return function(*args, **kwargs)
+                return metrics._call(name, function, rows, args, kwargs)
+        return wrapper
+    return decorate
+
+
+#---------------------------------------------------------------------
+def count_first(result, *args, **kwargs):
+    """
+    rows callable for functions whose first argument has one entry per option row
+    """
+    first = args[0] if args else next(iter(kwargs.values()), ())
+    return len(first)
+
+
+#---------------------------------------------------------------------
+@contextmanager
+def profile(operation=None, output=None, sort='cumulative', limit=25):
+    """
+    Runs cProfile inside a with block and prints the slowest functions at the end
+
+    Parameters
+    ----------
+    operation: str
+        Only profile calls to this instrumented operation, e.g. 'Decision.update_scores'.
+        Default profiles everything in the block.
+
+    output: str
+        Optional file to save the raw profile to (for snakeviz, pstats, ...) instead of printing it
+
+    sort: str
+        pstats sort order of the printed table
+
+    limit: int
+        rows printed
+
+    Yields
+    ------
+    profiler: cProfile.Profile
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    if operation is None:
+        profiler.enable()
+    else:
+        if operation in metrics._profilers:
+            raise RuntimeError(f'{operation} is already being profiled')
+        metrics._profilers[operation] = profiler
+        metrics._update_active()
+    try:
+        yield profiler
+    finally:
+        if operation is None:
+            profiler.disable()
+        else:
+            del metrics._profilers[operation]
+            metrics._update_active()
+        if output is not None:
+            profiler.dump_stats(output)
+        elif profiler.getstats():
+            pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
@@ -0,0 +1,248 @@
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from .persistence import save_store
+
+# File layout
+# -----------
+# The journal of a decision saved at PATH lives next to it at PATH + JOURNAL_SUFFIX. It is a
+# sequence of entries, each a little-endian uint32 payload length, the uint32 CRC-32 of the
+# payload, then the payload: one JSON object with the entry's sequence number 'seq', its 'op'
+# and the op's fields. A crash can only leave a partly written last entry, which the length
+# and checksum reveal, so reading stops there.
+JOURNAL_SUFFIX = '.journal'
+ENTRY_HEADER = struct.Struct('<II')
+
+# Edits a journal records, with the fields each one carries
+OPS = {'set_rating': ('option', 'feature', 'rating'),
+       'set_weight': ('feature', 'value'),
+       'set_feature_dict': ('feature_dict', 'feature_list'),
+       'add_option': ('option', 'ratings'),
+       'remove_option': ('option',),
+       'add_feature': ('feature', 'ratings'),
+       'remove_feature': ('feature',),
+       'append_options': ('options', 'ratings')}
+
+#---------------------------------------------------------------------
+def _scan(path):
+    # Yields (end offset, entry) for every complete entry, stopping at the first torn or corrupt one
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        position = 0
+        while True:
+            header = f.read(ENTRY_HEADER.size)
+            if len(header) < ENTRY_HEADER.size:
+                return
+            length, checksum = ENTRY_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            position += ENTRY_HEADER.size + length
+            yield position, json.loads(payload.decode('utf-8'))
+
+
+#---------------------------------------------------------------------
+def read_journal(path, after=0):
+    """
+    Reads the edits in a journal file
+
+    Parameters
+    ----------
+    path: str
+        journal file. A missing file has no edits.
+
+    after: int
+        only edits with a larger sequence number are returned, e.g. the journal_sequence of the snapshot
+
+    Yields
+    ------
+    edit: dict
+        'seq', 'op' and the op's fields, oldest first
+    """
+    for _, edit in _scan(path):
+        if edit['seq'] > after:
+            yield edit
+    return
+
+
+#---------------------------------------------------------------------
+def write_snapshot(path, store, feature_list=None, option_list=None, scaler=None, journal_sequence=0):
+    """
+    Saves a decision with save_store so that the file at path is always either the old or the new snapshot
+
+    The snapshot is written to a temporary file in the same folder, flushed to disk, then renamed over path.
+    A decision memory-mapped from the old file keeps reading the old file.
+
+    Parameters
+    ----------
+    path: str
+        file to write
+
+    store, feature_list, option_list, scaler, journal_sequence:
+        see persistence.save_store
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(suffix='.hmd', dir=folder)
+    os.close(handle)
+    try:
+        save_store(store, temporary, feature_list, option_list, scaler, journal_sequence)
+        with open(temporary, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    _sync_folder(folder)
+    return
+
+
+#---------------------------------------------------------------------
+def _sync_folder(folder):
+    # Makes a rename durable. Not every platform can open a folder, and then there is nothing to do.
+    try:
+        handle = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(handle)
+    except OSError:
+        pass
+    finally:
+        os.close(handle)
+    return
+
+
+#---------------------------------------------------------------------
+# JOURNAL
+#---------------------------------------------------------------------
+class Journal():
+    """
+    Append-only log of the edits made to a decision since its last snapshot
+
+    Each edit is appended as one small entry, so persisting it costs the size of the change rather
+    than the size of the decision. Entries are written straight away but only forced to disk (fsync)
+    once sync_every entries are waiting or sync_interval seconds have passed since the last sync,
+    checked at each append. An edit is durable once sync() returns; a crash can lose the edits of
+    the last unsynced batch but never corrupts earlier ones.
+
+    Parameters
+    ----------
+    snapshot_path: str
+        the decision's snapshot. The journal is snapshot_path + JOURNAL_SUFFIX.
+
+    sync_every: int
+        most entries written between two fsyncs. 1 syncs every edit.
+
+    sync_interval: float
+        most seconds an entry waits for its fsync, checked when the next entry is appended
+
+    snapshot_every: int
+        Optional. Decision.snapshot is taken automatically once the journal holds this many entries.
+
+    sequence: int
+        sequence number of the last edit already in the snapshot. Numbering carries on from the
+        journal's own last entry when that is larger.
+    """
+    def __init__(self, snapshot_path, sync_every=64, sync_interval=1.0, snapshot_every=None, sequence=0):
+        self.snapshot_path = snapshot_path
+        self.path = snapshot_path + JOURNAL_SUFFIX
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.snapshot_sequence = sequence
+        self.sequence = sequence
+        self.entries = 0
+
+        # A torn last entry from a crash is cut off, so new entries follow the last complete one
+        end = 0
+        for end, edit in _scan(self.path):
+            self.sequence = max(self.sequence, edit['seq'])
+            self.entries += edit['seq'] > sequence
+        self._file = open(self.path, 'ab')
+        if self._file.tell() != end:
+            self._file.truncate(end)
+        self.pending = 0
+        self.syncs = 0
+        self._last_sync = time.monotonic()
+        return
+
+    def append(self, op, **fields):
+        """
+        Writes one edit, syncing when a batch is full
+
+        Parameters
+        ----------
+        op: str
+            one of OPS
+
+        fields:
+            the op's fields, JSON serializable
+
+        Returns
+        -------
+        sequence: int
+            the edit's sequence number
+        """
+        if op not in OPS:
+            raise ValueError(f'{op} is not one of the journal ops {sorted(OPS)}')
+        self.sequence += 1
+        payload = json.dumps(dict(seq=self.sequence, op=op, **fields), separators=(',', ':')).encode('utf-8')
+        self._file.write(ENTRY_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.entries += 1
+        self.pending += 1
+        if self.pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+        return self.sequence
+
+    def sync(self):
+        """
+        Forces every written entry to disk
+        """
+        if self.pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending = 0
+            self.syncs += 1
+        self._last_sync = time.monotonic()
+        return
+
+    def snapshot_due(self):
+        """
+        True once the journal holds snapshot_every entries
+        """
+        return self.snapshot_every is not None and self.entries >= self.snapshot_every
+
+    def reset(self, sequence):
+        """
+        Empties the journal once a snapshot including every edit up to sequence has been written
+        """
+        self.sync()
+        self._file.truncate(0)
+        self._file.seek(0)
+        os.fsync(self._file.fileno())
+        self.snapshot_sequence = sequence
+        self.entries = 0
+        return
+
+    def close(self):
+        """
+        Syncs and closes the journal file
+        """
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return
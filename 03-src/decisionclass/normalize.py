@@ -0,0 +1,210 @@
+import numpy as np
+
+METHODS = ('none', 'minmax', 'rank')
+
+#---------------------------------------------------------------------
+# FEATURE SCALER
+#---------------------------------------------------------------------
+class FeatureScaler():
+    """
+    Puts raw feature columns on the 0-10 rating scale
+
+    Every feature has its own method:
+        'none'    ratings are already out of 10 and are left alone
+        'minmax'  the smallest value becomes 0 and the largest becomes 10
+        'rank'    each value becomes its percentile rank among the fitted values, times 10
+    Features that are lower-is-better (sodium, calories, ...) are flipped afterwards, so 10 is always best.
+
+    The fitted parameters are kept, so new options are rated on the same scale without refitting.
+
+    Parameters
+    ----------
+    features: list
+        feature names, one per column
+
+    methods: str or dict
+        one method for every feature, or key value pairs of feature and method.
+        Features left out of the dict use 'none'.
+
+    lower_is_better: list
+        features where a smaller raw value is better
+
+    n_quantiles: int
+        most reference points kept per 'rank' feature
+    """
+    def __init__(self, features, methods='minmax', lower_is_better=(), n_quantiles=1001):
+        self.features = list(features)
+        if isinstance(methods, str):
+            methods = dict.fromkeys(self.features, methods)
+        for feature, method in methods.items():
+            if method not in METHODS:
+                raise ValueError(f'Unknown normalization method {method} for {feature}. Use one of {METHODS}.')
+            if feature not in self.features:
+                raise KeyError(f'{feature} is not a feature')
+        unknown = set(lower_is_better).difference(self.features)
+        if unknown:
+            raise KeyError(f'{sorted(unknown)} are not features')
+
+        self.methods = np.array([methods.get(feature, 'none') for feature in self.features])
+        self.lower_is_better = np.array([feature in lower_is_better for feature in self.features], dtype=bool)
+        self.n_quantiles = n_quantiles
+        self.minimum = np.zeros(len(self.features))
+        self.maximum = np.full(len(self.features), 10.0)
+        self.quantiles = np.zeros((0, len(self.features)))
+        return
+
+    def fit(self, ratings):
+        """
+        Learns each feature's range and percentiles. Missing (NaN) ratings are ignored.
+
+        Parameters
+        ----------
+        ratings: ndarray
+            2-D array of raw values, one column per feature
+        """
+        ratings = np.asarray(ratings)
+        if ratings.dtype.kind != 'f':
+            ratings = ratings.astype(np.float32)
+        scaled = self.methods != 'none'
+        if len(ratings) and scaled.any():
+            self.minimum[scaled] = np.nanmin(ratings[:, scaled], axis=0)
+            self.maximum[scaled] = np.nanmax(ratings[:, scaled], axis=0)
+
+        ranked = np.flatnonzero(self.methods == 'rank')
+        n_quantiles = max(min(self.n_quantiles, len(ratings)), 2)
+        self.quantiles = np.zeros((n_quantiles, len(self.features)))
+        if len(ratings) and len(ranked):
+            self.quantiles[:, ranked] = np.nanquantile(ratings[:, ranked], np.linspace(0, 1, n_quantiles), axis=0)
+        return self
+
+    def transform(self, ratings):
+        """
+        Rates raw values out of 10 with the fitted parameters
+
+        Parameters
+        ----------
+        ratings: ndarray
+            2-D array of raw values, one column per feature
+
+        Returns
+        -------
+        scaled: ndarray
+            float32 array of ratings out of 10. Values outside the fitted range are clipped.
+        """
+        scaled = np.array(ratings, dtype=np.float32)
+
+        columns = np.flatnonzero(self.methods == 'minmax')
+        if len(columns):
+            spread = self.maximum[columns] - self.minimum[columns]
+            constant = spread == 0
+            values = (scaled[:, columns] - self.minimum[columns])/np.where(constant, 1, spread)*10
+            # Features where every fitted value was the same rate everything as 10
+            values[:, constant] = np.where(np.isnan(values[:, constant]), np.nan, 10)
+            scaled[:, columns] = np.clip(values, 0, 10)
+
+        percentiles = np.linspace(0, 10, len(self.quantiles))
+        for column in np.flatnonzero(self.methods == 'rank'):
+            values = scaled[:, column]
+            scaled[:, column] = np.where(np.isnan(values), np.nan, np.interp(values, self.quantiles[:, column], percentiles))
+
+        flipped = np.flatnonzero(self.lower_is_better)
+        scaled[:, flipped] = 10 - scaled[:, flipped]
+        return scaled
+
+    def scale_bounds(self, feature, low, high):
+        """
+        Puts a range of raw values on the 0-10 scale, so scaled ratings can be filtered by raw limits.
+        Exact up to float32 rounding for 'none' and 'minmax', to the resolution of the fitted percentiles for 'rank'.
+
+        Parameters
+        ----------
+        feature: str
+            feature the range is on
+
+        low, high: float
+            raw range, with -inf and inf for open ends
+
+        Returns
+        -------
+        low, high: float
+            the same range in ratings out of 10
+        """
+        column = self.features.index(feature)
+        method = self.methods[column]
+        bounds = np.array([low, high], dtype=float)
+        if method == 'minmax':
+            spread = self.maximum[column] - self.minimum[column]
+            if spread == 0:
+                # Every option rates 10, so the range keeps all of them or none
+                keep = low <= self.minimum[column] <= high
+                bounds = np.array([-np.inf, np.inf]) if keep else np.array([np.inf, -np.inf])
+            else:
+                bounds = (bounds - self.minimum[column])/spread*10
+        elif method == 'rank':
+            quantiles = self.quantiles[:, column]
+            scaled = np.interp(bounds, quantiles, np.linspace(0, 10, len(quantiles)))
+            bounds = np.where(bounds < quantiles[0], -np.inf, np.where(bounds > quantiles[-1], np.inf, scaled))
+
+        if self.lower_is_better[column]:
+            bounds = 10 - bounds[::-1]
+        # Scaled ratings are float32, so values right at a limit may land a rounding error either side of it
+        return bounds[0] - 1e-5, bounds[1] + 1e-5
+
+    def select(self, features, missing='raise'):
+        """
+        A scaler for some of the features, in the order given, with the same fitted parameters
+
+        Parameters
+        ----------
+        features: list
+            features of the new scaler
+
+        missing: str
+            'raise' for a ValueError naming any feature this scaler was not fitted on,
+            or 'none' to leave those features alone like method 'none'
+
+        Returns
+        -------
+        scaler: FeatureScaler
+        """
+        if missing not in ('raise', 'none'):
+            raise ValueError(f"missing must be 'raise' or 'none', not {missing!r}")
+        columns = {feature: column for column, feature in enumerate(self.features)}
+        unknown = [feature for feature in features if feature not in columns]
+        if unknown and missing == 'raise':
+            raise ValueError(f'The scaler was not fitted on {unknown}. It covers {self.features}.')
+
+        params = self.to_dict()
+        defaults = {'methods': 'none', 'lower_is_better': False, 'minimum': 0.0, 'maximum': 10.0}
+        for key, default in defaults.items():
+            params[key] = [params[key][columns[feature]] if feature in columns else default for feature in features]
+        params['features'] = list(features)
+        quantiles = np.zeros((len(self.quantiles), len(features)))
+        for position, feature in enumerate(features):
+            if feature in columns:
+                quantiles[:, position] = self.quantiles[:, columns[feature]]
+        params['quantiles'] = quantiles
+        return FeatureScaler.from_dict(params)
+
+    def to_dict(self):
+        """
+        The fitted parameters as plain lists, for saving with the decision
+        """
+        return {'features': self.features, 'methods': self.methods.tolist(),
+                'lower_is_better': self.lower_is_better.tolist(), 'n_quantiles': self.n_quantiles,
+                'minimum': self.minimum.tolist(), 'maximum': self.maximum.tolist(),
+                'quantiles': self.quantiles.tolist()}
+
+    @classmethod
+    def from_dict(cls, params):
+        """
+        Rebuilds a fitted scaler from to_dict output
+        """
+        features = params['features']
+        scaler = cls(features, dict(zip(features, params['methods'])),
+                     [feature for feature, lower in zip(features, params['lower_is_better']) if lower],
+                     params['n_quantiles'])
+        scaler.minimum = np.array(params['minimum'], dtype=float)
+        scaler.maximum = np.array(params['maximum'], dtype=float)
+        scaler.quantiles = np.array(params['quantiles'], dtype=float).reshape(-1, len(features))
+        return scaler
@@ -0,0 +1,169 @@
+from itertools import combinations
+import numpy as np
+
+# Number of set bits in every byte value
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+# Venn diagram regions in the order matplotlib_venn expects subset sizes
+VENN2_REGIONS = ('10', '01', '11')
+VENN3_REGIONS = ('100', '010', '110', '001', '101', '011', '111')
+
+#---------------------------------------------------------------------
+def popcount(packed):
+    """
+    Counts the set bits along the last axis of a uint8 bit array
+    """
+    return _POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+
+
+#---------------------------------------------------------------------
+# OVERLAP INDEX
+#---------------------------------------------------------------------
+class OverlapIndex():
+    """
+    Precomputed index of which options share exact ratings, for Venn diagram style comparisons
+
+    Two options overlap on a feature when they have exactly the same rating for it, which is
+    what the "feature:rating" strings in create_venn2 and create_venn3 compare. Every distinct
+    (feature, rating) pair gets one bit. Each option's ratings become a packed bit row with one
+    bit set per feature, and each (feature, rating) pair has a packed bitset over the options.
+    Region counts for any pair or triple are then a few ANDs and popcounts.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features). Missing (NaN) ratings never overlap.
+    """
+    def __init__(self, ratings):
+        ratings = np.asarray(ratings, dtype=float)
+        n_options, n_features = ratings.shape
+        self.n_features = n_features
+
+        # Code each feature's distinct ratings 0, 1, 2, ... with -1 for missing
+        self.codes = np.full(ratings.shape, -1, dtype=np.int32)
+        self.slot_values = []
+        offsets = [0]
+        for column in range(n_features):
+            present = ~np.isnan(ratings[:, column])
+            values, inverse = np.unique(ratings[present, column], return_inverse=True)
+            self.codes[present, column] = inverse
+            self.slot_values.append(values)
+            offsets.append(offsets[-1] + len(values))
+        self.offsets = np.array(offsets[:-1], dtype=np.int64)
+        self.n_slots = offsets[-1]
+
+        rows, columns = np.nonzero(self.codes >= 0)
+        bits = np.zeros((n_options, self.n_slots), dtype=bool)
+        bits[rows, self.offsets[columns] + self.codes[rows, columns]] = True
+        self.option_bits = np.packbits(bits, axis=1)
+        self.slot_bits = np.packbits(bits.T, axis=1)
+        self.present = (self.codes >= 0).sum(axis=1)
+        return
+
+    def options_with(self, column, rating):
+        """
+        Rows of every option with exactly this rating on this feature column
+        """
+        matches = np.flatnonzero(self.slot_values[column] == rating)
+        if not len(matches):
+            return np.empty(0, dtype=np.intp)
+        slot = self.offsets[column] + matches[0]
+        return np.flatnonzero(np.unpackbits(self.slot_bits[slot], count=len(self.codes)))
+
+    def shared(self, *rows):
+        """
+        Number of features on which every one of the given options has the same rating
+        """
+        anded = self.option_bits[rows[0]]
+        for row in rows[1:]:
+            anded = anded & self.option_bits[row]
+        return int(popcount(anded))
+
+    def pair_counts(self, a, b):
+        """
+        Venn diagram region sizes for two options, in VENN2_REGIONS order
+        """
+        both = self.shared(a, b)
+        return (int(self.present[a]) - both, int(self.present[b]) - both, both)
+
+    def triple_counts(self, a, b, c):
+        """
+        Venn diagram region sizes for three options, in VENN3_REGIONS order
+        """
+        return tuple(int(count) for count in self._triple_regions(
+            np.array([[a, b, c]]), self.option_bits, self.present)[0])
+
+    def _triple_regions(self, triples, option_bits, present, pairwise=None):
+        a, b, c = triples[:, 0], triples[:, 1], triples[:, 2]
+        if pairwise is None:
+            ab = popcount(option_bits[a] & option_bits[b])
+            ac = popcount(option_bits[a] & option_bits[c])
+            bc = popcount(option_bits[b] & option_bits[c])
+        else:
+            ab, ac, bc = pairwise[a, b], pairwise[a, c], pairwise[b, c]
+        abc = popcount(option_bits[a] & option_bits[b] & option_bits[c])
+        # Inclusion-exclusion from the pairwise and three-way overlaps
+        return np.stack([present[a] - ab - ac + abc,
+                         present[b] - ab - bc + abc,
+                         ab - abc,
+                         present[c] - ac - bc + abc,
+                         ac - abc,
+                         bc - abc,
+                         abc], axis=1)
+
+    def pairwise_overlaps(self, rows=None, block_size=256):
+        """
+        Number of shared exact ratings for every pair of options
+
+        Parameters
+        ----------
+        rows: ndarray
+            options to compare. Default compares every option.
+
+        block_size: int
+            rows compared at a time, bounding memory to block_size x options x features booleans
+
+        Returns
+        -------
+        overlaps: ndarray
+            2-D uint16 array. overlaps[i, j] is the number of features options i and j rate identically.
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        valid = codes >= 0
+        overlaps = np.empty((len(codes), len(codes)), dtype=np.uint16)
+        for start in range(0, len(codes), block_size):
+            block = codes[start:start + block_size, None, :]
+            same = (block == codes[None, :, :]) & valid[None, :, :]
+            overlaps[start:start + block_size] = same.sum(axis=2)
+        return overlaps
+
+    def triple_overlaps(self, rows=None, block_size=65536):
+        """
+        Venn diagram region sizes for every triple of options
+
+        Parameters
+        ----------
+        rows: ndarray
+            options to compare. Default compares every option. The number of triples grows with
+            the cube of the number of options, so pass a subset for large catalogs.
+
+        block_size: int
+            triples counted at a time
+
+        Returns
+        -------
+        triples: ndarray
+            2-D array of shape (number of triples, 3) with positions into rows, in combinations order
+
+        counts: ndarray
+            2-D array of shape (number of triples, 7) with region sizes in VENN3_REGIONS order
+        """
+        option_bits = self.option_bits if rows is None else self.option_bits[rows]
+        present = self.present if rows is None else self.present[rows]
+        pairwise = self.pairwise_overlaps(rows).astype(np.int64)
+        triples = np.array(list(combinations(range(len(option_bits)), 3)), dtype=np.intp).reshape(-1, 3)
+        counts = np.empty((len(triples), 7), dtype=np.int64)
+        for start in range(0, len(triples), block_size):
+            counts[start:start + block_size] = self._triple_regions(
+                triples[start:start + block_size], option_bits, present, pairwise)
+        return triples, counts
@@ -0,0 +1,335 @@
+import numpy as np
+from .scoring import calculate_scores
+from .instrument import instrumented
+
+METRICS = ('score_difference', 'features_won', 'features_lost', 'features_tied', 'margin')
+
+# Bytes per entry of each metric's result block
+_METRIC_BYTES = {'score_difference': 8, 'features_won': 4, 'features_lost': 4, 'features_tied': 4, 'margin': 4}
+
+#---------------------------------------------------------------------
+# PAIRWISE MATRIX
+#---------------------------------------------------------------------
+class PairwiseMatrix():
+    """
+    Compares every pair of options on scores and features, one block of options at a time
+
+    Metrics, for row option A against column option B:
+        'score_difference'  A's score minus B's score, out of 10
+        'features_won'      number of features A is rated higher on than B
+        'features_lost'     number of features B is rated higher on than A
+        'features_tied'     number of features both rate identically, the middle of the Venn diagram
+        'margin'            percent importance of the features A wins minus that of the features B wins,
+                            from -1 (B better on everything that matters) to 1
+    A missing (NaN) rating neither wins, loses nor ties. features_won is the transpose of features_lost,
+    score_difference and margin change sign with the transpose. The diagonal of features_tied is
+    the number of features each option has a rating for.
+
+    Each feature's distinct ratings are coded 0, 1, 2, ... like in OverlapIndex, so every option has
+    an "exactly this rating" indicator per (feature, rating) slot. Features won, lost, tied and the
+    margin over a block of options are then each one matrix multiply of the block's "rated above",
+    "rated below" or "exactly" indicators with the "exactly" indicators of every other option:
+    one BLAS call per metric and block rather than a loop over pairs. Only the rating codes are
+    kept; the indicators are built from them for each block of rows and columns. When the features
+    have more than max_slots distinct ratings in total (e.g. unrounded raw values), each block
+    compares one feature at a time instead.
+
+    The full matrix of 50k options is billions of entries, so results come in blocks. A block's
+    results, its row indicators and the column indicators it is multiplied with stay within
+    max_block_bytes. matrix() keeps the whole thing and is meant for the few options being plotted;
+    majority_wins reduces each block as it goes, and against and beating only compare with one option.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+
+    weights: ndarray
+        percent importance of each feature, used by 'margin'
+
+    scores: ndarray
+        Optional score of each option, e.g. Decision.score_options(). Default is ratings times weights.
+
+    max_slots: int
+        most (feature, rating) slots compared by matrix multiply
+
+    max_block_bytes: int
+        most bytes of results and indicators held at once by a block
+    """
+    def __init__(self, ratings, weights, scores=None, max_slots=4096, max_block_bytes=2**26):
+        ratings = np.asarray(ratings)
+        self.weights = np.asarray(weights, dtype=float)
+        self.scores = calculate_scores(ratings, self.weights) if scores is None else np.asarray(scores, dtype=float)
+        self.max_block_bytes = max_block_bytes
+        self.n_options, self.n_features = ratings.shape
+        self.ratings = ratings.astype(np.float32)
+        present = ~np.isnan(self.ratings)
+
+        # Code each feature's distinct ratings 0, 1, 2, ... with -1 for missing
+        codes = np.full(ratings.shape, -1, dtype=np.int32)
+        sizes = []
+        for column in range(self.n_features):
+            values, inverse = np.unique(self.ratings[present[:, column], column], return_inverse=True)
+            codes[present[:, column], column] = inverse
+            sizes.append(len(values))
+        self.n_slots = int(sum(sizes))
+        if self.n_slots > max_slots:
+            self.codes = None
+            return
+
+        self.codes = codes
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        self.slot_feature = np.repeat(np.arange(self.n_features), sizes)
+        self.slot_code = np.concatenate([np.arange(size) for size in sizes]) if sizes else np.zeros(0, dtype=int)
+        return
+
+    def _rows(self, rows):
+        return np.arange(self.n_options) if rows is None else np.asarray(rows, dtype=np.intp)
+
+    def _exact(self, rows):
+        # exact[i, s] is 1 when option i is rated exactly the slot's rating on the slot's feature
+        codes = self.codes[rows]
+        options, columns = np.nonzero(codes >= 0)
+        exact = np.zeros((len(rows), self.n_slots), dtype=np.float32)
+        exact[options, self.offsets[columns] + codes[options, columns]] = 1
+        return exact
+
+    def _column_step(self):
+        # Columns whose indicators take at most half of max_block_bytes, leaving the rest to the rows
+        return max(1, self.max_block_bytes//(8*max(self.n_slots, 1)))
+
+    def _above_below(self, rows):
+        # above[i, s] is 1 when option i is rated higher on the slot's feature than the slot's rating,
+        # below[i, s] when it is rated lower. Missing ratings are neither.
+        codes = self.codes[rows][:, self.slot_feature]
+        above = (codes > self.slot_code).astype(np.float32)
+        below = ((codes < self.slot_code) & (codes >= 0)).astype(np.float32)
+        return above, below
+
+    def block(self, rows=None, columns=None, metrics=METRICS):
+        """
+        Metrics of the rows options against the columns options, computed in one go
+
+        Parameters
+        ----------
+        rows, columns: ndarray
+            options to compare. Default is every option.
+
+        metrics: tuple
+            metrics to compute, from METRICS
+
+        Returns
+        -------
+        block: dict
+            metric name to a 2-D array of shape (rows, columns). Counts are int32,
+            margin float32 and score_difference float64.
+        """
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f'Unknown pairwise metrics {sorted(unknown)}. Use any of {METRICS}.')
+        return self._block(self._rows(rows), self._rows(columns), metrics)
+
+    def _slices(self, columns):
+        # (start, transposed exact indicators) of each slice of columns
+        step = self._column_step()
+        for start in range(0, len(columns), step):
+            yield start, self._exact(columns[start:start + step]).T
+
+    def _block(self, rows, columns, metrics, slices=None):
+        # slices can be the column indicators already built by _slices, to reuse them across row blocks
+        block = {}
+        if 'score_difference' in metrics:
+            block['score_difference'] = self.scores[rows, None] - self.scores[None, columns]
+        if self.codes is None:
+            block.update(self._compare_features(rows, columns, metrics))
+            return {metric: block[metric] for metric in metrics}
+
+        # A beats B on a feature when A is above the slot B is exactly on, and loses when A is below it.
+        # Every row indicator is multiplied with the exact indicators of one slice of columns at a time.
+        indicators = {}
+        if {'features_won', 'features_lost', 'margin'} & set(metrics):
+            above, below = self._above_below(rows)
+            if 'features_won' in metrics:
+                indicators['features_won'] = above
+            if 'features_lost' in metrics:
+                indicators['features_lost'] = below
+            if 'margin' in metrics:
+                indicators['margin'] = (above - below)*self.weights[self.slot_feature].astype(np.float32)
+        if 'features_tied' in metrics:
+            indicators['features_tied'] = self._exact(rows)
+        for metric in indicators:
+            block[metric] = np.empty((len(rows), len(columns)), dtype=np.float32 if metric == 'margin' else np.int32)
+        for start, exact in self._slices(columns) if slices is None else slices:
+            for metric, row_indicators in indicators.items():
+                block[metric][:, start:start + exact.shape[1]] = row_indicators @ exact
+        return {metric: block[metric] for metric in metrics}
+
+    def _compare_features(self, rows, columns, metrics):
+        # One feature at a time, for ratings with too many distinct values to code
+        shape = (len(rows), len(columns))
+        counts = {metric: np.zeros(shape, dtype=np.int32) for metric in ('features_won', 'features_lost', 'features_tied')}
+        margin = np.zeros(shape, dtype=np.float32)
+        for feature in range(self.n_features):
+            a = self.ratings[rows, feature, None]
+            b = self.ratings[None, columns, feature]
+            greater, less = a > b, a < b
+            counts['features_won'] += greater
+            counts['features_lost'] += less
+            if 'features_tied' in metrics:
+                counts['features_tied'] += a == b
+            if 'margin' in metrics and self.weights[feature]:
+                margin += np.float32(self.weights[feature])*(greater.astype(np.float32) - less)
+        return dict(counts, margin=margin)
+
+    def block_rows(self, n_columns, metrics=METRICS):
+        """
+        Rows per block so that a block against n_columns options stays within max_block_bytes
+        """
+        row_bytes = n_columns*sum(_METRIC_BYTES[metric] for metric in metrics)
+        budget = self.max_block_bytes
+        if self.codes is None:
+            # Comparison booleans and a float32 margin step per feature
+            row_bytes += 7*n_columns
+        else:
+            # Rating codes, the above, below, weighted and exact indicators of every slot,
+            # and one float32 product per column of a slice, after the slice's column indicators
+            step = min(n_columns, self._column_step())
+            row_bytes += 24*self.n_slots + 4*step
+            budget -= 4*self.n_slots*step
+        return max(1, budget//max(row_bytes, 1))
+
+    def blocks(self, rows=None, columns=None, metrics=METRICS):
+        """
+        Every row option against the columns options, one block of rows at a time
+
+        Yields
+        ------
+        start: int
+            position in rows of the block's first row
+
+        block: dict
+            see block
+        """
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f'Unknown pairwise metrics {sorted(unknown)}. Use any of {METRICS}.')
+        rows = self._rows(rows)
+        columns = self._rows(columns)
+        step = self.block_rows(len(columns), metrics)
+        # Column indicators that fit in one slice are built once for every block of rows
+        slices = None
+        if self.codes is not None and len(columns) <= self._column_step():
+            slices = list(self._slices(columns))
+        for start in range(0, len(rows), step):
+            yield start, self._block(rows[start:start + step], columns, metrics, slices)
+        return
+
+    @instrumented('PairwiseMatrix.matrix', rows=lambda result, self, rows=None, *args, **kwargs:
+                  self.n_options if rows is None else len(rows))
+    def matrix(self, rows=None, metrics=METRICS):
+        """
+        The full options by options matrix of every metric. Memory grows with the square of the options.
+
+        Parameters
+        ----------
+        rows: ndarray
+            options to compare with each other. Default compares every option.
+
+        metrics: tuple
+            metrics to compute, from METRICS
+
+        Returns
+        -------
+        matrix: dict
+            metric name to a square 2-D array, see block
+        """
+        matrix = None
+        rows = None if rows is None else self._rows(rows)
+        for start, block in self.blocks(rows, rows, metrics):
+            if matrix is None:
+                n = self.n_options if rows is None else len(rows)
+                matrix = {metric: np.empty((n, n), dtype=values.dtype) for metric, values in block.items()}
+            for metric, values in block.items():
+                matrix[metric][start:start + len(values)] = values
+        if matrix is None:
+            matrix = {metric: np.empty((0, 0)) for metric in metrics}
+        return matrix
+
+    def against(self, option, rows=None, metrics=METRICS):
+        """
+        Every option compared with one option
+
+        Parameters
+        ----------
+        option: int
+            row of the option compared against
+
+        rows: ndarray
+            options to compare with it. Default is every option.
+
+        Returns
+        -------
+        comparison: dict
+            metric name to a 1-D array with one entry per row, e.g. 'features_won' is how many
+            features each option beats the given option on
+        """
+        # Against a single option, comparing the ratings feature by feature is cheaper than the slot indicators
+        rows = self._rows(rows)
+        comparison = self._compare_features(rows, [option], metrics)
+        comparison['score_difference'] = self.scores[rows, None] - self.scores[option]
+        return {metric: comparison[metric][:, 0] for metric in metrics}
+
+    @instrumented('PairwiseMatrix.beating', rows=lambda result, self, option, k=None, rows=None:
+                  self.n_options if rows is None else len(rows))
+    def beating(self, option, k=None, rows=None):
+        """
+        Options that beat one option on the most features
+
+        Parameters
+        ----------
+        option: int
+            row of the option to beat
+
+        k: int
+            Most options returned. Default returns every option that wins at least one feature.
+
+        rows: ndarray
+            options to search. Default searches every option.
+
+        Returns
+        -------
+        winners: ndarray
+            rows of the options winning at least one feature, the most features won first,
+            then the largest margin, then the earlier option
+
+        comparison: dict
+            'features_won', 'features_lost' and 'margin' of each winner against the option
+        """
+        rows = self._rows(rows)
+        comparison = self.against(option, rows, ('features_won', 'features_lost', 'margin'))
+        keep = np.flatnonzero((comparison['features_won'] > 0) & (rows != option))
+        order = keep[np.lexsort((keep, -comparison['margin'][keep], -comparison['features_won'][keep]))]
+        if k is not None:
+            order = order[:k]
+        return rows[order], {metric: values[order] for metric, values in comparison.items()}
+
+    @instrumented('PairwiseMatrix.majority_wins', rows=lambda result, *args, **kwargs: len(result))
+    def majority_wins(self, rows=None):
+        """
+        Number of other options each option beats on more features than it loses, in one pass over the blocks
+
+        Parameters
+        ----------
+        rows: ndarray
+            options to compare with each other. Default compares every option.
+
+        Returns
+        -------
+        wins: ndarray
+            1-D int64 array, one count per row
+        """
+        rows = None if rows is None else self._rows(rows)
+        wins = np.zeros(self.n_options if rows is None else len(rows), dtype=np.int64)
+        for start, block in self.blocks(rows, rows, ('features_won', 'features_lost')):
+            wins[start:start + len(block['features_won'])] = (block['features_won'] > block['features_lost']).sum(axis=1)
+        return wins
@@ -0,0 +1,147 @@
+import mmap
+import os
+import tempfile
+import numpy as np
+from .scoring import calculate_scores, top_k_scores
+
+# Memory maps opened by this worker process, so each shard file is only opened once per worker
+_open_ratings = {}
+
+#---------------------------------------------------------------------
+def _shard(source, start, stop):
+    filename, offset, dtype, shape = source
+    key = (filename, offset)
+    if key not in _open_ratings:
+        _open_ratings[key] = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+    return _open_ratings[key][start:stop]
+
+
+#---------------------------------------------------------------------
+def _score_shard(source, start, stop, weights):
+    return calculate_scores(_shard(source, start, stop), weights)
+
+
+#---------------------------------------------------------------------
+def _top_k_shard(source, start, stop, weights, k):
+    scores = calculate_scores(_shard(source, start, stop), weights)
+    ranking = top_k_scores(scores, k)
+    return ranking + start, scores[ranking]
+
+
+#---------------------------------------------------------------------
+# PARALLEL SCORER
+#---------------------------------------------------------------------
+class ParallelScorer():
+    """
+    Scores a very large rating matrix across a pool of worker processes
+
+    Workers never receive the ratings through pickling. A memory-mapped matrix (e.g. from
+    Decision.load) is opened by every worker straight from its file. Any other matrix is written
+    once to a temporary file that the workers memory-map, so the page cache is shared by all of them.
+    Each worker scores and ranks its own shard of rows, and only the per-shard top k come back.
+
+    Use as a context manager, or call close() when done:
+
+        with ParallelScorer(decision.rating_matrix, workers=8) as scorer:
+            ranking, scores = scorer.top_k(weights, 10)
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+
+    workers: int
+        Number of worker processes. Default is os.cpu_count().
+
+    shards: int
+        Number of row shards. Default is four per worker, so faster workers pick up the slack.
+    """
+    def __init__(self, ratings, workers=None, shards=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.n_shards = shards or 4*self.workers
+        self._tmp_path = None
+
+        # Only a whole memory map is read straight from its file. Slices and copies go through a temporary file.
+        if isinstance(ratings, np.memmap) and isinstance(ratings.base, mmap.mmap) and ratings.filename:
+            filename, offset = ratings.filename, ratings.offset
+        else:
+            ratings = np.ascontiguousarray(ratings)
+            handle, self._tmp_path = tempfile.mkstemp(suffix='.ratings')
+            with os.fdopen(handle, 'wb') as f:
+                f.write(ratings.tobytes())
+            filename, offset = self._tmp_path, 0
+        self.shape = ratings.shape
+        self.source = (filename, offset, ratings.dtype.str, ratings.shape)
+
+        bounds = np.linspace(0, self.shape[0], min(self.n_shards, max(self.shape[0], 1)) + 1).astype(int)
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+        # Imported here so that importing the package does not load multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return
+
+    def scores(self, weights):
+        """
+        Scores every option
+
+        Parameters
+        ----------
+        weights: ndarray
+            importance of each feature
+
+        Returns
+        -------
+        scores: ndarray
+            one score per option
+        """
+        weights = np.asarray(weights, dtype=float)
+        futures = [self.pool.submit(_score_shard, self.source, start, stop, weights) for start, stop in self.shards]
+        return np.concatenate([future.result() for future in futures]) if futures else np.zeros(0)
+
+    def top_k(self, weights, k):
+        """
+        Finds the k best options. Gives the same result as top_k_scores on the full score array.
+
+        Parameters
+        ----------
+        weights: ndarray
+            importance of each feature
+
+        k: int
+            number of options to return
+
+        Returns
+        -------
+        ranking: ndarray
+            row numbers of the k best options, best first
+
+        top_scores: ndarray
+            the matching scores
+        """
+        weights = np.asarray(weights, dtype=float)
+        futures = [self.pool.submit(_top_k_shard, self.source, start, stop, weights, k) for start, stop in self.shards]
+        results = [future.result() for future in futures]
+        if not results:
+            return np.empty(0, dtype=np.intp), np.zeros(0)
+
+        # Merge the shard winners. Putting them back in row order keeps ties in row order.
+        candidates = np.concatenate([ranking for ranking, _ in results])
+        candidate_scores = np.concatenate([scores for _, scores in results])
+        order = np.argsort(candidates, kind='stable')
+        candidates, candidate_scores = candidates[order], candidate_scores[order]
+        best = top_k_scores(candidate_scores, k)
+        return candidates[best], candidate_scores[best]
+
+    def close(self):
+        self.pool.shutdown()
+        if self._tmp_path is not None:
+            os.remove(self._tmp_path)
+            self._tmp_path = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,154 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+#---------------------------------------------------------------------
+def _front_2d(points):
+    # Sort by the first feature, best first, then sweep keeping options that beat every better-placed one on the second
+    x, y = points[:, 0], points[:, 1]
+    order = np.lexsort((-y, -x))
+    xs, ys = x[order], y[order]
+    first = np.r_[True, xs[1:] != xs[:-1]]
+    # Rows are unique, so only the first (highest y) option of each x can be on the front
+    # The first group has nothing placed before it, so it is kept even when its second feature is -inf (missing)
+    group_best = ys[first]
+    keep = np.r_[True, group_best[1:] > np.maximum.accumulate(group_best)[:-1]] if len(group_best) else first[:0]
+    front = np.zeros(len(points), dtype=bool)
+    front[order[first][keep]] = True
+    return front
+
+
+#---------------------------------------------------------------------
+def _front_3d(points):
+    # Sweep from the best first feature down, keeping a staircase of the best (second, third) pairs seen so far.
+    # The staircase is sorted by the second feature going up, so its third feature goes down.
+    order = np.lexsort((-points[:, 2], -points[:, 1], -points[:, 0]))
+    x = points[order, 0]
+    starts = np.flatnonzero(np.r_[True, x[1:] != x[:-1]])
+    stops = np.r_[starts[1:], len(order)]
+    stair_y, stair_z = [], []
+    front = np.zeros(len(points), dtype=bool)
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        rows = order[start:stop]
+        # Options tied on the first feature only compete on the other two
+        if len(rows) > 1:
+            rows = rows[_front_2d(points[rows, 1:])]
+        kept = []
+        for row in rows.tolist():
+            y, z = points[row, 1], points[row, 2]
+            i = bisect_left(stair_y, y)
+            # Anything already on the staircase is better on the first feature
+            if i < len(stair_y) and stair_z[i] >= z:
+                continue
+            kept.append(row)
+        for row in kept:
+            y, z = points[row, 1], points[row, 2]
+            stop_at = bisect_right(stair_y, y)
+            start_at = stop_at
+            while start_at > 0 and stair_z[start_at - 1] <= z:
+                start_at -= 1
+            stair_y[start_at:stop_at] = [y]
+            stair_z[start_at:stop_at] = [z]
+        front[kept] = True
+    return front
+
+
+#---------------------------------------------------------------------
+def _dominated_by(front, block, max_bytes):
+    # True for block rows that some front row is at least as good as on every feature.
+    # One feature at a time keeps the temporary to rows x front booleans.
+    dominated = np.zeros(len(block), dtype=bool)
+    chunk = max(1, max_bytes//max(len(block), 1))
+    for first in range(0, front.shape[1], chunk):
+        part = front[:, first:first + chunk]
+        beaten = part[0][None, :] >= block[:, 0][:, None]
+        for feature in range(1, len(part)):
+            beaten &= part[feature][None, :] >= block[:, feature][:, None]
+        dominated |= beaten.any(axis=1)
+    return dominated
+
+
+#---------------------------------------------------------------------
+def _front_bnl(points, block_size=1024, max_bytes=1 << 24):
+    # Sort-filter-skyline: an option can only be dominated by one with a larger sum, so after sorting by
+    # sum each block of options is compared with the front found so far and with itself, never with later ones
+    # Missing (-inf) ratings are summed as one below the worst rating, so a dominating option still has
+    # the larger sum; with -inf every option missing a rating would tie at -inf whatever its other ratings
+    finite = points[np.isfinite(points)]
+    low = finite.min() - 1 if len(finite) else 0.0
+    order = np.argsort(-np.nan_to_num(points, neginf=low).sum(axis=1), kind='stable')
+    # The front is kept feature-major so every comparison reads one contiguous row
+    front = np.empty((points.shape[1], 0))
+    front_rows = []
+    for start in range(0, len(order), block_size):
+        rows = order[start:start + block_size]
+        block = points[rows]
+        keep = ~_dominated_by(front, block, max_bytes)
+        rows, block = rows[keep], block[keep]
+
+        # Rows are unique, so at least as good on every feature means better on one
+        beaten = block[:, 0][:, None] >= block[:, 0][None, :]
+        for feature in range(1, block.shape[1]):
+            beaten &= block[:, feature][:, None] >= block[:, feature][None, :]
+        np.fill_diagonal(beaten, False)
+        keep = ~beaten.any(axis=0)
+        front_rows.append(rows[keep])
+        front = np.hstack([front, block[keep].T])
+
+    mask = np.zeros(len(points), dtype=bool)
+    if front_rows:
+        mask[np.concatenate(front_rows)] = True
+    return mask
+
+
+#---------------------------------------------------------------------
+def _unique_rows(points):
+    # Like np.unique(points, axis=0, return_inverse=True), but sorting the columns numerically is far faster
+    order = np.lexsort(points.T[::-1])
+    ordered = points[order]
+    new_row = np.r_[True, (ordered[1:] != ordered[:-1]).any(axis=1)]
+    inverse = np.empty(len(points), dtype=np.intp)
+    inverse[order] = np.cumsum(new_row) - 1
+    return ordered[new_row], inverse
+
+
+#---------------------------------------------------------------------
+def pareto_front(points, lower_is_better=None):
+    """
+    Finds the options no other option beats on every feature
+
+    One option dominates another when it is at least as good on every feature and better on at
+    least one. Options with identical ratings never dominate each other. Identical rows are
+    handled once, then 1 to 3 features use sort-based sweeps (O(n log n)) and more features use
+    a block-nested-loop over the options sorted by their rating sum.
+
+    Parameters
+    ----------
+    points: ndarray
+        2-D array of shape (number of options, number of features). Missing (NaN) ratings count as the worst possible.
+
+    lower_is_better: ndarray
+        optional boolean per feature, True where a smaller value is better
+
+    Returns
+    -------
+    front: ndarray
+        boolean per option, True for options on the Pareto front
+    """
+    points = np.array(points, dtype=float, ndmin=2)
+    if lower_is_better is not None:
+        points[:, np.asarray(lower_is_better, dtype=bool)] *= -1
+    points[np.isnan(points)] = -np.inf
+    if not len(points) or points.shape[1] == 0:
+        return np.ones(len(points), dtype=bool)
+
+    unique, inverse = _unique_rows(points)
+    n_features = unique.shape[1]
+    if n_features == 1:
+        front = unique[:, 0] == unique[:, 0].max()
+    elif n_features == 2:
+        front = _front_2d(unique)
+    elif n_features == 3:
+        front = _front_3d(unique)
+    else:
+        front = _front_bnl(unique)
+    return front[inverse]
@@ -0,0 +1,153 @@
+import json
+import struct
+import numpy as np
+from .ratings import PackedNames, RatingStore
+
+# File layout
+# -----------
+# MAGIC, then the header length as a little-endian uint32, then a JSON header padded with
+# spaces so the binary blocks start on an ALIGNMENT byte boundary. The header records the
+# offset of each block: option name offsets (uint64), option names (UTF-8), then the ratings.
+MAGIC = b'HMDDEC\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+#---------------------------------------------------------------------
+def _aligned(position):
+    return -(-position // ALIGNMENT)*ALIGNMENT
+
+
+#---------------------------------------------------------------------
+def save_store(store, path, feature_list=None, option_list=None, scaler=None, journal_sequence=0):
+    """
+    Writes a rating store to disk in the memory-mappable decision format
+    
+    Parameters
+    ----------
+    store: RatingStore
+        the ratings and importances to save
+        
+    path: str
+        file to write
+        
+    feature_list: list
+        the decision's feature list
+        
+    option_list: list
+        the decision's option list. Only written out when it differs from the store's options.
+        
+    scaler: FeatureScaler
+        the fitted normalization parameters, if any
+        
+    journal_sequence: int
+        number of the last edit journal entry already included, see decisionclass.journal
+    """
+    names = store.options if isinstance(store.options, PackedNames) else PackedNames.from_names(store.options)
+    ratings = np.ascontiguousarray(store.ratings)
+    
+    header = {'version': FORMAT_VERSION,
+              'dtype': ratings.dtype.str,
+              'shape': list(ratings.shape),
+              'features': list(store.features),
+              'rated': store.rated.tolist(),
+              'weighted': store.weighted.tolist(),
+              'values': store.values.tolist(),
+              'percents': store.percents.tolist(),
+              'feature_list': list(feature_list or []),
+              'option_list': None if option_list is None or option_list is store.options or names == option_list
+                             else list(option_list),
+              'scaler': None if scaler is None else scaler.to_dict(),
+              'journal_sequence': journal_sequence}
+    
+    # Block offsets depend on the header length, so settle them before writing
+    header.update(offsets_offset=0, names_offset=0, ratings_offset=0)
+    for _ in range(2):
+        encoded = json.dumps(header).encode('utf-8')
+        position = _aligned(len(MAGIC) + 4 + len(encoded))
+        header['offsets_offset'] = position
+        position = _aligned(position + names.offsets.nbytes)
+        header['names_offset'] = position
+        position = _aligned(position + names.blob.nbytes)
+        header['ratings_offset'] = position
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' '*(header['offsets_offset'] - len(MAGIC) - 4 - len(encoded))
+    
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(encoded)))
+        f.write(encoded)
+        for offset, array in ((header['offsets_offset'], names.offsets),
+                              (header['names_offset'], names.blob),
+                              (header['ratings_offset'], ratings)):
+            f.write(b'\0'*(offset - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    return
+
+
+#---------------------------------------------------------------------
+def read_header(path):
+    """
+    Reads the JSON header of a saved decision
+    
+    Parameters
+    ----------
+    path: str
+        file written by save_store
+        
+    Returns
+    -------
+    header: dict
+        format version, ratings dtype and shape, feature names and importances, and block offsets
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a saved decision')
+        length, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+    if header['version'] > FORMAT_VERSION:
+        raise ValueError(f'{path} uses decision format version {header["version"]}, '
+                         f'this version of decisionclass reads up to version {FORMAT_VERSION}')
+    return header
+
+
+#---------------------------------------------------------------------
+def load_store(path, mode='c'):
+    """
+    Opens a saved decision without reading the ratings or option names into memory
+    
+    Parameters
+    ----------
+    path: str
+        file written by save_store
+        
+    mode: str
+        np.memmap mode. The default 'c' lets ratings be edited in memory without touching the file.
+        
+    Returns
+    -------
+    store: RatingStore
+        store whose ratings and option names are memory-mapped from the file
+        
+    header: dict
+        the file header, including the saved feature_list, option_list and scaler
+    """
+    header = read_header(path)
+    n_options, n_features = header['shape']
+    
+    def block(offset, dtype, shape):
+        if np.prod(shape) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+    
+    offsets = block(header['offsets_offset'], np.uint64, (n_options + 1,))
+    blob = block(header['names_offset'], np.uint8, (int(offsets[-1]) if n_options else 0,))
+    
+    store = RatingStore()
+    store.options = PackedNames(offsets, blob)
+    store.features = list(header['features'])
+    store.ratings = block(header['ratings_offset'], np.dtype(header['dtype']), (n_options, n_features))
+    store.rated = np.array(header['rated'], dtype=bool)
+    store.weighted = np.array(header['weighted'], dtype=bool)
+    store.values = np.array(header['values'], dtype=float)
+    store.percents = np.array(header['percents'], dtype=float)
+    return store, header
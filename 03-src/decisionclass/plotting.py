@@ -0,0 +1,359 @@
+import os
+import re
+from math import pi
+import numpy as np
+from .instrument import instrumented
+
+# matplotlib and matplotlib_venn are only imported once something is drawn,
+# so scoring and loading decisions never pay for them.
+
+KINDS = ('radar', 'venn2', 'venn3')
+FORMATS = ('png', 'svg', 'pdf')
+
+#---------------------------------------------------------------------
+def rating_sets(df, options):
+    """
+    Builds the set of 'feature:rating' strings shown in the Venn diagrams, once per option
+
+    Parameters
+    ----------
+    df: DataFrame
+        df contains all option ratings for each feature
+
+    options: list
+        options to build sets for
+
+    Returns
+    -------
+    sets: dict
+        key value pairs are option and its set of 'feature:rating' strings
+    """
+    features = list(df.index)
+    sets = {}
+    for option in dict.fromkeys(options):
+        sets[option] = {str(feature)+':'+str(value) for feature, value in zip(features, df[option].tolist())}
+    return sets
+
+
+#---------------------------------------------------------------------
+def _set_label(v, region, strings):
+    # Empty regions have no label to fill in
+    label = v.get_label_by_id(region)
+    if label is not None:
+        label.set_text('\n'.join(strings))
+    return
+
+
+#---------------------------------------------------------------------
+def draw_venn2(ax, set_A, set_B, set_labels, subsets=None, title=None):
+    """
+    Draws a 2 circle Venn Diagram of two options' 'feature:rating' sets on ax
+
+    subsets are optional region sizes in venn2 order (10, 01, 11), e.g. from PairwiseMatrix.
+    Default counts the strings. title replaces the default 'Venn Diagram' title.
+    """
+    from matplotlib_venn import venn2
+    v = venn2(subsets if subsets is not None else [set_A, set_B], set_labels=set_labels, ax=ax)
+    _set_label(v, '01', set_B.difference(set_A))
+    _set_label(v, '10', set_A.difference(set_B))
+    _set_label(v, '11', set_B.intersection(set_A))
+    ax.set_title(title or 'Venn Diagram')
+    return v
+
+
+#---------------------------------------------------------------------
+def draw_venn3(ax, set_A, set_B, set_C, set_labels, subsets=None):
+    """
+    Draws a 3 circle Venn Diagram of three options' 'feature:rating' sets on ax
+
+    subsets are optional region sizes in venn3 order (100, 010, 110, 001, 101, 011, 111),
+    e.g. from OverlapIndex.triple_counts. Default counts the strings.
+    """
+    from matplotlib_venn import venn3
+    # Careful! set_A is associated with 100, set_B is associated with 010, set_C is associated with 001
+    regions = {'100': set_A.difference(set_B).difference(set_C),
+               '010': set_B.difference(set_A).difference(set_C),
+               '110': set_A.intersection(set_B).difference(set_C),
+               '001': set_C.difference(set_A).difference(set_B),
+               '101': set_A.intersection(set_C).difference(set_B),
+               '011': set_B.intersection(set_C).difference(set_A),
+               '111': set_A.intersection(set_B).intersection(set_C)}
+    if subsets is None:
+        subsets = tuple(len(strings) for strings in regions.values())
+    v = venn3(subsets=subsets, set_labels=set_labels, ax=ax)
+    for region, strings in regions.items():
+        _set_label(v, region, strings)
+    ax.set_title('Venn Diagram')
+    return v
+
+
+#---------------------------------------------------------------------
+# FIGURE RENDERER
+#---------------------------------------------------------------------
+class FigureRenderer():
+    """
+    Draws radar plots and Venn diagrams straight to files, without a display
+
+    Figures are drawn with the Agg canvas and never go through pyplot, so nothing pops up and
+    nothing is kept alive between plots. The radar figure, its axes, ticks, lines and fills are
+    built once; each radar plot only swaps in the new line data and legend text before saving.
+    For PNG the axes and labels are drawn once and restored from a saved background, so only the
+    options themselves are drawn per plot. Venn layouts change with every set of region sizes,
+    so the Venn figure is kept and its axes cleared.
+
+    Use as a context manager, or call close() when done (this finishes a multi-page PDF).
+
+    Parameters
+    ----------
+    df: DataFrame
+        option_value_df, or any frame with features as rows and options as columns
+
+    output: str
+        directory to write one file per plot to, or a path ending in .pdf for a single multi-page PDF
+
+    format: str
+        'png' or 'svg' when output is a directory
+
+    dpi: int
+        resolution of PNG files
+    """
+    def __init__(self, df, output, format='png', dpi=100):
+        if format not in FORMATS:
+            raise ValueError(f'Unknown figure format {format}. Use one of {FORMATS}.')
+        self.df = df
+        self.features = list(df.index)
+        self.output = output
+        self.dpi = dpi
+        self._radar = None
+        self._venn = None
+        self._pdf = None
+        if output.lower().endswith('.pdf'):
+            from matplotlib.backends.backend_pdf import PdfPages
+            self.format = 'pdf'
+            self._pdf = PdfPages(output)
+        else:
+            self.format = format
+            os.makedirs(output, exist_ok=True)
+        return
+
+    def _save(self, figure, kind, number, options):
+        if self._pdf is not None:
+            self._pdf.savefig(figure)
+            return self.output
+        path = self._path(kind, number, options)
+        figure.savefig(path, dpi=self.dpi)
+        return path
+
+    def _path(self, kind, number, options):
+        name = re.sub(r'[^\w.-]+', '_', '_vs_'.join(str(option) for option in options))[:120]
+        return os.path.join(self.output, f'{kind}-{number:05d}-{name}.{self.format}')
+
+    def _radar_figure(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        figure = Figure(figsize=(8, 8), dpi=self.dpi)
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111, polar=True)
+
+        # Same layout as dual_radar_plot: first axis on top, going clockwise
+        N = len(self.features)
+        angles = np.array([n / float(N) * 2 * pi for n in range(N)] + [0.0])
+        ax.set_theta_offset(pi / 2)
+        ax.set_theta_direction(-1)
+        ax.set_xticks(angles[:-1])
+        ax.set_xticklabels(self.features)
+        ax.set_rlabel_position(0)
+        ax.set_yticks([2, 4, 6, 8])
+        ax.set_yticklabels(["2", "4", "6", "8"], color="grey", size=7)
+        ax.set_ylim(0, 10)
+
+        zeros = np.zeros(len(angles))
+        lines = [ax.plot(angles, zeros, linewidth=1, linestyle='solid')[0] for _ in range(2)]
+        fills = [ax.fill(angles, zeros, 'b', alpha=0.1)[0] for _ in range(2)]
+        title = figure.suptitle('')
+        self._radar = {'figure': figure, 'canvas': canvas, 'ax': ax, 'angles': angles, 'lines': lines,
+                       'fills': fills, 'title': title, 'legend': None, 'shown': 0, 'background': None}
+
+        if self.format == 'png':
+            # Draw the axes, ticks and labels once. Every plot restores them and only draws the options on top.
+            for artist in lines + fills + [title]:
+                artist.set_animated(True)
+            canvas.draw()
+            self._radar['background'] = canvas.copy_from_bbox(figure.bbox)
+        return self._radar
+
+    def _blit_radar(self, radar, number, options):
+        from matplotlib.image import imsave
+        canvas, ax = radar['canvas'], radar['ax']
+        canvas.restore_region(radar['background'])
+        for artist in radar['fills'] + radar['lines'] + [radar['legend'], radar['title']]:
+            if artist.get_visible():
+                ax.draw_artist(artist)
+        path = self._path('radar', number, options)
+        imsave(path, np.asarray(canvas.buffer_rgba()), pil_kwargs={'compress_level': 1})
+        return path
+
+    def radar(self, comparison_pair, number=0, title=None):
+        """
+        Draws one or two options on the radar plot and saves it, with an optional title above it
+
+        Returns
+        -------
+        path: str
+            file written
+        """
+        radar = self._radar or self._radar_figure()
+        angles = radar['angles']
+        comparison_pair = list(comparison_pair)
+        for i, (line, fill) in enumerate(zip(radar['lines'], radar['fills'])):
+            if i < len(comparison_pair):
+                values = self.df[comparison_pair[i]].to_numpy(dtype=float)
+                values = np.append(values, values[:1])
+                line.set_ydata(values)
+                line.set_label(comparison_pair[i])
+                fill.set_xy(np.column_stack([angles, values]))
+            line.set_visible(i < len(comparison_pair))
+            fill.set_visible(i < len(comparison_pair))
+        radar['title'].set_text(title or '')
+
+        # The legend is only rebuilt when the number of options shown changes
+        if radar['shown'] != len(comparison_pair):
+            radar['legend'] = radar['ax'].legend(handles=radar['lines'][:len(comparison_pair)],
+                                                 loc='upper right', bbox_to_anchor=(0.1, 0.1))
+            radar['legend'].set_animated(radar['background'] is not None)
+            radar['shown'] = len(comparison_pair)
+        else:
+            for text, option in zip(radar['legend'].get_texts(), comparison_pair):
+                text.set_text(option)
+        if radar['background'] is not None:
+            return self._blit_radar(radar, number, comparison_pair)
+        return self._save(radar['figure'], 'radar', number, comparison_pair)
+
+    def _venn_axes(self):
+        if self._venn is None:
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=(10, 10))
+            self._venn = (figure, figure.add_subplot(111))
+        figure, ax = self._venn
+        ax.cla()
+        return figure, ax
+
+    def venn2(self, comparison_pair, sets, subsets=None, number=0, title=None):
+        """
+        Draws and saves a 2 circle Venn Diagram from rating_sets output
+        """
+        figure, ax = self._venn_axes()
+        set_A = sets[comparison_pair[0]]
+        set_B = sets[comparison_pair[1]] if len(comparison_pair) > 1 else set_A
+        draw_venn2(ax, set_A, set_B, list(comparison_pair), subsets, title)
+        return self._save(figure, 'venn2', number, comparison_pair)
+
+    def venn3(self, comparison_triple, sets, subsets=None, number=0):
+        """
+        Draws and saves a 3 circle Venn Diagram from rating_sets output
+        """
+        figure, ax = self._venn_axes()
+        set_A = sets[comparison_triple[0]]
+        set_B = sets[comparison_triple[1]] if len(comparison_triple) > 1 else set_A
+        set_C = sets[comparison_triple[2]] if len(comparison_triple) > 2 else set_A
+        draw_venn3(ax, set_A, set_B, set_C, list(comparison_triple), subsets)
+        return self._save(figure, 'venn3', number, comparison_triple)
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+#---------------------------------------------------------------------
+def _render_chunk(df, kind, combos, subsets, titles, first, output, format, dpi):
+    # Runs in a worker process: one renderer, so one reused figure, per chunk
+    with FigureRenderer(df, output, format, dpi) as renderer:
+        return _render(renderer, kind, combos, subsets, titles, first)
+
+
+#---------------------------------------------------------------------
+def _render(renderer, kind, combos, subsets, titles, first):
+    paths = []
+    sets = rating_sets(renderer.df, [option for combo in combos for option in combo]) if kind != 'radar' else None
+    for i, combo in enumerate(combos):
+        title = None if titles is None else titles[i]
+        if kind == 'radar':
+            paths.append(renderer.radar(combo, first + i, title))
+        elif kind == 'venn2':
+            paths.append(renderer.venn2(combo, sets, None if subsets is None else subsets[i], first + i, title))
+        else:
+            paths.append(renderer.venn3(combo, sets, None if subsets is None else subsets[i], first + i))
+    return paths
+
+
+#---------------------------------------------------------------------
+@instrumented('render_plots', rows=lambda paths, *args, **kwargs: len(paths))
+def render_plots(df, kind, combos, output, format='png', dpi=100, workers=None, subsets=None, titles=None):
+    """
+    Draws a radar plot or Venn diagram for every combination of options and writes them to files
+
+    Parameters
+    ----------
+    df: DataFrame
+        option_value_df, or any frame with features as rows and options as columns
+
+    kind: str
+        'radar', 'venn2' or 'venn3'
+
+    combos: list
+        option pairs (radar, venn2) or triples (venn3). A single option draws a one-option radar plot.
+
+    output: str
+        directory to write one file per plot to, or a path ending in .pdf for a single multi-page PDF
+
+    format: str
+        'png' or 'svg' when output is a directory
+
+    dpi: int
+        resolution of PNG files
+
+    workers: int
+        Spread the plots over this many processes, each with its own reused figure.
+        A multi-page PDF is always written by one process.
+
+    subsets: list
+        optional Venn region sizes for every pair or triple, e.g. from Decision.pairwise_comparison
+        or Decision.triple_overlaps
+
+    titles: list
+        optional title of every radar plot or 2 circle Venn diagram
+
+    Returns
+    -------
+    paths: list
+        file written for every plot, in the order of combos
+    """
+    if kind not in KINDS:
+        raise ValueError(f'Unknown plot kind {kind}. Use one of {KINDS}.')
+    combos = [tuple(combo) for combo in combos]
+
+    # Only ship the options being drawn to the workers
+    options = list(dict.fromkeys(option for combo in combos for option in combo))
+    df = df[options]
+
+    if not workers or workers < 2 or output.lower().endswith('.pdf') or len(combos) < 2:
+        with FigureRenderer(df, output, format, dpi) as renderer:
+            return _render(renderer, kind, combos, subsets, titles, 0)
+
+    from concurrent.futures import ProcessPoolExecutor
+    bounds = np.linspace(0, len(combos), min(workers, len(combos)) + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_chunk, df, kind, combos[start:stop],
+                               None if subsets is None else subsets[start:stop],
+                               None if titles is None else titles[start:stop], start, output, format, dpi)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        return [path for future in futures for path in future.result()]
@@ -0,0 +1,504 @@
+import sys
+import numpy as np
+
+#---------------------------------------------------------------------
+def compact_ratings(ratings, block_size=65536):
+    """
+    Stores ratings in the smallest dtype that holds them exactly
+    
+    Parameters
+    ----------
+    ratings: array-like
+        2-D array of ratings. Missing ratings are NaN.
+        
+    block_size: int
+        rows checked at a time, so large float32 inputs are never copied to float64 whole
+    
+    Returns
+    -------
+    compact: ndarray
+        C-contiguous int8 array when every rating is a whole number from -128 to 127,
+        otherwise a C-contiguous float32 array
+    """
+    ratings = np.asarray(ratings)
+    if ratings.dtype == np.int8:
+        return np.ascontiguousarray(ratings)
+    
+    for start in range(0, len(ratings), block_size):
+        if not fits_int8(ratings[start:start + block_size]):
+            return np.ascontiguousarray(ratings, dtype=np.float32)
+    return np.ascontiguousarray(ratings, dtype=np.int8)
+
+
+def fits_int8(ratings):
+    """
+    True when every rating is a whole number from -128 to 127, so int8 holds them exactly.
+    Missing (NaN) ratings need float32.
+    """
+    ratings = np.asarray(ratings)
+    if ratings.dtype == np.int8 or not ratings.size:
+        return True
+    return bool(np.isfinite(ratings).all() and (ratings == np.round(ratings)).all()
+                and ratings.min() >= -128 and ratings.max() <= 127)
+
+
+#---------------------------------------------------------------------
+def intern_names(names):
+    """
+    Interns option or feature names so every reference to a name shares one string
+
+    Parameters
+    ----------
+    names: iterable
+        option or feature names
+
+    Returns
+    -------
+    interned: list
+        the names as interned strings
+    """
+    return [sys.intern(str(name)) for name in names]
+
+
+#---------------------------------------------------------------------
+class PackedNames():
+    """
+    A read-only sequence of names stored as one UTF-8 byte block plus offsets.
+    Names are only decoded when they are looked up, so a memory-mapped block opens instantly.
+    
+    Parameters
+    ----------
+    offsets: ndarray
+        1-D integer array. Name i is blob[offsets[i]:offsets[i+1]].
+        
+    blob: ndarray
+        1-D uint8 array of UTF-8 encoded names
+    """
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+        return
+    
+    @classmethod
+    def from_names(cls, names):
+        encoded = [str(name).encode('utf-8') for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('name index out of range')
+        start, stop = int(self.offsets[index]), int(self.offsets[index + 1])
+        return sys.intern(self.blob[start:stop].tobytes().decode('utf-8'))
+    
+    def __iter__(self):
+        # One copy of the block and of the offsets rather than a memory-map slice per name.
+        # Every name is decoded once here, so interning would only add time.
+        blob = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            yield blob[start:stop].decode('utf-8')
+    
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+#---------------------------------------------------------------------
+# RATING STORE
+#---------------------------------------------------------------------
+class RatingStore():
+    """
+    Compact storage for a decision's ratings and feature importances
+
+    Ratings live in one contiguous options by features array. Options and features are
+    interned names whose position is their row or column. Importances are two float vectors
+    aligned with the feature columns.
+
+    Attributes
+    ----------
+    options: list
+        option names, one per row of ratings. A PackedNames sequence after loading from disk.
+
+    features: list
+        feature names, one per column of ratings
+
+    ratings: ndarray
+        int8 or float32 array of shape (number of options, number of features). Missing ratings are NaN.
+
+    rated: ndarray
+        boolean per feature. True when the options were rated on this feature.
+
+    weighted: ndarray
+        boolean per feature. True when the feature has an importance.
+
+    values: ndarray
+        absolute importance per feature
+
+    percents: ndarray
+        percent importance per feature
+    """
+    def __init__(self):
+        self.options = []
+        self.features = []
+        self.ratings = np.zeros((0, 0), dtype=np.int8)
+        self.rated = np.zeros(0, dtype=bool)
+        self.weighted = np.zeros(0, dtype=bool)
+        self.values = np.zeros(0)
+        self.percents = np.zeros(0)
+        self._option_index = None
+        self._feature_index = None
+        return
+
+    @classmethod
+    def from_arrays(cls, options, features, ratings, values=None, percents=None):
+        """
+        Builds a store straight from arrays, without going through dictionaries
+        
+        Parameters
+        ----------
+        options: list
+            option names, one per row of ratings
+            
+        features: list
+            feature names, one per column of ratings
+            
+        ratings: array-like
+            2-D array of shape (number of options, number of features)
+            
+        values: array-like
+            absolute importance per feature. Default leaves every feature without an importance.
+            
+        percents: array-like
+            percent importance per feature. Required when values is provided.
+            
+        Returns
+        -------
+        store: RatingStore
+        """
+        store = cls()
+        store.options = options if isinstance(options, PackedNames) else intern_names(options)
+        store.features = intern_names(features)
+        store.ratings = compact_ratings(ratings).reshape(len(store.options), len(store.features))
+        store.rated = np.ones(len(store.features), dtype=bool)
+        if values is None:
+            store.weighted = np.zeros(len(store.features), dtype=bool)
+            store.values = np.zeros(len(store.features))
+            store.percents = np.zeros(len(store.features))
+        else:
+            store.weighted = np.ones(len(store.features), dtype=bool)
+            store.values = np.array(values, dtype=float)
+            store.percents = np.array(percents, dtype=float)
+        return store
+        
+    @property
+    def option_index(self):
+        """
+        Maps option names to rows. Built on first use since most scoring never needs it.
+        """
+        if self._option_index is None:
+            self._option_index = {option: row for row, option in enumerate(self.options)}
+        return self._option_index
+
+    @property
+    def feature_index(self):
+        """
+        Maps feature names to columns
+        """
+        if self._feature_index is None:
+            self._feature_index = {feature: column for column, feature in enumerate(self.features)}
+        return self._feature_index
+
+    def _reindex(self):
+        self._option_index = None
+        self._feature_index = None
+        return
+
+    def rows(self, option_list):
+        """
+        Row numbers of the provided options
+        """
+        option_index = self.option_index
+        return np.fromiter((option_index[option] for option in option_list), dtype=np.intp, count=len(option_list))
+
+    def active(self):
+        """
+        Boolean per feature. True for features that are both rated and weighted,
+        which are the rows of option_value_df.
+        """
+        return self.rated & self.weighted
+
+    def _writable(self, ratings):
+        # Gets the rating array ready to take new ratings and returns them in its dtype.
+        # Edits are kept in memory, so a memory map always matches the file it maps,
+        # and int8 only becomes float32 when the new ratings do not fit it.
+        if isinstance(self.ratings, np.memmap):
+            self.ratings = np.array(self.ratings)
+        ratings = np.asarray(ratings)
+        if self.ratings.dtype == np.int8 and not fits_int8(ratings):
+            self.ratings = self.ratings.astype(np.float32)
+        return ratings.astype(self.ratings.dtype)
+
+
+#---------------------------------------------------------------------
+# LOADING FROM DICTIONARIES
+#---------------------------------------------------------------------
+    def set_option_dict(self, option_dict):
+        """
+        Replaces every rating with the ones in option_dict.
+        Importances of features that are still present are kept.
+
+        Parameters
+        ----------
+        option_dict: dict
+            key value pairs are option and a dictionary with a rating for each feature
+        """
+        features = dict.fromkeys(feature for ratings in option_dict.values() for feature in ratings)
+        features = intern_names(features)
+        old_values = dict(zip(self.features, zip(self.values, self.percents)))
+        old_weighted = {feature for feature, weighted in zip(self.features, self.weighted) if weighted}
+
+        # Weighted features the options were not rated on keep their importance in extra columns
+        rated = set(features)
+        extra = [feature for feature in self.features if feature in old_weighted and feature not in rated]
+        all_features = features + extra
+
+        nan = float('nan')
+        ratings = np.array([[row.get(feature, nan) for feature in features] for row in option_dict.values()], dtype=float)
+        ratings = ratings.reshape(len(option_dict), len(features))
+        ratings = np.hstack([ratings, np.zeros((len(option_dict), len(extra)))])
+
+        self.options = intern_names(option_dict)
+        self.features = all_features
+        self.ratings = compact_ratings(ratings)
+        self.rated = np.array([True]*len(features) + [False]*len(extra), dtype=bool)
+        self.weighted = np.array([feature in old_weighted for feature in all_features], dtype=bool)
+        self.values = np.array([old_values.get(feature, (0, 0))[0] for feature in all_features], dtype=float)
+        self.percents = np.array([old_values.get(feature, (0, 0))[1] for feature in all_features], dtype=float)
+        self._reindex()
+        return
+
+    def set_feature_dict(self, feature_dict):
+        """
+        Replaces every importance with the ones in feature_dict
+
+        Parameters
+        ----------
+        feature_dict: dict
+            key value pairs are features and a dictionary with their 'value' and 'percent' importance
+        """
+        # Unrated features that lose their importance no longer need a column
+        keep = self.rated.copy()
+        for feature in feature_dict:
+            if feature in self.feature_index:
+                keep[self.feature_index[feature]] = True
+        if not keep.all():
+            self._keep_columns(keep)
+
+        new = [feature for feature in intern_names(feature_dict) if feature not in self.feature_index]
+        if new:
+            self.features = self.features + new
+            self.ratings = np.hstack([self.ratings, np.zeros((len(self.options), len(new)), dtype=self.ratings.dtype)])
+            self.rated = np.concatenate([self.rated, np.zeros(len(new), dtype=bool)])
+            self._reindex()
+
+        self.weighted = np.array([feature in feature_dict for feature in self.features], dtype=bool)
+        self.values = np.array([float(feature_dict[feature]['value']) if feature in feature_dict else 0.0
+                                for feature in self.features])
+        self.percents = np.array([float(feature_dict[feature]['percent']) if feature in feature_dict else 0.0
+                                  for feature in self.features])
+        return
+
+    def _keep_columns(self, keep):
+        self.features = [feature for feature, kept in zip(self.features, keep) if kept]
+        self.ratings = np.ascontiguousarray(self.ratings[:, keep])
+        self.rated = self.rated[keep]
+        self.weighted = self.weighted[keep]
+        self.values = self.values[keep]
+        self.percents = self.percents[keep]
+        self._reindex()
+        return
+
+
+#---------------------------------------------------------------------
+# EDITING OPTIONS AND FEATURES
+#---------------------------------------------------------------------
+    def add_option(self, option, ratings):
+        """
+        Adds an option as a new row. The ratings stay int8 unless the new ones are not whole numbers.
+
+        Parameters
+        ----------
+        option: str
+            name of the new option
+
+        ratings: dict
+            key value pairs are feature and rating. Features that are not rated yet become new columns.
+        """
+        for feature in ratings:
+            if feature not in self.feature_index:
+                self.add_feature(feature, {})
+
+        row = np.full(len(self.features), np.nan)
+        row[~self.rated] = 0
+        for feature, rating in ratings.items():
+            row[self.feature_index[feature]] = rating
+            self.rated[self.feature_index[feature]] = True
+
+        row = self._writable(row)
+        self.options = list(self.options) + intern_names([option])
+        self.ratings = np.vstack([self.ratings, row])
+        self._reindex()
+        return
+
+    def append_options(self, options, ratings):
+        """
+        Adds many options at once as new rows
+
+        Parameters
+        ----------
+        options: list
+            names of the new options
+
+        ratings: array-like
+            2-D array with one row per new option and one column per rated feature, in column order
+        """
+        rows = np.zeros((len(options), len(self.features)), dtype=np.float32)
+        rows[:, self.rated] = np.asarray(ratings, dtype=np.float32).reshape(len(options), int(self.rated.sum()))
+        rows = self._writable(rows)
+        self.options = list(self.options) + intern_names(options)
+        self.ratings = np.vstack([self.ratings, rows])
+        self._reindex()
+        return
+
+    def remove_option(self, option):
+        """
+        Removes an option's row
+        """
+        row = self.option_index[option]
+        self.options = list(self.options)
+        del self.options[row]
+        self.ratings = np.ascontiguousarray(np.delete(self.ratings, row, axis=0))
+        self._reindex()
+        return
+
+    def add_feature(self, feature, ratings):
+        """
+        Rates options on a feature, adding a column if needed. The ratings stay int8 unless the new ones
+        are not whole numbers, which includes options left out.
+
+        Parameters
+        ----------
+        feature: str
+            name of the feature
+
+        ratings: dict
+            key value pairs are option and rating. Options left out are missing a rating,
+            unless no option is rated in which case the column is just reserved.
+        """
+        if feature not in self.feature_index:
+            self.features = self.features + intern_names([feature])
+            self.ratings = np.hstack([self.ratings, np.zeros((len(self.options), 1), dtype=self.ratings.dtype)])
+            self.rated = np.concatenate([self.rated, [False]])
+            self.weighted = np.concatenate([self.weighted, [False]])
+            self.values = np.concatenate([self.values, [0.0]])
+            self.percents = np.concatenate([self.percents, [0.0]])
+            self._reindex()
+        if not ratings:
+            return
+
+        column = self.feature_index[feature]
+        new_column = np.full(len(self.options), np.nan)
+        new_column[self.rows(list(ratings))] = list(ratings.values())
+        new_column = self._writable(new_column)
+        self.ratings[:, column] = new_column
+        self.rated[column] = True
+        return
+
+    def remove_feature(self, feature):
+        """
+        Drops a feature's ratings. The column is kept while the feature still has an importance.
+        """
+        column = self.feature_index[feature]
+        if self.weighted[column]:
+            self.rated[column] = False
+            zero = self._writable(0)
+            self.ratings[:, column] = zero
+            return
+        keep = np.ones(len(self.features), dtype=bool)
+        keep[column] = False
+        self._keep_columns(keep)
+        return
+
+    def column(self, column):
+        """
+        One feature's ratings as floats, with missing ratings counted as 0
+        """
+        return np.nan_to_num(self.ratings[:, column].astype(float))
+
+    def set_rating(self, row, column, rating):
+        """
+        Changes one rating, switching to float32 storage if the rating no longer fits int8
+
+        Returns
+        -------
+        old_rating: float
+            the rating that was replaced. A missing rating counts as 0.
+        """
+        old_rating = float(np.nan_to_num(self.ratings[row, column]))
+        rating = self._writable(float(rating))
+        self.ratings[row, column] = rating
+        return old_rating
+
+    def __getstate__(self):
+        # The name lookups are rebuilt on demand instead of being saved
+        state = self.__dict__.copy()
+        state['_option_index'] = None
+        state['_feature_index'] = None
+        return state
+
+
+#---------------------------------------------------------------------
+# VIEWS
+#---------------------------------------------------------------------
+    def option_dict(self):
+        """
+        Builds the dict-of-dicts view of the ratings. Missing ratings are left out.
+        """
+        columns = np.flatnonzero(self.rated)
+        features = [self.features[column] for column in columns]
+        values = self.ratings[:, columns].tolist()
+        option_dict = {}
+        for option, row in zip(self.options, values):
+            option_dict[option] = {feature: rating for feature, rating in zip(features, row) if rating == rating}
+        return option_dict
+
+    def feature_dict(self):
+        """
+        Builds the dict-of-dicts view of the feature importances
+        """
+        feature_dict = {}
+        for column in np.flatnonzero(self.weighted):
+            value = self.values[column]
+            feature_dict[self.features[column]] = {'value': int(value) if value == int(value) else float(value),
+                                                   'percent': float(self.percents[column])}
+        return feature_dict
+
+    def nbytes(self):
+        """
+        Bytes used by the arrays and the names
+        """
+        if isinstance(self.options, PackedNames):
+            names = self.options.offsets.nbytes + self.options.blob.nbytes
+        else:
+            names = sum(sys.getsizeof(name) for name in self.options) + 8*len(self.options)
+        names += sum(sys.getsizeof(name) for name in self.features) + 8*len(self.features)
+        arrays = sum(array.nbytes for array in (self.ratings, self.rated, self.weighted, self.values, self.percents))
+        return names + arrays
@@ -0,0 +1,257 @@
+import numpy as np
+from .instrument import instrumented, count_first
+
+#---------------------------------------------------------------------
+@instrumented('calculate_scores', rows=count_first)
+def calculate_scores(ratings, weights, block_size=65536):
+    """
+    Calculates every option's score with a single matrix-vector product
+    
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features).
+        Each row holds one option's rating (out of 10) for every feature.
+        Missing (NaN) ratings add nothing to the score.
+        
+    weights: ndarray
+        1-D array with the percent importance of every feature
+        
+    block_size: int
+        Compact int8 and float32 ratings are converted to float64 this many rows at a time
+        
+    Returns
+    -------
+    scores: ndarray
+        1-D array with the weighted score (out of 10) of every option
+    """
+    ratings = np.asarray(ratings)
+    weights = np.asarray(weights, dtype=float)
+    if ratings.dtype == np.float64 and not np.isnan(ratings).any():
+        return ratings @ weights
+    
+    scores = np.empty(len(ratings))
+    for start in range(0, len(ratings), block_size):
+        block = ratings[start:start + block_size].astype(float)
+        if block.dtype.kind == 'f':
+            np.nan_to_num(block, copy=False)
+        np.matmul(block, weights, out=scores[start:start + block_size])
+    return scores
+
+
+#---------------------------------------------------------------------
+def importance_points(values, percents):
+    """
+    Splits percent importances into whole importance points and the points total
+    
+    set_feature_importance stores percent = value / total points. Scoring with the points
+    and dividing by the total once keeps every sum exact when the ratings are whole numbers,
+    so an incrementally updated score is identical to a full recalculation.
+    
+    Parameters
+    ----------
+    values: ndarray
+        absolute importance of each feature
+        
+    percents: ndarray
+        percent importance of each feature
+        
+    Returns
+    -------
+    points: ndarray
+        importance of each feature, scaled so that points / total == percents
+        
+    total: float
+        total importance points
+    """
+    values = np.asarray(values, dtype=float)
+    percents = np.asarray(percents, dtype=float)
+    nonzero = percents != 0
+    if nonzero.any():
+        total = float(np.round(np.mean(values[nonzero]/percents[nonzero])))
+        if total > 0 and np.allclose(values/total, percents):
+            return values.copy(), total
+    
+    # The importances were not set from a points budget, so score with the percents directly
+    return percents.copy(), 1.0
+
+
+#---------------------------------------------------------------------
+@instrumented('rank_scores', rows=count_first)
+def rank_scores(scores):
+    """
+    Orders scores from best to worst
+    
+    Parameters
+    ----------
+    scores: ndarray
+        1-D array of option scores
+        
+    Returns
+    -------
+    ranking: ndarray
+        Indices into scores, best score first. Ties keep their original order.
+    """
+    return np.argsort(-np.asarray(scores), kind='stable')
+
+
+#---------------------------------------------------------------------
+@instrumented('top_k_scores', rows=count_first)
+def top_k_scores(scores, k):
+    """
+    Finds the k best scores without sorting every score
+    
+    Parameters
+    ----------
+    scores: ndarray
+        1-D array of option scores
+        
+    k: int
+        number of scores to keep
+        
+    Returns
+    -------
+    ranking: ndarray
+        Indices of the k best scores, best first. Matches the first k entries of rank_scores.
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return rank_scores(scores)
+    
+    # Partial selection finds the k-th best score in linear time.
+    # Everything above it is kept, ties at the boundary go to the earliest options like in a stable sort.
+    threshold = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    candidates = np.sort(np.concatenate([above, ties]))
+    return candidates[rank_scores(scores[candidates])]
+
+
+#---------------------------------------------------------------------
+AGGREGATES = ('max', 'mean', 'top_k_mean')
+
+@instrumented('aggregate_scores', rows=count_first)
+def aggregate_scores(scores, method='max', k=3):
+    """
+    Sums up a decision's option scores as one score, e.g. a restaurant scored by its best menu item
+    
+    Parameters
+    ----------
+    scores: ndarray
+        1-D array of option scores
+        
+    method: str
+        'max' for the best score, 'mean' for the average score,
+        'top_k_mean' for the average of the k best scores
+        
+    k: int
+        scores averaged by 'top_k_mean'. Fewer options average all of them.
+        
+    Returns
+    -------
+    score: float
+        the aggregated score, 0 when there are no scores
+    """
+    if method not in AGGREGATES:
+        raise ValueError(f'{method} is not one of {AGGREGATES}')
+    if method == 'top_k_mean' and k < 1:
+        raise ValueError(f'top_k_mean needs k of at least 1, got {k}')
+    scores = np.asarray(scores, dtype=float)
+    if not len(scores):
+        return 0.0
+    if method == 'max':
+        return float(scores.max())
+    if method == 'mean':
+        return float(scores.mean())
+    return float(scores[top_k_scores(scores, k)].mean())
+
+
+#---------------------------------------------------------------------
+def _profile_blocks(ratings, weight_matrix, max_block_bytes):
+    # Yields (first user, block of scores) with each block at most max_block_bytes of float64 scores
+    ratings = np.asarray(ratings, dtype=float)
+    if np.isnan(ratings).any():
+        ratings = np.nan_to_num(ratings)
+    weight_matrix = np.atleast_2d(np.asarray(weight_matrix, dtype=float))
+    users_per_block = max(1, max_block_bytes//(8*max(len(ratings), 1)))
+    for start in range(0, len(weight_matrix), users_per_block):
+        yield start, weight_matrix[start:start + users_per_block] @ ratings.T
+    return
+
+
+#---------------------------------------------------------------------
+@instrumented('calculate_profile_scores', rows=count_first)
+def calculate_profile_scores(ratings, weight_matrix, max_block_bytes=2**26):
+    """
+    Scores every option for many sets of feature weights with one matrix multiply per block of users
+    
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+        
+    weight_matrix: ndarray
+        2-D array of shape (number of users, number of features). Each row is one user's percent importances.
+        
+    max_block_bytes: int
+        largest block of scores multiplied at once
+        
+    Returns
+    -------
+    scores: ndarray
+        2-D array of shape (number of users, number of options) with scores out of 10
+    """
+    weight_matrix = np.atleast_2d(weight_matrix)
+    scores = np.empty((len(weight_matrix), len(ratings)))
+    for start, block in _profile_blocks(ratings, weight_matrix, max_block_bytes):
+        scores[start:start + len(block)] = block
+    return scores
+
+
+#---------------------------------------------------------------------
+@instrumented('top_k_profile_scores', rows=count_first)
+def top_k_profile_scores(ratings, weight_matrix, k, max_block_bytes=2**26):
+    """
+    Finds each user's k best options without keeping the full users by options score matrix
+    
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+        
+    weight_matrix: ndarray
+        2-D array of shape (number of users, number of features). Each row is one user's percent importances.
+        
+    k: int
+        options kept per user
+        
+    max_block_bytes: int
+        largest block of scores held in memory at once
+        
+    Returns
+    -------
+    ranking: ndarray
+        2-D integer array of shape (number of users, k). Row u holds user u's best options, best first.
+        Among options tied at the k-th place, which ones are kept is not defined.
+        
+    top_scores: ndarray
+        2-D array of the matching scores out of 10
+    """
+    weight_matrix = np.atleast_2d(weight_matrix)
+    k = min(k, len(ratings))
+    ranking = np.empty((len(weight_matrix), k), dtype=np.intp)
+    top_scores = np.empty((len(weight_matrix), k))
+    for start, block in _profile_blocks(ratings, weight_matrix, max_block_bytes):
+        if k < len(ratings):
+            candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(ratings)), block.shape)
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        # Best score first, earlier option first among ties
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        ranking[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+        top_scores[start:start + len(block)] = np.take_along_axis(candidate_scores, order, axis=1)
+    return ranking, top_scores
@@ -0,0 +1,158 @@
+import numpy as np
+from .scoring import top_k_scores
+
+#---------------------------------------------------------------------
+def sample_weights(percents, samples, concentration=100.0, seed=0):
+    """
+    Draws random feature importances scattered around the current ones
+
+    Each sample is a Dirichlet draw with mean equal to the current percents, so on average the
+    samples agree with the user and concentration sets how far they stray: a feature holding
+    share p varies with standard deviation sqrt(p(1 - p)/(concentration + 1)).
+    Features with no importance stay at 0.
+
+    Parameters
+    ----------
+    percents: ndarray
+        percent importance of each feature
+
+    samples: int
+        number of weight vectors to draw
+
+    concentration: float
+        larger keeps the samples closer to percents
+
+    seed: int
+        seed for the random generator
+
+    Returns
+    -------
+    weight_matrix: ndarray
+        float32 array of shape (samples, number of features), each row summing to the same total as percents
+    """
+    percents = np.asarray(percents, dtype=float)
+    weight_matrix = np.zeros((samples, len(percents)), dtype=np.float32)
+    positive = np.flatnonzero(percents > 0)
+    if len(positive):
+        total = percents[positive].sum()
+        draws = np.random.default_rng(seed).dirichlet(concentration*percents[positive]/total, samples)
+        weight_matrix[:, positive] = draws*total
+    return weight_matrix
+
+
+#---------------------------------------------------------------------
+def rank_counts(ratings, weight_matrix, top_ranks=10, max_block_bytes=2**26):
+    """
+    Counts how often each option lands in each of the top places over many sets of feature weights
+
+    Samples are scored a block at a time with one float32 matrix multiply. Rather than sorting
+    every sample's scores, the options that are best under the average weights give each sample
+    a score every one of its top places must reach, and only the few options at or above it are
+    ranked. The threshold is exact, so the counts are too.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features). Missing (NaN) ratings add nothing.
+
+    weight_matrix: ndarray
+        2-D array of shape (number of samples, number of features)
+
+    top_ranks: int
+        number of places counted
+
+    max_block_bytes: int
+        largest block of scores held in memory at once
+
+    Returns
+    -------
+    counts: ndarray
+        2-D integer array of shape (number of options, top_ranks). counts[i, r] is the number of
+        samples where option i came in place r (0 is the winner). Ties go to the earlier option.
+    """
+    ratings = np.nan_to_num(np.asarray(ratings, dtype=np.float32))
+    weight_matrix = np.atleast_2d(np.asarray(weight_matrix, dtype=np.float32))
+    n_options = len(ratings)
+    top_ranks = min(top_ranks, n_options)
+    counts = np.zeros(n_options*top_ranks, dtype=np.int64)
+    if not top_ranks:
+        return counts.reshape(n_options, 0)
+
+    # Options likely to do well, used to find a score each sample's top places must reach
+    mean_scores = ratings @ weight_matrix.mean(axis=0)
+    likely = top_k_scores(mean_scores, min(n_options, max(8*top_ranks, 64)))
+    ratings_t = ratings.T.copy()
+
+    samples_per_block = max(1, max_block_bytes//(4*max(n_options, 1)))
+    for start in range(0, len(weight_matrix), samples_per_block):
+        weights = weight_matrix[start:start + samples_per_block]
+        block = weights @ ratings_t
+        # The top_ranks-th best of the likely options is never better than the top_ranks-th best overall.
+        # It is taken from the block itself: a separate float32 product can round tied scores differently.
+        threshold = np.partition(block[:, likely], -top_ranks, axis=1)[:, -top_ranks]
+        # flatnonzero is much faster than a 2-D nonzero on a mostly False mask
+        flat = np.flatnonzero(block >= threshold[:, None])
+        sample, option = np.divmod(flat, n_options)
+        score = block.ravel()[flat]
+
+        # Best first within each sample, earlier option first among ties
+        order = np.lexsort((option, -score, sample))
+        sample, option = sample[order], option[order]
+        first = np.searchsorted(sample, sample, side='left')
+        place = np.arange(len(sample)) - first
+        kept = place < top_ranks
+        counts += np.bincount(option[kept]*top_ranks + place[kept], minlength=len(counts))
+    return counts.reshape(n_options, top_ranks)
+
+
+#---------------------------------------------------------------------
+def smallest_flips(ratings, percents, winner):
+    """
+    Finds, for every challenger, the smallest move of importance from one feature to another
+    that lets it tie the winner
+
+    Moving t of percent importance from feature f to feature g changes the winner's lead over
+    challenger j by t*(a_g - a_f), where a = winner's ratings - j's ratings. The lead is cut
+    fastest by taking from the feature where the winner is furthest ahead and giving to the one
+    where it is furthest behind, as long as the source feature has t to give. Every source
+    feature is tried, so the answer is the cheapest single transfer.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features). Missing (NaN) ratings add nothing.
+
+    percents: ndarray
+        percent importance of each feature
+
+    winner: int
+        row of the current best option
+
+    Returns
+    -------
+    amount: ndarray
+        percent importance to move for each option, inf where no single transfer is enough
+        and for the winner itself
+
+    source, target: ndarray
+        the feature to take importance from and the one to give it to, -1 where amount is inf
+    """
+    ratings = np.nan_to_num(np.asarray(ratings, dtype=float))
+    percents = np.asarray(percents, dtype=float)
+    lead_by_feature = ratings[winner] - ratings
+    lead = np.maximum(lead_by_feature @ percents, 0)
+
+    target = lead_by_feature.argmin(axis=1)
+    gain = lead_by_feature - lead_by_feature.min(axis=1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        needed = np.where(gain > 0, lead[:, None]/gain, np.inf)
+    # Already tied options need nothing moved
+    needed[lead == 0] = 0
+    needed[needed > percents[None, :]] = np.inf
+    needed[:, percents <= 0] = np.inf
+    needed[winner] = np.inf
+
+    source = needed.argmin(axis=1)
+    amount = needed[np.arange(len(ratings)), source]
+    found = np.isfinite(amount)
+    return amount, np.where(found, source, -1), np.where(found, target, -1)
@@ -0,0 +1,393 @@
+import asyncio
+import glob
+import inspect
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import numpy as np
+from .decision_functions import Decision
+from .scoring import top_k_profile_scores, calculate_profile_scores
+from .cache import ScoreCache, result_key
+from .instrument import metrics
+
+# Endpoints
+# ---------
+# GET  /decisions                   names, options and features of every loaded decision
+# GET  /cache                       score cache hit and miss counters
+# GET  /metrics                     operation timers in Prometheus text format (after metrics.enable())
+# POST /decisions/<name>/score      {"options": [...], "weights": {...}}  -> {"scores": {option: score}}
+# POST /decisions/<name>/top_k      {"k": 10, "weights": {...}}           -> {"results": [[option, score], ...]}
+# POST /decisions/<name>/what_if    {"k": 10, "weights": {...}, "ratings": {option: {feature: rating}}}
+#                                   -> {"results": [[option, score], ...]} without changing the decision
+#
+# "weights" are percent importances keyed by feature; features left out get no importance.
+# Leaving "weights" out uses the decision's own feature_dict. Scores are out of 10.
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+#---------------------------------------------------------------------
+class RequestError(Exception):
+    """
+    A request the service can not answer, with the HTTP status to send back
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+#---------------------------------------------------------------------
+# REQUEST BATCHING
+#---------------------------------------------------------------------
+class _Batcher():
+    """
+    Collects the scoring requests that arrive for one decision while a batch is being computed,
+    then answers all of them with one users by options matrix multiply in the executor.
+    """
+    def __init__(self, ratings, executor, window):
+        self.ratings = ratings
+        self.executor = executor
+        self.window = window
+        self.pending = []
+        self.task = None
+        return
+
+    async def submit(self, kind, weights, argument):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((kind, weights, argument, future))
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.pending:
+            await asyncio.sleep(self.window)
+            batch, self.pending = self.pending, []
+            try:
+                results = await loop.run_in_executor(self.executor, self._compute, batch)
+            except Exception as error:
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, _, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        return
+
+    def _compute(self, batch):
+        results = [None]*len(batch)
+        top_k = [i for i, request in enumerate(batch) if request[0] == 'top_k']
+        if top_k:
+            weight_matrix = np.vstack([batch[i][1] for i in top_k])
+            ranking, scores = top_k_profile_scores(self.ratings, weight_matrix, max(batch[i][2] for i in top_k))
+            for row, i in enumerate(top_k):
+                results[i] = (ranking[row, :batch[i][2]], scores[row, :batch[i][2]])
+
+        score = [i for i, request in enumerate(batch) if request[0] == 'score']
+        if score:
+            rows = np.unique(np.concatenate([batch[i][2] for i in score]))
+            scores = calculate_profile_scores(self.ratings[rows], np.vstack([batch[i][1] for i in score]))
+            for row, i in enumerate(score):
+                results[i] = scores[row, np.searchsorted(rows, batch[i][2])]
+        return results
+
+
+#---------------------------------------------------------------------
+# DECISION SERVICE
+#---------------------------------------------------------------------
+class DecisionService():
+    """
+    Serves saved decisions over HTTP/JSON from a long-running asyncio event loop
+
+    Decisions are loaded once up front. Scoring runs in a thread pool (NumPy releases the GIL),
+    so the event loop keeps accepting connections. Score and top-k requests that arrive for the
+    same decision while a batch is running are answered together with one vectorized call.
+
+    Parameters
+    ----------
+    decisions: dict
+        key value pairs are decision name and Decision
+
+    workers: int
+        threads used for scoring
+
+    batch_window: float
+        seconds to wait for more requests before scoring a batch
+
+    cache_size: int
+        Score and top-k results kept in memory, shared by every decision. 0 turns the cache off.
+
+    cache_dir: str
+        Optional folder where cached results are also saved, so they survive a restart
+    """
+    def __init__(self, decisions, workers=4, batch_window=0.001, cache_size=256, cache_dir=None):
+        self.decisions = dict(decisions)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batch_window = batch_window
+        self._batchers = {}
+        self.cache = ScoreCache(cache_size, directory=cache_dir) if cache_size > 0 else None
+        for decision in self.decisions.values():
+            decision.update_scores()
+            if self.cache is not None:
+                decision.use_score_cache(cache=self.cache)
+                decision.content_hash()
+        return
+
+    @classmethod
+    def from_directory(cls, path, **kwargs):
+        """
+        Loads every decision saved with Decision.save (*.hmd) in a directory, named after its file
+        """
+        decisions = {os.path.splitext(os.path.basename(file))[0]: Decision.load(file)
+                     for file in sorted(glob.glob(os.path.join(path, '*.hmd')))}
+        return cls(decisions, **kwargs)
+
+    def _decision(self, name):
+        if name not in self.decisions:
+            raise RequestError(404, f'No decision named {name}')
+        return self.decisions[name]
+
+    def _batcher(self, name):
+        if name not in self._batchers:
+            ratings = np.asarray(self.decisions[name].rating_matrix, dtype=float)
+            self._batchers[name] = _Batcher(np.nan_to_num(ratings), self.executor, self.batch_window)
+        return self._batchers[name]
+
+    def _weights(self, decision, weights):
+        # Percent importances in rating matrix column order
+        if weights is None:
+            decision._ensure_scores()
+            return decision.feature_points/decision.total_importance
+        if not isinstance(weights, dict):
+            raise RequestError(400, 'weights must be an object of feature: percent importance')
+        unknown = set(weights).difference(decision.feature_index)
+        if unknown:
+            raise RequestError(400, f'Unknown features {sorted(unknown)}')
+        vector = np.zeros(len(decision.store.features))
+        for feature, percent in weights.items():
+            vector[decision.feature_index[feature]] = self._number(percent, f'weight of {feature}')
+        return vector
+
+    def _number(self, value, name):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise RequestError(400, f'{name} must be a number, got {value!r}') from None
+
+    def _k(self, k):
+        try:
+            k = int(k)
+        except (TypeError, ValueError, OverflowError):
+            raise RequestError(400, f'k must be a whole number, got {k!r}') from None
+        if k < 1:
+            raise RequestError(400, 'k must be at least 1')
+        return k
+
+    async def _submit(self, name, kind, weights, argument, *key):
+        # Answers from the score cache when the same request was seen before, otherwise joins a batch
+        decision = self.decisions[name]
+        if self.cache is None:
+            return await self._batcher(name).submit(kind, weights, argument)
+        key = result_key(decision.content_hash(), 'service_' + kind, weights, *key)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self._batcher(name).submit(kind, weights, argument)
+            result = self.cache.put(key, result if isinstance(result, tuple) else (result,))
+        return result if kind == 'top_k' else result[0]
+
+    def _rows(self, decision, options):
+        unknown = [option for option in options if option not in decision.option_index]
+        if unknown:
+            raise RequestError(400, f'Unknown options {unknown[:10]}')
+        return decision.store.rows(options)
+
+
+#---------------------------------------------------------------------
+# ENDPOINTS
+#---------------------------------------------------------------------
+    async def score(self, name, options=None, weights=None):
+        decision = self._decision(name)
+        options = list(decision.store.options) if options is None else list(options)
+        rows = self._rows(decision, options)
+        scores = await self._submit(name, 'score', self._weights(decision, weights), rows, rows)
+        return {'scores': dict(zip(options, scores.tolist()))}
+
+    async def top_k(self, name, k=10, weights=None):
+        decision = self._decision(name)
+        k = self._k(k)
+        ranking, scores = await self._submit(name, 'top_k', self._weights(decision, weights), k, None, k)
+        return {'results': [[decision.store.options[row], score] for row, score in zip(ranking, scores.tolist())]}
+
+    async def what_if(self, name, k=10, weights=None, ratings=None):
+        """
+        Ranks the options as if some weights or ratings were different, leaving the decision unchanged
+        """
+        decision = self._decision(name)
+        k = self._k(k)
+        vector = self._weights(decision, weights)
+        ratings = {} if ratings is None else ratings
+        if not isinstance(ratings, dict) or not all(isinstance(new_ratings, dict) for new_ratings in ratings.values()):
+            raise RequestError(400, 'ratings must be an object of option: {feature: rating}')
+        changes = []
+        for option, new_ratings in ratings.items():
+            row = self._rows(decision, [option])[0]
+            for feature, rating in new_ratings.items():
+                if feature not in decision.feature_index:
+                    raise RequestError(400, f'Unknown feature {feature}')
+                rating = self._number(rating, f'rating of {option} on {feature}')
+                changes.append((row, decision.feature_index[feature], rating))
+
+        ratings_matrix = self._batcher(name).ratings
+        
+        def compute():
+            # Score with the new weights, then move only the edited options' scores
+            scores = ratings_matrix @ vector
+            for row, column, rating in changes:
+                scores[row] += (rating - ratings_matrix[row, column])*vector[column]
+            order = np.argsort(-scores, kind='stable')[:k]
+            return order, scores[order]
+
+        ranking, scores = await asyncio.get_running_loop().run_in_executor(self.executor, compute)
+        return {'results': [[decision.store.options[row], score] for row, score in zip(ranking, scores.tolist())]}
+
+    def list_decisions(self):
+        return {'decisions': {name: {'options': len(decision.store.options), 'features': list(decision.store.features)}
+                              for name, decision in self.decisions.items()}}
+
+    async def dispatch(self, method, target, body):
+        """
+        Routes one request to its endpoint
+
+        Returns
+        -------
+        status: int
+            HTTP status code
+
+        payload: dict
+            JSON response body
+        """
+        parts = [part for part in urlsplit(target).path.split('/') if part]
+        try:
+            if parts == ['decisions']:
+                if method != 'GET':
+                    raise RequestError(405, 'Use GET')
+                return 200, self.list_decisions()
+            if parts == ['cache']:
+                if method != 'GET':
+                    raise RequestError(405, 'Use GET')
+                return 200, {'cache': None if self.cache is None else self.cache.stats()}
+            if parts == ['metrics']:
+                if method != 'GET':
+                    raise RequestError(405, 'Use GET')
+                return 200, metrics.to_prometheus()
+            if len(parts) != 3 or parts[0] != 'decisions' or parts[2] not in ('score', 'top_k', 'what_if'):
+                raise RequestError(404, f'No endpoint at {target}')
+            if method != 'POST':
+                raise RequestError(405, 'Use POST')
+            try:
+                arguments = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError(400, 'Request body must be JSON')
+            if not isinstance(arguments, dict):
+                raise RequestError(400, 'Request body must be a JSON object')
+            endpoint = {'score': self.score, 'top_k': self.top_k, 'what_if': self.what_if}[parts[2]]
+            # Checked against the endpoint's parameters up front, so a TypeError from inside it stays a 500
+            try:
+                arguments = inspect.signature(endpoint).bind(parts[1], **arguments)
+            except TypeError as error:
+                raise RequestError(400, f'Bad arguments for {parts[2]}: {error}') from None
+            return 200, await endpoint(*arguments.args, **arguments.kwargs)
+        except RequestError as error:
+            return error.status, {'error': str(error)}
+
+
+#---------------------------------------------------------------------
+# HTTP
+#---------------------------------------------------------------------
+    async def handle_connection(self, reader, writer):
+        """
+        Answers HTTP/1.1 requests on one connection, keeping it open between requests
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except Exception as error:
+                    status, payload = 500, {'error': repr(error)}
+                # Text payloads are Prometheus metrics, everything else is JSON
+                if isinstance(payload, str):
+                    content, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+                else:
+                    content, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f'HTTP/1.1 {status} {HTTP_STATUS.get(status, "")}\r\n'
+                             f'Content-Type: {content_type}\r\nContent-Length: {len(content)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1')
+                             + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+        return
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """
+        Starts listening. Use port=0 to pick a free port, e.g. for tests.
+
+        Returns
+        -------
+        server: asyncio.Server
+            the running server. server.sockets[0].getsockname() gives the bound address.
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown()
+        return
+
+
+#---------------------------------------------------------------------
+def serve(path, host='127.0.0.1', port=8000, **kwargs):
+    """
+    Serves every decision saved in a directory until interrupted
+
+    Parameters
+    ----------
+    path: str
+        directory of *.hmd files, e.g. '01-data/03-decisions'
+    """
+    async def run():
+        service = DecisionService.from_directory(path, **kwargs)
+        server = await service.start(host, port)
+        print(f'Serving {sorted(service.decisions)} on http://{host}:{server.sockets[0].getsockname()[1]}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return
@@ -0,0 +1,155 @@
+import numpy as np
+from .scoring import top_k_scores
+
+METRICS = ('cosine', 'euclidean', 'overlap')
+
+#---------------------------------------------------------------------
+# SIMILARITY INDEX
+#---------------------------------------------------------------------
+class SimilarityIndex():
+    """
+    Finds the options most alike a given option
+
+    Metrics:
+        'cosine'     angle between rating vectors, 1 is identical in shape
+        'euclidean'  distance between rating vectors with every feature scaled by its percent importance
+        'overlap'    number of features rated exactly the same, as in the Venn diagrams
+    Missing (NaN) ratings count as 0 for 'cosine' and 'euclidean' and never match for 'overlap'.
+
+    The normalized matrix is computed once, so every query is one matrix-vector product.
+    With approximate=True the rows are also randomly projected down to n_components columns.
+    Queries scan the small projected matrix first and rerank only the best candidates exactly.
+    This is worth it for catalogs of millions of options with many features. Results may then
+    miss a true neighbour, with the exact ratings still deciding the order of what is found.
+
+    Parameters
+    ----------
+    ratings: ndarray
+        2-D array of shape (number of options, number of features)
+
+    metric: str
+        one of METRICS
+
+    weights: ndarray
+        percent importance of each feature, used by 'euclidean'. Default weighs every feature equally.
+
+    approximate: bool
+        build the random projection as well
+
+    n_components: int
+        columns kept by the random projection
+
+    candidates: int
+        with approximate=True, k * candidates options are reranked exactly
+
+    seed: int
+        random projection seed, so results are repeatable
+    """
+    def __init__(self, ratings, metric='cosine', weights=None, approximate=False, n_components=16,
+                 candidates=100, seed=0):
+        if metric not in METRICS:
+            raise ValueError(f'Unknown similarity metric {metric}. Use one of {METRICS}.')
+        self.metric = metric
+        self.candidates = candidates
+        ratings = np.asarray(ratings)
+
+        if metric == 'overlap':
+            # NaN never equals anything, so missing ratings drop out of the comparison on their own
+            self.matrix = ratings
+            self.projection = None
+            return
+
+        matrix = np.nan_to_num(ratings.astype(np.float32))
+        if metric == 'cosine':
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        else:
+            if weights is not None:
+                matrix *= np.sqrt(np.asarray(weights, dtype=np.float32))
+            self.squared_norms = np.einsum('ij,ij->i', matrix, matrix)
+        self.matrix = matrix
+
+        self.projection = None
+        if approximate and n_components < matrix.shape[1]:
+            rng = np.random.default_rng(seed)
+            self.projection = (rng.standard_normal((matrix.shape[1], n_components))/np.sqrt(n_components)).astype(np.float32)
+            self.projected = matrix @ self.projection
+            self.projected_norms = np.einsum('ij,ij->i', self.projected, self.projected)
+        return
+
+    def _similarity(self, vector, rows, projected=False):
+        # Higher is more alike for every metric. Euclidean gives the negative squared distance.
+        # The projection keeps distances far better than dot products, so projected cosine
+        # also ranks by distance, which orders unit vectors the same way as their cosine.
+        if self.metric == 'overlap':
+            matrix = self.matrix if rows is None else self.matrix[rows]
+            return (matrix == vector).sum(axis=1)
+        if projected:
+            matrix, norms = self.projected, self.projected_norms
+        else:
+            matrix, norms = self.matrix, getattr(self, 'squared_norms', None)
+        if rows is not None:
+            matrix = matrix[rows]
+            norms = None if norms is None else norms[rows]
+        similarity = matrix @ vector
+        if self.metric == 'euclidean' or projected:
+            similarity = 2*similarity - norms - vector @ vector
+        return similarity
+
+    def query(self, row, k, rows=None, exclude_self=True):
+        """
+        Finds the k options most alike the option in a given row
+
+        Parameters
+        ----------
+        row: int
+            row of the option to compare against
+
+        k: int
+            number of options to return
+
+        rows: ndarray
+            rows to search. Default searches every option.
+
+        exclude_self: bool
+            leave the option itself out of the results
+
+        Returns
+        -------
+        neighbours: ndarray
+            rows of the most alike options, most alike first
+
+        values: ndarray
+            cosine similarity, weighted distance or number of matching features
+        """
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            if exclude_self:
+                rows = rows[rows != row]
+
+        if self.projection is not None and len(self.matrix if rows is None else rows) > k*self.candidates + 1:
+            # Coarse pass on the projected matrix, exact pass on its best candidates
+            coarse = self._similarity(self.projected[row], rows, projected=True).astype(float)
+            if rows is None:
+                if exclude_self:
+                    coarse[row] = -np.inf
+                rows = np.sort(top_k_scores(coarse, k*self.candidates))
+            else:
+                rows = np.sort(rows[top_k_scores(coarse, k*self.candidates)])
+            if exclude_self:
+                rows = rows[rows != row]
+
+        similarity = self._similarity(self.matrix[row], rows).astype(float)
+        if rows is None:
+            if exclude_self:
+                # The option itself is pushed to last place, and k stops short of reaching it
+                similarity[row] = -np.inf
+                k = min(k, len(similarity) - 1)
+            rows = np.arange(len(similarity))
+        best = top_k_scores(similarity, k)
+        values = similarity[best]
+        if self.metric == 'euclidean':
+            values = np.sqrt(np.maximum(-values, 0))
+        elif self.metric == 'overlap':
+            values = values.astype(np.int64)
+        return rows[best], values
@@ -0,0 +1,302 @@
+import os
+import time
+import warnings
+import numpy as np
+from .scoring import calculate_scores, top_k_scores
+from .normalize import FeatureScaler
+from .instrument import instrumented
+
+# File suffixes read with pyarrow, and the pyarrow.dataset format of each
+ARROW_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'ipc', '.feather': 'ipc', '.ipc': 'ipc'}
+
+#---------------------------------------------------------------------
+# READING BATCHES
+#---------------------------------------------------------------------
+def arrow_format(path):
+    """
+    The pyarrow.dataset format of a Parquet or Arrow file, or of the first such file in a partitioned directory
+
+    Returns
+    -------
+    format: str
+        'parquet', 'ipc', or None for anything else (e.g. CSV)
+    """
+    if not os.path.isdir(path):
+        return ARROW_FORMATS.get(os.path.splitext(path)[1].lower())
+    for _, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            suffix = os.path.splitext(name)[1].lower()
+            if suffix in ARROW_FORMATS:
+                return ARROW_FORMATS[suffix]
+    return None
+
+
+#---------------------------------------------------------------------
+def _arrow_ratings(column):
+    # Numbers are cast straight to float32 with nulls as NaN; text goes through the CSV parsing rules
+    import pyarrow as pa
+    kind = column.type
+    if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_boolean(kind) or pa.types.is_decimal(kind):
+        return column.cast(pa.float32(), safe=False).to_numpy(zero_copy_only=False)
+    from .ingest import parse_ratings
+    return parse_ratings(column.to_pandas())
+
+
+#---------------------------------------------------------------------
+def read_arrow_batches(path, index_col, feature_cols, batch_size=65536, format=None):
+    """
+    Reads a Parquet or Arrow file, or a directory of them partitioned hive-style, one record batch at a time.
+    Only the name and feature columns are read from disk.
+
+    Parameters
+    ----------
+    path: str
+        file or directory
+
+    index_col: str or list
+        column holding the option names. With a list of columns, the option name is their values joined by ', '.
+
+    feature_cols: list
+        columns to use as features. Names are matched with surrounding spaces removed.
+
+    batch_size: int
+        most rows per batch
+
+    format: str
+        'parquet' or 'ipc'. Default guesses from the file suffixes.
+
+    Yields
+    ------
+    names: list
+        option name of every row in the batch
+
+    ratings: ndarray
+        float32 array of shape (rows in the batch, number of features), NaN where a value is missing
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError('Reading Parquet or Arrow files needs pyarrow: pip install "help-me-decide[arrow]"') from None
+    dataset = ds.dataset(path, format=format or arrow_format(path) or 'parquet', partitioning='hive')
+    columns = dataset.schema.names
+    stripped = {column.strip(): column for column in columns}
+
+    def find(column):
+        if column in columns:
+            return column
+        if column in stripped:
+            return stripped[column]
+        raise KeyError(f'{column} is not a column of {path}')
+
+    index_cols = [find(column) for column in (index_col if isinstance(index_col, list) else [index_col])]
+    features = [find(column) for column in feature_cols]
+    for batch in dataset.to_batches(columns=index_cols + features, batch_size=batch_size):
+        if not batch.num_rows:
+            continue
+        ratings = np.empty((batch.num_rows, len(features)), dtype=np.float32)
+        for column_number, feature in enumerate(features):
+            ratings[:, column_number] = _arrow_ratings(batch.column(batch.schema.get_field_index(feature)))
+        parts = [[('' if value is None else value.strip()) for value in
+                  batch.column(batch.schema.get_field_index(column)).cast(pa.string()).to_pylist()]
+                 for column in index_cols]
+        yield (parts[0] if len(parts) == 1 else [', '.join(values) for values in zip(*parts)]), ratings
+    return
+
+
+#---------------------------------------------------------------------
+def read_batches(path, index_col, feature_cols, batch_size=65536, encoding=None):
+    """
+    Reads a catalog of options one batch at a time, never holding the whole file
+
+    Parquet and Arrow files and directories (see read_arrow_batches) need pyarrow.
+    Anything else is read as CSV with pandas, see ingest.read_csv_batches.
+
+    Parameters
+    ----------
+    path: str
+        file or directory
+
+    index_col: str, int, or list
+        column(s) holding the option names
+
+    feature_cols: list
+        columns to use as features
+
+    batch_size: int
+        most rows per batch
+
+    encoding: str
+        Text encoding of a CSV file. Default detects UTF-16 and UTF-8 from the byte order mark.
+
+    Yields
+    ------
+    names, ratings: tuple
+        option names and float32 ratings of one batch
+    """
+    format = arrow_format(path)
+    if format is not None:
+        return read_arrow_batches(path, index_col, feature_cols, batch_size, format)
+    from .ingest import read_csv_batches
+    return read_csv_batches(path, index_col, feature_cols, batch_size, encoding)
+
+
+#---------------------------------------------------------------------
+# SCORING BATCHES
+#---------------------------------------------------------------------
+def fit_scaler(batches, features, methods='minmax', lower_is_better=()):
+    """
+    Fits a FeatureScaler in one pass over the batches, keeping only each feature's running minimum and maximum
+
+    Parameters
+    ----------
+    batches: iterable
+        (names, ratings) tuples, e.g. from read_batches
+
+    features: list
+        feature name of every ratings column
+
+    methods: str or dict
+        'minmax' or 'none' for every feature, or key value pairs of feature and method.
+        'rank' needs every value at once, so it is not available here.
+
+    lower_is_better: list
+        features where a smaller raw value is better
+
+    Returns
+    -------
+    scaler: FeatureScaler
+    """
+    scaler = FeatureScaler(features, methods, lower_is_better)
+    if (scaler.methods == 'rank').any():
+        raise ValueError('rank normalization needs every value at once; fit it on a sample with FeatureScaler.fit')
+    minimum = np.full(len(features), np.inf)
+    maximum = np.full(len(features), -np.inf)
+    for _, ratings in batches:
+        with warnings.catch_warnings():
+            # A column with no value in a batch gives NaN and a warning, and fmin and fmax skip the NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            minimum = np.fmin(minimum, np.nanmin(ratings, axis=0))
+            maximum = np.fmax(maximum, np.nanmax(ratings, axis=0))
+    scaled = (scaler.methods == 'minmax') & np.isfinite(minimum)
+    scaler.minimum[scaled] = minimum[scaled]
+    scaler.maximum[scaled] = maximum[scaled]
+    return scaler
+
+
+#---------------------------------------------------------------------
+@instrumented('score_batches', rows=lambda result, *args, **kwargs: result['rows'])
+def score_batches(batches, weights, k=10, scaler=None):
+    """
+    Scores a stream of option batches, keeping only a running top k and running score statistics
+
+    Memory use is one batch plus k names and scores, whatever the number of options.
+
+    Parameters
+    ----------
+    batches: iterable
+        (names, ratings) tuples, e.g. from read_batches
+
+    weights: ndarray
+        percent importance of every ratings column
+
+    k: int
+        number of best options kept
+
+    scaler: FeatureScaler
+        Optional. Raw values are rated out of 10 with it, one batch at a time. Its features are the ratings columns.
+
+    Returns
+    -------
+    result: dict
+        'top_k': (option, score) tuples, best first, ties going to the earlier option.
+        'rows': options scored. 'seconds' and 'rows_per_second': time taken, including reading.
+        'stats': 'mean', 'std', 'min' and 'max' of every option's score (out of 10).
+    """
+    start = time.perf_counter()
+    weights = np.asarray(weights, dtype=float)
+    top_scores = np.empty(0)
+    top_names = []
+    count, mean, m2 = 0, 0.0, 0.0
+    low, high = np.inf, -np.inf
+    for names, ratings in batches:
+        if not len(ratings):
+            continue
+        if scaler is not None:
+            ratings = scaler.transform(ratings)
+        scores = calculate_scores(ratings, weights)
+
+        # The running best come first, so ties keep going to the earlier option
+        best = top_k_scores(scores, k)
+        candidates = np.concatenate([top_scores, scores[best]])
+        candidate_names = top_names + [names[row] for row in best]
+        keep = top_k_scores(candidates, k)
+        top_scores = candidates[keep]
+        top_names = [candidate_names[index] for index in keep]
+
+        # Chan et al.'s pairwise update merges each batch's mean and squared deviations without losing precision
+        batch_mean = scores.mean()
+        batch_m2 = ((scores - batch_mean)**2).sum()
+        total = count + len(scores)
+        delta = batch_mean - mean
+        mean += delta*len(scores)/total
+        m2 += batch_m2 + delta**2*count*len(scores)/total
+        count = total
+        low, high = min(low, scores.min()), max(high, scores.max())
+
+    seconds = time.perf_counter() - start
+    stats = {'mean': float(mean), 'std': float(np.sqrt(m2/count)), 'min': float(low), 'max': float(high)} \
+        if count else dict.fromkeys(('mean', 'std', 'min', 'max'), np.nan)
+    return {'top_k': list(zip(top_names, top_scores.tolist())), 'rows': count, 'seconds': seconds,
+            'rows_per_second': count/seconds if seconds > 0 else np.inf, 'stats': stats}
+
+
+#---------------------------------------------------------------------
+def score_file(path, index_col, weights, k=10, scaler=None, normalize=None, lower_is_better=(),
+               batch_size=65536, encoding=None):
+    """
+    Scores a catalog too large for memory straight from disk
+
+    Parameters
+    ----------
+    path: str
+        Parquet or Arrow file or partitioned directory (needs pyarrow), or a CSV file
+
+    index_col: str, int, or list
+        column(s) holding the option names
+
+    weights: dict
+        key value pairs are feature column and percent importance. Only these columns are read.
+
+    k: int
+        number of best options kept
+
+    scaler: FeatureScaler
+        Optional fitted scaler covering every weighted feature, e.g. Decision.scaler,
+        so the catalog is rated on the same scale as the decision. A ValueError names any feature it does not cover.
+
+    normalize: str or dict
+        Without a scaler, 'minmax' or 'none' per feature to fit one in a first pass over the file
+
+    lower_is_better: list
+        features where a smaller raw value is better. Only used with normalize.
+
+    batch_size: int
+        rows read and scored at a time
+
+    encoding: str
+        text encoding of a CSV file
+
+    Returns
+    -------
+    result: dict
+        see score_batches. With normalize, 'seconds' and 'rows_per_second' cover the scoring pass only.
+    """
+    features = list(weights)
+    if scaler is not None:
+        scaler = scaler.select(features)
+    elif normalize is not None:
+        scaler = fit_scaler(read_batches(path, index_col, features, batch_size, encoding), features,
+                            normalize, lower_is_better)
+    return score_batches(read_batches(path, index_col, features, batch_size, encoding),
+                         [weights[feature] for feature in features], k, scaler)
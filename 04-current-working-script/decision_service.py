@@ -0,0 +1,9 @@
+# Install the package once from the repository root with: pip install -e .
+# After that, `decision-service 01-data/03-decisions` runs the same thing from anywhere.
+import os
+from decisionclass.cli import decision_service
+
+
+
+if __name__ == '__main__':
+    decision_service([os.path.join(os.getcwd(), '..', '01-data', '03-decisions')])
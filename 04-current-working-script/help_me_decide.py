@@ -1,11 +1,8 @@
-import os
-import sys
-src_dir = os.path.join(os.getcwd(), '..', '03-src')
-sys.path.append(src_dir)
-import decisionclass.decision_functions as hmd
+# Install the package once from the repository root with: pip install -e .
+# After that, `help-me-decide` runs the same thing from anywhere.
+from decisionclass.cli import help_me_decide
 
 
 
-decision = hmd.Decision()
-decision.build_decision()
-decision.print_results()
+if __name__ == '__main__':
+    help_me_decide()
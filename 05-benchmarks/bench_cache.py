@@ -0,0 +1,55 @@
+"""
+Score cache benchmark: a handful of weight profiles asked for over and over, with and without
+the in-memory cache and after a restart with the on-disk tier.
+
+Run from the repository root:
+    python 05-benchmarks/bench_cache.py [number of options] [number of features]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def requests(decision, profiles, rounds=10, k=10):
+    # Every profile asks for its scores and its top k, round after round
+    for _ in range(rounds):
+        for weights in profiles:
+            decision.score_options(weights=weights)
+            list(decision.top_k(k, weights=weights))
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    n_profiles, rounds = 5, 10
+    
+    rng = np.random.default_rng(0)
+    features = [f'feature{i}' for i in range(n_features)]
+    options = [f'option{i}' for i in range(n_options)]
+    ratings = rng.integers(0, 11, size=(n_options, n_features)).astype(np.int8)
+    profiles = [rng.dirichlet(np.ones(n_features)) for _ in range(n_profiles)]
+    print(f'{n_options:,} options x {n_features} features, {n_profiles} profiles x {rounds} rounds of score + top 10')
+    
+    decision = hmd.Decision.from_ratings(features, np.ones(n_features), options, ratings)
+    print(f'  no cache                {timed(lambda: requests(decision, profiles, rounds)):7.2f} s')
+    
+    with tempfile.TemporaryDirectory() as directory:
+        cache = decision.use_score_cache(directory=directory)
+        print(f'  content hash            {timed(decision.content_hash):7.3f} s')
+        print(f'  in-memory cache         {timed(lambda: requests(decision, profiles, rounds)):7.2f} s  {cache.stats()}')
+        
+        # A new process: same ratings, empty memory, results still on disk
+        restarted = hmd.Decision.from_ratings(features, np.ones(n_features), options, ratings)
+        cache = restarted.use_score_cache(directory=directory)
+        print(f'  restart, on-disk tier   {timed(lambda: requests(restarted, profiles, rounds)):7.2f} s  {cache.stats()}')
@@ -0,0 +1,62 @@
+"""
+Constraint query benchmark: sorted-index filtering vs a full scan of the rating matrix, for growing result sizes.
+
+Run from the repository root:
+    python 05-benchmarks/bench_constraints.py [number of options] [number of features]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+def best_of(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def full_scan(decision, constraints, k):
+    # Mask every option against every limit, then score the survivors
+    ratings = decision.store.ratings
+    keep = np.ones(len(ratings), dtype=bool)
+    for feature, (low, high) in constraints.items():
+        column = ratings[:, decision.store.feature_index[feature]]
+        keep &= (column >= low) & (column <= high)
+    rows = np.flatnonzero(keep)
+    scores = hmd.calculate_scores(ratings[rows], decision.feature_points)
+    return rows[hmd.top_k_scores(scores, k)]
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    k = 10
+    
+    # Ratings out of 1000 so that narrow ranges are selective
+    rng = np.random.default_rng(0)
+    features = [f'feature{i}' for i in range(n_features)]
+    decision = hmd.Decision.from_ratings(features, rng.integers(1, 10, n_features),
+                                         [f'option{i}' for i in range(n_options)],
+                                         rng.integers(0, 1001, size=(n_options, n_features)).astype(np.float32)/100)
+    decision._update_weights()
+    
+    start = time.perf_counter()
+    decision.filter_options({feature: (None, None) for feature in features[:3]})
+    print(f'{n_options:,} options, {n_features} features: sorting 3 feature indexes took {time.perf_counter() - start:.2f} s')
+    
+    print(f'{"matches":>10} {"sorted index":>14} {"full scan":>12}')
+    for width in (0.01, 0.1, 1.0, 3.0, 10.0):
+        constraints = {features[0]: (5.0, 5.0 + width), features[1]: (0.0, 8.0), features[2]: (2.0, None)}
+        scan_constraints = {feature: (-np.inf if low is None else low, np.inf if high is None else high)
+                            for feature, (low, high) in constraints.items()}
+        n_matches = len(decision.filter_options(constraints))
+        indexed = best_of(lambda: decision.query(constraints, k))
+        scanned = best_of(lambda: full_scan(decision, scan_constraints, k))
+        print(f'{n_matches:>10,} {indexed*1000:>11.2f} ms {scanned*1000:>9.2f} ms')
@@ -0,0 +1,102 @@
+"""
+Hierarchical decision benchmark: a restaurant decision over the McDonald's and Starbucks menus,
+then a synthetic three-level tree with 1M leaf options, timing the top-level score after one leaf
+edit against re-scoring the whole tree.
+
+Run from the repository root:
+    python 05-benchmarks/bench_hierarchy.py [number of groups] [options per group]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+raw_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', '01-raw', 'fast-food')
+
+
+def best_of(function, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def restaurants():
+    # Each restaurant scores as its best menu group, each group as its best item
+    mcdonalds = hmd.Decision.from_csv_groups(os.path.join(raw_dir, 'mcdonalds-menu.csv'), 'Item', 'Category',
+                                             feature_cols=['Calories', 'Total Fat', 'Sodium', 'Protein', 'Dietary Fiber'],
+                                             lower_is_better=['Calories', 'Total Fat', 'Sodium'])
+    starbucks = hmd.Decision.from_csv_groups(os.path.join(raw_dir, 'starbucks_drinkMenu_expanded.csv'),
+                                             ['Beverage', 'Beverage_prep'], 'Beverage_category',
+                                             feature_cols=['Calories', 'Sodium (mg)', 'Protein (g)', 'Dietary Fibre (g)'],
+                                             lower_is_better=['Calories', 'Sodium (mg)'], duplicates='number')
+    return hmd.Decision.from_subdecisions({"McDonald's": mcdonalds, 'Starbucks': starbucks})
+
+
+def synthetic_tree(n_groups, per_group, n_features=20, fan_out=10, seed=0):
+    rng = np.random.default_rng(seed)
+    features = [f'feature{i}' for i in range(n_features)]
+    weights = rng.integers(1, 10, n_features)
+    leaves = [hmd.Decision.from_ratings(features, weights, [f'group{g}-option{i}' for i in range(per_group)],
+                                        rng.integers(0, 11, size=(per_group, n_features), dtype=np.int8))
+              for g in range(n_groups)]
+    middles = [hmd.Decision.from_subdecisions({f'group{g}': leaves[g] for g in range(start, min(start + fan_out, n_groups))},
+                                              aggregate='top_k_mean', k=10)
+               for start in range(0, n_groups, fan_out)]
+    top = hmd.Decision.from_subdecisions({f'region{m}': middle for m, middle in enumerate(middles)}, aggregate='mean')
+    return top, middles, leaves
+
+
+def rescore_everything(top, middles, leaves):
+    # What a flat recalculation costs: every leaf and every aggregate recomputed
+    for decision in leaves + middles + [top]:
+        decision._stale.update(decision.children)
+        decision.point_scores = None
+        decision._views = {}
+    return top.score_options()
+
+
+if __name__ == '__main__':
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    per_group = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    
+    decision = restaurants()
+    options, scores = decision.rank_options()
+    print('Restaurants by their best menu item:')
+    for option, score in zip(options, scores):
+        best = max(decision.children[option]['decision'].children.items(),
+                   key=lambda item: item[1]['decision'].aggregate_score())
+        print(f'  {option:12s} {score:5.2f}  best group: {best[0]}')
+    
+    start = time.perf_counter()
+    top, middles, leaves = synthetic_tree(n_groups, per_group)
+    print(f'\n{n_groups} groups x {per_group:,} options ({n_groups*per_group:,} leaves) built in '
+          f'{time.perf_counter() - start:.2f} s')
+    
+    start = time.perf_counter()
+    reference = top.score_options().copy()
+    print(f'first top-level score: {time.perf_counter() - start:.3f} s')
+    full = best_of(lambda: rescore_everything(top, middles, leaves))
+    
+    rng = np.random.default_rng(1)
+    hmd.Decision.metrics.enable()
+    
+    def edit_one_leaf():
+        leaf = leaves[rng.integers(len(leaves))]
+        leaf.set_rating(leaf.store.options[rng.integers(per_group)], 'feature0', int(rng.integers(0, 11)))
+        return top.score_options()
+    
+    edit_one_leaf()
+    hmd.Decision.metrics.reset()
+    incremental = best_of(edit_one_leaf, repeat=20)
+    refreshes = hmd.Decision.metrics.to_dict()['counters']['subdecision_refreshes']/20
+    hmd.Decision.metrics.disable()
+    
+    print(f'rescore the whole tree:       {full*1e3:9.2f} ms')
+    print(f'one leaf edit, then rescore:  {incremental*1e3:9.2f} ms  ({refreshes:.0f} aggregates recomputed, '
+          f'{full/incremental:.0f}x faster)')
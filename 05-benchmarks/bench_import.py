@@ -0,0 +1,88 @@
+"""
+Import-time benchmark and regression check.
+
+Times `import decisionclass.decision_functions` with `python -X importtime` in fresh interpreters,
+and checks that importing, loading and scoring a decision never imports pandas or matplotlib.
+Bytecode is cached in a temporary directory first, like an installed package.
+Exits with status 1 when the package's own import time (on top of NumPy) goes over budget.
+
+Run from the repository root:
+    python 05-benchmarks/bench_import.py [budget in ms] [runs]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', '03-decisions')
+
+# Modules that scoring-only users must not pay for
+LAZY_MODULES = ('pandas', 'matplotlib', 'matplotlib_venn', 'multiprocessing')
+
+SCORE_SNIPPET = f"""
+import sys
+import decisionclass.decision_functions as hmd
+decision = hmd.Decision.load({os.path.join(data_dir, 'cereal_decision.hmd')!r})
+decision.update_scores()
+list(decision.top_k(5))
+print(','.join(module for module in {LAZY_MODULES!r} if module in sys.modules))
+"""
+
+
+def import_times(statement, env):
+    """
+    Milliseconds spent importing every top-level module while running an import statement
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are the ones without indentation
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)/1000
+    return times
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values)//2]
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([src_dir, os.environ.get('PYTHONPATH', '')]),
+                   PYTHONPYCACHEPREFIX=cache_dir)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        # NumPy is imported first so its time is reported on its own
+        statement = 'import numpy; import decisionclass.decision_functions'
+        import_times(statement, env)
+
+        totals, numpys, packages = [], [], []
+        for _ in range(runs):
+            times = import_times(statement, env)
+            totals.append(sum(times.values()))
+            numpys.append(times['numpy'])
+            packages.append(sum(value for name, value in times.items() if name.startswith('decisionclass')))
+        loaded = subprocess.run([sys.executable, '-c', SCORE_SNIPPET], env=env, capture_output=True,
+                                text=True, check=True).stdout.strip()
+
+    print(f'import decisionclass.decision_functions, median of {runs} runs')
+    print(f'  total          {median(totals):7.1f} ms')
+    print(f'  numpy          {median(numpys):7.1f} ms')
+    print(f'  decisionclass  {median(packages):7.1f} ms (budget {budget:.0f} ms)')
+    print(f'  lazy modules imported by load + score: {loaded or "none"}')
+
+    failures = []
+    if median(packages) > budget:
+        failures.append(f'decisionclass import took {median(packages):.1f} ms, over the {budget:.0f} ms budget')
+    if loaded:
+        failures.append(f'loading and scoring imported {loaded}')
+    for failure in failures:
+        print('REGRESSION: ' + failure)
+    sys.exit(1 if failures else 0)
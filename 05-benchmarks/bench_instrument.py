@@ -0,0 +1,54 @@
+"""
+Instrumentation overhead: the cost an instrumented call adds with metrics off, on, and on with
+tracemalloc, for a tiny call where the overhead shows the most and for a large one.
+
+Run from the repository root:
+    python 05-benchmarks/bench_instrument.py [number of calls]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+from decisionclass.instrument import metrics
+from decisionclass.scoring import calculate_scores
+
+
+def per_call(function, calls):
+    best = np.inf
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start)/calls)
+    return best
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    decision = hmd.Decision.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data',
+                                              '03-decisions', 'cereal_decision.hmd'))
+    decision.update_scores()
+    rng = np.random.default_rng(0)
+    large = rng.integers(0, 11, size=(1_000_000, 25)).astype(np.int8)
+    weights = rng.random(25)
+    
+    score_options = type(decision).score_options
+    cases = (('calculate_scores, 77 options', calls,
+              lambda: calculate_scores.__wrapped__(decision.store.ratings, decision.feature_points),
+              lambda: calculate_scores(decision.store.ratings, decision.feature_points)),
+             ('Decision.score_options, 77 options', calls,
+              lambda: score_options.__wrapped__(decision), decision.score_options),
+             ('calculate_scores, 1M options', 5,
+              lambda: calculate_scores.__wrapped__(large, weights), lambda: calculate_scores(large, weights)))
+    
+    print(f'{"":36} {"plain":>10} {"off":>10} {"on":>10} {"tracemalloc":>12}')
+    for name, n, plain, function in cases:
+        times = [per_call(plain, n), per_call(function, n)]
+        with metrics.collect():
+            times.append(per_call(function, n))
+        with metrics.collect(trace_memory=True):
+            times.append(per_call(function, n))
+        print(f'{name:36} ' + ' '.join(f'{t*1e6:9.1f}us' if t < 1e-2 else f'{t*1e3:9.1f}ms' for t in times))
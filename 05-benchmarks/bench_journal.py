@@ -0,0 +1,91 @@
+"""
+Edit persistence benchmark: keeping a large decision saved after every edit by re-pickling it,
+by saving it again in the decision format, or by appending the edit to a journal, with and
+without batching the fsyncs. Then the cost of loading a snapshot and replaying its journal.
+
+Run from the repository root:
+    python 05-benchmarks/bench_journal.py [number of options] [number of features] [number of edits]
+"""
+import os
+import sys
+import pickle
+import tempfile
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+def synthetic_decision(n_options, n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    return hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], rng.integers(1, 10, n_features),
+                                     [f'option{i}' for i in range(n_options)],
+                                     rng.integers(0, 11, size=(n_options, n_features), dtype=np.int8))
+
+
+def random_edits(decision, n_edits, seed=1):
+    rng = np.random.default_rng(seed)
+    options = rng.integers(len(decision.store.options), size=n_edits)
+    features = rng.integers(len(decision.store.features), size=n_edits)
+    return [(decision.store.options[row], decision.store.features[column], int(rating))
+            for row, column, rating in zip(options, features, rng.integers(0, 11, size=n_edits))]
+
+
+def per_edit(decision, edits, persist):
+    # Seconds per edit, each edit followed by persist()
+    start = time.perf_counter()
+    for option, feature, rating in edits:
+        decision.set_rating(option, feature, rating)
+        persist()
+    return (time.perf_counter() - start)/len(edits)
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    n_edits = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+    
+    decision = synthetic_decision(n_options, n_features)
+    decision.update_scores()
+    edits = random_edits(decision, n_edits)
+    print(f'{n_options:,} options x {n_features} features, {n_edits:,} single-rating edits')
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, 'decision.pkl')
+        hmd_path = os.path.join(tmp_dir, 'decision.hmd')
+        
+        def save_pickle():
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(decision, f)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # Whole-file saves are slow, so they are timed over a few edits only
+        timings = {'re-pickle': per_edit(decision, edits[:5], save_pickle),
+                   'save .hmd': per_edit(decision, edits[:5], lambda: decision.save(hmd_path))}
+        for sync_every in (1, 64):
+            journal_path = os.path.join(tmp_dir, f'journal-{sync_every}.hmd')
+            journal = decision.start_journal(journal_path, sync_every=sync_every, sync_interval=60)
+            timings[f'journal, fsync every {sync_every}'] = per_edit(decision, edits, lambda: None)
+            size = os.path.getsize(journal.path)
+            decision.close_journal()
+        
+        for name, seconds in timings.items():
+            print(f'  {name:24s} {seconds*1e6:12,.1f} us per edit  ({1/seconds:10,.0f} edits/s)')
+        print(f'  journal size: {size/n_edits:.0f} bytes per edit')
+        
+        start = time.perf_counter()
+        hmd.Decision.load(journal_path)
+        replay = time.perf_counter() - start
+        start = time.perf_counter()
+        hmd.Decision.load(hmd_path)
+        plain = time.perf_counter() - start
+        print(f'load snapshot alone:            {plain*1e3:9.2f} ms')
+        print(f'load snapshot + replay {n_edits:,} edits: {replay*1e3:9.2f} ms')
+        
+        compacted = hmd.Decision.open_journaled(journal_path)
+        start = time.perf_counter()
+        compacted.snapshot()
+        print(f'snapshot (compacting the journal): {(time.perf_counter() - start)*1e3:9.2f} ms')
+        compacted.close_journal()
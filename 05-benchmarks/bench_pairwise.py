@@ -0,0 +1,87 @@
+"""
+Pairwise comparison benchmark: a per-pair loop like the old plotting code against the blockwise
+PairwiseMatrix, then a full pass over 50k options (majority wins), options_beating queries and
+the peak memory of the pass.
+
+Run from the repository root:
+    python 05-benchmarks/bench_pairwise.py [number of options] [number of features]
+"""
+import os
+import sys
+import time
+from itertools import combinations
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+def best_of(function, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory():
+    # This process's own peak resident memory in bytes
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])*1024
+    return 0
+
+
+def per_pair(ratings, weights, scores):
+    # What computing each plotted pair on its own costs: one small comparison per combination
+    results = []
+    for i, j in combinations(range(len(ratings)), 2):
+        greater, less = ratings[i] > ratings[j], ratings[i] < ratings[j]
+        results.append((scores[i] - scores[j], greater.sum(), less.sum(), (ratings[i] == ratings[j]).sum(),
+                        weights[greater].sum() - weights[less].sum()))
+    return results
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    rng = np.random.default_rng(0)
+    decision = hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], rng.integers(1, 10, n_features),
+                                         [f'option{i}' for i in range(n_options)],
+                                         rng.integers(0, 11, size=(n_options, n_features)).astype(np.int8))
+    store = decision.store
+    print(f'{n_options:,} options, {n_features} features')
+
+    # Every pair of a plotted subset: the per-pair loop against one pairwise_comparison
+    for n_plotted in (30, 1000):
+        options = store.options[:n_plotted]
+        rows = store.rows(options)
+        ratings = store.ratings[rows].astype(float)
+        scores = decision.score_options(options)
+        loop = best_of(lambda: per_pair(ratings, store.percents, scores), repeat=1)
+        matrix = best_of(lambda: decision.pairwise_comparison(options))
+        print(f'{n_plotted:>6} options, {n_plotted*(n_plotted - 1)//2:>7,} pairs   per-pair loop {loop*1000:9.1f} ms'
+              f'   pairwise_comparison {matrix*1000:8.1f} ms   {loop/matrix:6.1f}x')
+
+    # Every option against every other, reduced block by block
+    decision._views.pop('pairwise_matrix', None)
+    start = time.perf_counter()
+    pairwise = decision.pairwise_matrix()
+    build = time.perf_counter() - start
+    before = peak_memory()
+    start = time.perf_counter()
+    wins = pairwise.majority_wins()
+    full_pass = time.perf_counter() - start
+    print(f'build {build:.2f} s   majority wins over {n_options**2:,} pairs {full_pass:.1f} s'
+          f'   ({n_options**2/full_pass/1e6:.0f}M pairs/s)')
+    print(f'peak memory {before/2**20:.0f} MB before the pass, {peak_memory()/2**20:.0f} MB after'
+          f'   (a dense int32 won matrix alone would be {4*n_options**2/2**20:,.0f} MB)')
+    print(f'most majority wins: {store.options[int(np.argmax(wins))]} beats {wins.max():,} options')
+
+    target = store.options[int(np.argmin(wins))]
+    query = best_of(lambda: decision.options_beating(target, k=10))
+    winner, won, lost, margin = decision.options_beating(target, k=1)[0]
+    print(f'options_beating {query*1000:.1f} ms   {winner} beats {target} on {won} features, loses {lost}, margin {margin:+.3f}')
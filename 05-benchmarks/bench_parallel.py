@@ -0,0 +1,56 @@
+"""
+Parallel top-k scaling benchmark: serial scoring vs a process pool over shared memory-mapped ratings.
+
+Run from the repository root:
+    python 05-benchmarks/bench_parallel.py [number of options] [number of features]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+from decisionclass.parallel import ParallelScorer
+
+
+def best_of(function, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    k = 10
+    
+    rng = np.random.default_rng(0)
+    decision = hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], rng.integers(1, 10, n_features),
+                                         [f'option{i}' for i in range(n_options)],
+                                         rng.integers(0, 11, size=(n_options, n_features), dtype=np.int8))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.hmd')
+        decision.save(path)
+        decision = hmd.Decision.load(path)
+        decision._update_weights()
+        weights = decision.feature_points
+        
+        serial = best_of(lambda: hmd.top_k_scores(hmd.calculate_scores(decision.rating_matrix, weights), k))
+        print(f'{n_options:,} options x {n_features} features, top {k}, {os.cpu_count()} cores')
+        print(f'  serial      {serial*1e3:9.1f} ms')
+        
+        workers = 1
+        while workers <= os.cpu_count():
+            start = time.perf_counter()
+            with ParallelScorer(decision.rating_matrix, workers) as scorer:
+                scorer.top_k(weights, k)
+                startup = time.perf_counter() - start
+                elapsed = best_of(lambda: scorer.top_k(weights, k))
+            print(f'  {workers:>2} workers {elapsed*1e3:9.1f} ms   speedup {serial/elapsed:5.2f}x   '
+                  f'(pool start and first call {startup*1e3:.0f} ms)')
+            workers *= 2
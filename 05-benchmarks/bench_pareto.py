@@ -0,0 +1,66 @@
+"""
+Pareto front benchmark: the cereal and McDonald's data, then synthetic catalogs up to 1M options,
+comparing the sort-based 2-3 feature sweeps with the block-nested-loop used for more features.
+tests/test_pareto.py checks every method against a brute-force front.
+
+Run from the repository root:
+    python 05-benchmarks/bench_pareto.py [largest number of options]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+from decisionclass.pareto import pareto_front, _front_bnl, _unique_rows
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def synthetic(n_options, n_features, correlation, rng):
+    # 'independent' ratings, or 'anti' where doing well on one feature costs on the others (big fronts)
+    points = rng.random((n_options, n_features))
+    if correlation == 'anti':
+        points = points/points.sum(axis=1, keepdims=True) + rng.normal(0, 0.02, (n_options, n_features))
+    return np.round(points*1000)/100
+
+
+if __name__ == '__main__':
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data')
+    rng = np.random.default_rng(0)
+    
+    cereal = hmd.Decision.load(os.path.join(data_dir, '03-decisions', 'cereal_decision.hmd'))
+    front, seconds = timed(lambda: cereal.pareto_front())
+    print(f'cereal, {len(cereal.store.features)} features: {len(front)} of {len(cereal.store.options)} on the front, {seconds*1000:.1f} ms')
+    front, seconds = timed(lambda: cereal.pareto_front(['calories', 'sugars', 'fiber']))
+    print(f'cereal, calories/sugars/fiber: {len(front)} on the front, {seconds*1000:.1f} ms')
+    
+    features = ['Calories', 'Total Fat', 'Sugars', 'Protein', 'Dietary Fiber']
+    mcdonalds = hmd.Decision.from_csv(os.path.join(data_dir, '01-raw', 'fast-food', 'mcdonalds-menu.csv'), 'Item', features)
+    front, seconds = timed(lambda: mcdonalds.pareto_front(features, lower_is_better=['Calories', 'Total Fat', 'Sugars']))
+    print(f'McDonald\'s, {len(features)} features: {len(front)} of {len(mcdonalds.store.options)} on the front, {seconds*1000:.1f} ms')
+    
+    print(f'\n{"options":>10} {"features":>8} {"ratings":>12} {"front":>8} {"pareto_front":>13} {"BNL only":>10}')
+    sizes = [n for n in (10_000, 100_000, 1_000_000) if n <= largest]
+    for n_options in sizes:
+        for n_features in (2, 3, 5, 8):
+            for correlation in ('independent', 'anti'):
+                # Fronts of tens of thousands of options make the block-nested-loop quadratic; skip those above 100k
+                if n_options > 100_000 and n_features > 3 and (correlation == 'anti' or n_features > 5):
+                    print(f'{n_options:>10,} {n_features:>8} {correlation:>12} {"skipped":>8}')
+                    continue
+                points = synthetic(n_options, n_features, correlation, rng)
+                front, seconds = timed(lambda: pareto_front(points))
+                # The block-nested-loop alone on the same (deduplicated) options, for the sort-based cases
+                bnl = ''
+                if n_features <= 3 and (n_options <= 100_000 or correlation == 'independent'):
+                    unique, _ = _unique_rows(points)
+                    _, bnl_seconds = timed(lambda: _front_bnl(unique))
+                    bnl = f'{bnl_seconds:9.2f}s'
+                print(f'{n_options:>10,} {n_features:>8} {correlation:>12} {front.sum():>8,} {seconds:>12.2f}s {bnl:>10}')
@@ -0,0 +1,69 @@
+"""
+Load-time benchmark: pickled Decision objects vs the memory-mapped decision format.
+
+Run from the repository root:
+    python 05-benchmarks/bench_persistence.py
+"""
+import os
+import sys
+import pickle
+import tempfile
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def best_of(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def legacy_state(decision):
+    # The attributes a Decision pickled before the rating store carried
+    return {'feature_list': decision.feature_list, 'feature_dict': decision.feature_dict,
+            'option_list': list(decision.option_list), 'option_dict': decision.option_dict,
+            'option_value_df': decision.option_value_df}
+
+
+def synthetic_decision(n_options, n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    return hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], np.ones(n_features),
+                                     [f'option{i}' for i in range(n_options)],
+                                     rng.integers(0, 11, size=(n_options, n_features), dtype=np.int8))
+
+
+def compare(name, decision, tmp_dir):
+    pickle_path = os.path.join(tmp_dir, f'{name}.pkl')
+    hmd_path = os.path.join(tmp_dir, f'{name}.hmd')
+    with open(pickle_path, 'wb') as f:
+        pickle.dump(legacy_state(decision), f)
+    decision.save(hmd_path)
+    
+    def load_pickle():
+        with open(pickle_path, 'rb') as f:
+            pickle.load(f)
+    
+    pickle_time = best_of(load_pickle)
+    hmd_time = best_of(lambda: hmd.Decision.load(hmd_path))
+    print(f'{name:>20}  {len(decision.store.options):>9,} options  '
+          f'pickle {pickle_time*1e3:9.2f} ms  ({os.path.getsize(pickle_path)/1e6:7.2f} MB)   '
+          f'mmap {hmd_time*1e3:7.3f} ms  ({os.path.getsize(hmd_path)/1e6:7.2f} MB)   '
+          f'{pickle_time/hmd_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    with open(os.path.join(repo_dir, '01-data', '03-decisions', 'cereal_decision.pkl'), 'rb') as f:
+        cereal_decision = pickle.load(f)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        compare('cereal', cereal_decision, tmp_dir)
+        for n_options in (10_000, 100_000):
+            compare(f'synthetic_{n_options}', synthetic_decision(n_options, 20), tmp_dir)
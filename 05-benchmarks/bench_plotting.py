@@ -0,0 +1,54 @@
+"""
+Plot rendering benchmark: drawing every radar plot with pyplot one by one vs the reused-figure file renderer.
+
+Run from the repository root:
+    python 05-benchmarks/bench_plotting.py [number of options] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from itertools import combinations
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', '03-decisions')
+    
+    start = time.perf_counter()
+    decision = hmd.Decision.load(os.path.join(data_dir, 'cereal_decision.hmd'))
+    decision.update_scores()
+    print(f'load and score without matplotlib: {time.perf_counter() - start:.3f} s '
+          f'(matplotlib imported: {"matplotlib" in sys.modules})')
+    option_list = list(decision.store.options)[:n_options]
+    n_plots = len(list(combinations(option_list, 2)))
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # One pyplot figure per plot, saved where plt.show() would have shown it
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        paths = iter(os.path.join(tmp_dir, f'pyplot-{i}.png') for i in range(n_plots))
+        plt.show = lambda: (plt.savefig(next(paths)), plt.close('all'))
+        start = time.perf_counter()
+        decision.plot_radar2(option_list)
+        pyplot_time = time.perf_counter() - start
+        print(f'{n_plots} radar plots, pyplot one by one:  {pyplot_time:6.2f} s')
+        
+        start = time.perf_counter()
+        decision.plot_radar2(option_list, output=os.path.join(tmp_dir, 'png'))
+        reused = time.perf_counter() - start
+        print(f'{n_plots} radar plots, reused figure:      {reused:6.2f} s  ({pyplot_time/reused:.1f}x)')
+        
+        start = time.perf_counter()
+        decision.plot_radar2(option_list, output=os.path.join(tmp_dir, 'radar.pdf'))
+        print(f'{n_plots} radar plots, multi-page PDF:     {time.perf_counter() - start:6.2f} s')
+        
+        if workers > 1:
+            start = time.perf_counter()
+            decision.plot_radar2(option_list, output=os.path.join(tmp_dir, 'parallel'), workers=workers)
+            print(f'{n_plots} radar plots, {workers} processes:        {time.perf_counter() - start:6.2f} s')
@@ -0,0 +1,63 @@
+"""
+Weight sensitivity benchmark: 10k random importance samples scored against 10k options,
+counting top-10 places with the threshold pass vs a full argpartition of every sample.
+
+Run from the repository root:
+    python 05-benchmarks/bench_sensitivity.py [number of samples] [number of options] [number of features]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+from decisionclass.sensitivity import sample_weights, rank_counts
+
+
+def best_of(function, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def argpartition_counts(ratings, weight_matrix, top_ranks, samples_per_block=1600):
+    # Every sample's scores partitioned in full, then the top places sorted
+    ratings_t = np.nan_to_num(ratings).T.copy()
+    counts = np.zeros((len(ratings), top_ranks), dtype=np.int64)
+    for start in range(0, len(weight_matrix), samples_per_block):
+        block = weight_matrix[start:start + samples_per_block] @ ratings_t
+        top = np.argpartition(-block, top_ranks - 1, axis=1)[:, :top_ranks]
+        order = np.lexsort((top, -np.take_along_axis(block, top, axis=1)), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        np.add.at(counts, (top, np.broadcast_to(np.arange(top_ranks), top.shape)), 1)
+    return counts
+
+
+if __name__ == '__main__':
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_options = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    n_features = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    
+    rng = np.random.default_rng(0)
+    features = [f'feature{i}' for i in range(n_features)]
+    decision = hmd.Decision.from_ratings(features, rng.integers(1, 10, n_features),
+                                         [f'option{i}' for i in range(n_options)],
+                                         rng.integers(0, 11, size=(n_options, n_features)).astype(np.int8))
+    
+    elapsed = best_of(lambda: decision.weight_sensitivity(n_samples))
+    result = decision.weight_sensitivity(n_samples)
+    print(f'{n_samples:,} samples x {n_options:,} options x {n_features} features')
+    print(f'  Decision.weight_sensitivity  {elapsed:.2f} s')
+    print(f'  {result["winner"]} wins {result["win_probability"].max()*100:.1f}% at most, '
+          f'{np.count_nonzero(result["win_probability"])} options ever win')
+    
+    ratings = decision.store.ratings.astype(np.float32)
+    weight_matrix = sample_weights(decision.store.percents, n_samples)
+    threshold = best_of(lambda: rank_counts(ratings, weight_matrix, 10))
+    full = best_of(lambda: argpartition_counts(ratings, weight_matrix, 10))
+    print(f'  top-10 counts, threshold pass   {threshold:.2f} s')
+    print(f'  top-10 counts, argpartition     {full:.2f} s')
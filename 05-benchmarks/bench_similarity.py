@@ -0,0 +1,60 @@
+"""
+Nearest-option query benchmark: exact scans vs the random-projection index, with the recall of the approximate results.
+
+Run from the repository root:
+    python 05-benchmarks/bench_similarity.py [number of options] [number of features]
+"""
+import os
+import sys
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+
+
+def best_of(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    k = 10
+    
+    # Options come in families (flavours of one cereal, sizes of one drink), so they cluster around a few thousand centres
+    rng = np.random.default_rng(0)
+    centres = rng.integers(0, 11, size=(max(n_options//1000, 1), n_features))
+    ratings = centres[rng.integers(0, len(centres), n_options)] + rng.integers(-1, 2, size=(n_options, n_features))
+    decision = hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], rng.integers(1, 10, n_features),
+                                         [f'option{i}' for i in range(n_options)],
+                                         np.clip(ratings, 0, 10).astype(np.int8))
+    queries = [decision.store.options[row] for row in rng.integers(0, n_options, 20)]
+    
+    print(f'{n_options:,} options, {n_features} features, k={k}')
+    for metric in ('cosine', 'euclidean', 'overlap'):
+        start = time.perf_counter()
+        decision.similarity_index(metric)
+        build = time.perf_counter() - start
+        exact = best_of(lambda: decision.most_similar(queries[0], k, metric))
+        print(f'{metric:>10} exact        build {build:7.2f} s   query {exact*1000:8.1f} ms')
+        if metric == 'overlap':
+            continue
+        
+        start = time.perf_counter()
+        decision.similarity_index(metric, approximate=True)
+        build = time.perf_counter() - start
+        approximate = best_of(lambda: decision.most_similar(queries[0], k, metric, approximate=True))
+        # Clustered options tie a lot, so a result counts as found when it is at least as alike as the exact k-th
+        found = []
+        for query in queries:
+            kth = decision.most_similar(query, k, metric)[-1][1]
+            values = np.array([value for _, value in decision.most_similar(query, k, metric, approximate=True)])
+            found.append(np.sum(values <= kth + 1e-6 if metric == 'euclidean' else values >= kth - 1e-6))
+        print(f'{metric:>10} approximate  build {build:7.2f} s   query {approximate*1000:8.1f} ms'
+              f'   recall {np.sum(found)/(k*len(queries)):.2f}')
@@ -0,0 +1,92 @@
+"""
+Out-of-core scoring benchmark: writes a synthetic CSV catalog, then finds its top 10 options
+by streaming it in batches vs loading it whole with Decision.from_csv. Each way runs in its own
+process so its peak memory can be read from the operating system.
+
+Run from the repository root:
+    python 05-benchmarks/bench_streaming.py [number of options] [number of features] [batch size]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+
+
+def write_catalog(path, n_options, n_features, block=250_000, seed=0):
+    # Written a block at a time, so writing does not need the whole catalog in memory either
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        f.write('option,' + ','.join(f'feature{i}' for i in range(n_features)) + '\n')
+        for start in range(0, n_options, block):
+            ratings = rng.integers(0, 1001, size=(min(block, n_options - start), n_features))
+            lines = [f'option{start + row},' + ','.join(map(str, values)) for row, values in enumerate(ratings.tolist())]
+            f.write('\n'.join(lines) + '\n')
+    return
+
+
+def peak_memory():
+    # VmHWM is this process's own peak; ru_maxrss would include the parent's peak from before exec
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+
+def weights(n_features):
+    return {f'feature{i}': (i % 5 + 1)/sum(j % 5 + 1 for j in range(n_features)) for i in range(n_features)}
+
+
+def run(mode, path, n_features, batch_size):
+    # Runs in the child process and prints one JSON line
+    import decisionclass.decision_functions as hmd
+    from decisionclass.streaming import score_file
+    start = time.perf_counter()
+    if mode == 'stream':
+        result = score_file(path, 'option', weights(n_features), k=10, batch_size=batch_size)
+        top = result['top_k']
+    else:
+        decision = hmd.Decision.from_csv(path, 'option')
+        decision.feature_dict = {feature: {'value': weight, 'percent': weight}
+                                 for feature, weight in weights(n_features).items()}
+        top = [(option, float(score)) for option, score in decision.top_k(10)]
+    seconds = time.perf_counter() - start
+    peak = peak_memory()
+    print(json.dumps({'seconds': seconds, 'peak_bytes': peak, 'top': top}))
+    return
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+        sys.exit(0)
+    
+    n_options = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_features = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 65536
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'catalog.csv')
+        start = time.perf_counter()
+        write_catalog(path, n_options, n_features)
+        print(f'{n_options:,} options x {n_features} features: {os.path.getsize(path)/2**20:.0f} MB of CSV '
+              f'written in {time.perf_counter() - start:.1f} s')
+        
+        results = {}
+        for mode in ('stream', 'in-memory'):
+            output = subprocess.run([sys.executable, __file__, '--child', mode, path, str(n_features), str(batch_size)],
+                                    capture_output=True, text=True, check=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f'{mode:10s} {results[mode]["seconds"]:7.2f} s  {n_options/results[mode]["seconds"]:12,.0f} rows/s  '
+                  f'peak memory {results[mode]["peak_bytes"]/2**20:7.0f} MB')
+        
+        print('top 10:', ', '.join(option for option, _ in results['stream']['top']))
@@ -0,0 +1,93 @@
+"""
+Load generator for the decision service. Reports latency percentiles and requests per second.
+
+Starts a service on the saved decisions in 01-data/03-decisions, or targets a running one:
+    python 05-benchmarks/load_generator.py [--url http://127.0.0.1:8000] [--decision cereal_decision]
+                                           [--clients 64] [--seconds 5] [--endpoint top_k]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+from decisionclass.service import DecisionService
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+async def request(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, path, features, seconds, latencies, errors, seed):
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        weights = dict(zip(features, rng.dirichlet(np.ones(len(features))).tolist()))
+        start = time.perf_counter()
+        status = await request(reader, writer, host, path, {'k': 10, 'weights': weights})
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+    writer.close()
+
+
+async def main(arguments):
+    service = server = None
+    if arguments.url is None:
+        service = DecisionService.from_directory(os.path.join(repo_dir, '01-data', '03-decisions'))
+        server = await service.start('127.0.0.1', 0)
+        host, port = '127.0.0.1', server.sockets[0].getsockname()[1]
+        features = list(service.decisions[arguments.decision].store.features)
+    else:
+        url = urlsplit(arguments.url)
+        host, port = url.hostname, url.port or 80
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f'GET /decisions HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        response = (await reader.read()).split(b'\r\n\r\n', 1)[1]
+        features = json.loads(response)['decisions'][arguments.decision]['features']
+    
+    path = f'/decisions/{arguments.decision}/{arguments.endpoint}'
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, path, features, arguments.seconds, latencies, errors, seed)
+                           for seed in range(arguments.clients)])
+    elapsed = time.perf_counter() - start
+    
+    latencies = np.array(latencies)*1e3
+    print(f'{len(latencies):,} requests from {arguments.clients} clients in {elapsed:.1f} s, {len(errors)} errors')
+    print(f'  {len(latencies)/elapsed:,.0f} requests/s   p50 {np.percentile(latencies, 50):.2f} ms   '
+          f'p99 {np.percentile(latencies, 99):.2f} ms   max {latencies.max():.2f} ms')
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default=None, help='running service to target; default starts one in-process')
+    parser.add_argument('--decision', default='cereal_decision')
+    parser.add_argument('--endpoint', default='top_k', choices=['top_k', 'score', 'what_if'])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,354 @@
+"""
+Benchmark suite for Decision and the module functions, with a compare mode that flags regressions.
+
+Times ingestion (Decision.from_csv), update_option_value_df, print_scores, scoring and ranking,
+the interactive mutators (update_option_dict / update_feature_list, with every prompt answered
+from a script and the pause between prompts skipped), the direct mutators, save/load, and
+plot_radar2 / plot_venn2 rendering to files. Every case reports the best and median of several
+runs and the peak bytes allocated in one more run under tracemalloc.
+
+Datasets are the cereal and fast-food CSVs in 01-data/01-raw plus synthetic catalogs:
+    quick     1k x 5, 10k x 25
+    default   quick plus 100k x 25, 100k x 200, 1M x 25
+    full      default plus 1M x 200, 10M x 5, 10M x 25 (needs about 8 GB of memory)
+Cases built on option_value_df (a pandas DataFrame with one column per option) only run up to
+100k options, and the interactive mutators, which print every option, only up to 10k.
+
+Run from the repository root:
+    python 05-benchmarks/suite.py run [--preset quick] [--repeat 3] [--only CASE ...] [--output results.json]
+    python 05-benchmarks/suite.py compare baseline.json results.json [--threshold 0.2]
+"""
+import argparse
+import builtins
+import contextlib
+import csv
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '03-src')
+sys.path.append(src_dir)
+import decisionclass.decision_functions as hmd
+from decisionclass.ingest import sniff_encoding
+
+raw_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', '01-raw')
+
+PRESETS = {'quick': [(1_000, 5), (10_000, 25)]}
+PRESETS['default'] = PRESETS['quick'] + [(100_000, 25), (100_000, 200), (1_000_000, 25)]
+PRESETS['full'] = PRESETS['default'] + [(1_000_000, 200), (10_000_000, 5), (10_000_000, 25)]
+
+# name, file, option name column(s), text columns that are not features
+REAL_DATASETS = (('cereal', 'grocery-store/cereal.csv', 'name', ('mfr', 'type')),
+                 ('mcdonalds', 'fast-food/mcdonalds-menu.csv', 'Item', ('Category', 'Serving Size')),
+                 ('starbucks-drinks', 'fast-food/starbucks_drinkMenu_expanded.csv', ['Beverage', 'Beverage_prep'],
+                  ('Beverage_category',)),
+                 ('starbucks-food', 'fast-food/starbucks-menu-nutrition-food.csv', 0, ()))
+
+DATAFRAME_LIMIT = 100_000
+PROMPT_LIMIT = 10_000
+INGEST_LIMIT = 1_000_000
+PLOTTED_OPTIONS = 5
+
+
+#---------------------------------------------------------------------
+# DATASETS
+#---------------------------------------------------------------------
+def synthetic_decision(n_options, n_features, seed=0):
+    # Whole ratings out of 10 and importance points like set_feature_importance hands out
+    rng = np.random.default_rng(seed)
+    return hmd.Decision.from_ratings([f'feature{i}' for i in range(n_features)], rng.integers(1, 10, n_features),
+                                     [f'option{i}' for i in range(n_options)],
+                                     rng.integers(0, 11, size=(n_options, n_features), dtype=np.int8))
+
+
+def write_csv(decision, path):
+    import pandas as pd
+    frame = pd.DataFrame(decision.store.ratings, columns=decision.store.features)
+    frame.insert(0, 'option', list(decision.store.options))
+    frame.to_csv(path, index=False)
+    return
+
+
+def csv_features(path, index_col, text_cols):
+    with open(path, encoding=sniff_encoding(path), newline='') as f:
+        header = next(csv.reader(f))
+    index = set(index_col) if isinstance(index_col, list) else {index_col}
+    return [column.strip() for position, column in enumerate(header)
+            if column not in text_cols and column not in index and position not in index]
+
+
+def read_real(path, index_col, features):
+    # Starbucks drinks repeat a name for every cup size, which the file has no column for
+    decision = hmd.Decision.from_csv(path, index_col, features, normalize='minmax', duplicates='number')
+    # Every feature equally important, as points out of a round total like set_feature_importance
+    decision.feature_dict = {feature: {'value': 1, 'percent': 1/len(decision.feature_list)}
+                             for feature in decision.feature_list}
+    return decision
+
+
+def datasets(preset, tmp_dir, write=True):
+    """
+    Yields (name, decision, ingest) for every dataset, ingest being the from_csv arguments or None.
+    Synthetic catalogs are only written to CSV when write is True.
+    """
+    for name, file, index_col, text_cols in REAL_DATASETS:
+        path = os.path.join(raw_dir, file)
+        features = csv_features(path, index_col, text_cols)
+        yield name, read_real(path, index_col, features), (path, index_col, features, 'minmax')
+    for n_options, n_features in PRESETS[preset]:
+        decision = synthetic_decision(n_options, n_features)
+        ingest = None
+        if write and n_options <= INGEST_LIMIT:
+            path = os.path.join(tmp_dir, f'synthetic-{n_options}x{n_features}.csv')
+            write_csv(decision, path)
+            ingest = (path, 'option', None, None)
+        yield f'synthetic-{n_options}x{n_features}', decision, ingest
+
+
+#---------------------------------------------------------------------
+# MEASURING
+#---------------------------------------------------------------------
+@contextlib.contextmanager
+def scripted_prompts(answer='5'):
+    # The interactive mutators ask for every rating and importance with input().
+    # Answer each prompt the same way, skip the pause between prompts and drop the printout.
+    saved = builtins.input, hmd.time.sleep
+    builtins.input = lambda prompt='': answer
+    hmd.time.sleep = lambda seconds: None
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input, hmd.time.sleep = saved
+
+
+def clone(decision):
+    return pickle.loads(pickle.dumps(decision))
+
+
+def measure(setup, run, repeat, memory=True):
+    """
+    Best and median seconds of run(setup()) over repeat runs, and the peak bytes allocated by one more run
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'median_seconds': float(np.median(times)), 'peak_bytes': peak, 'runs': repeat}
+
+
+def cases(decision, ingest, tmp_dir):
+    """
+    Yields (case name, setup, run) for one dataset, or (case name, reason, None) for a skipped case
+    """
+    n_options = len(decision.store.options)
+    rng = np.random.default_rng(1)
+    decision.update_scores()
+
+    if ingest is not None:
+        path, index_col, features, normalize = ingest
+        yield 'from_csv', lambda: None, lambda _: hmd.Decision.from_csv(path, index_col, features, normalize=normalize,
+                                                                        duplicates='number')
+
+    yield 'update_scores', lambda: decision, lambda d: d.update_scores()
+    yield 'top_k', lambda: decision, lambda d: list(d.top_k(10))
+    yield 'rank_options', lambda: decision, lambda d: d.rank_options()
+
+    def cells():
+        rows = rng.integers(0, n_options, 1000)
+        columns = rng.choice(np.flatnonzero(decision.store.active()), 1000)
+        return clone(decision), rows, columns, rng.integers(0, 11, 1000)
+
+    def set_ratings(state):
+        d, rows, columns, ratings = state
+        for row, column, rating in zip(rows.tolist(), columns.tolist(), ratings.tolist()):
+            d.set_rating(d.store.options[row], d.store.features[column], rating)
+
+    yield 'set_rating x1000', cells, set_ratings
+    yield 'set_feature_weight', lambda: clone(decision), \
+        lambda d: d.set_feature_weight(d.feature_list[0], 7)
+    new_ratings = rng.integers(0, 11, size=(1000, len(decision.store.features))).astype(np.float32)
+    yield 'append_options x1000', lambda: clone(decision), \
+        lambda d: d.append_options([f'new option {i}' for i in range(1000)], new_ratings)
+
+    path = os.path.join(tmp_dir, 'decision.hmd')
+    yield 'save', lambda: decision, lambda d: d.save(path)
+    yield 'load', lambda: decision.save(path), lambda _: hmd.Decision.load(path)
+
+    if n_options > DATAFRAME_LIMIT:
+        reason = f'option_value_df has one column per option, only run up to {DATAFRAME_LIMIT:,} options'
+        for case in ('update_option_value_df', 'print_scores', 'plot_radar2', 'plot_venn2'):
+            yield case, reason, None
+    else:
+        def rebuild(d):
+            d.update_option_value_df()
+            return d.option_value_df
+
+        def print_all(df):
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                hmd.print_scores(df, decision.option_list)
+
+        yield 'update_option_value_df', lambda: clone(decision), rebuild
+        if len(decision.store.option_index) < n_options:
+            yield 'print_scores', 'option names repeat and print_scores selects options by name', None
+        else:
+            yield 'print_scores', lambda: decision.option_value_df, print_all
+
+        try:
+            import matplotlib
+            import matplotlib_venn
+        except ImportError:
+            for case in ('plot_radar2', 'plot_venn2'):
+                yield case, 'matplotlib and matplotlib-venn are not installed', None
+        else:
+            options = list(decision.store.options[:PLOTTED_OPTIONS])
+            plot_dir = os.path.join(tmp_dir, 'plots')
+            yield f'plot_radar2 {PLOTTED_OPTIONS} options', lambda: decision, \
+                lambda d: d.plot_radar2(options, output=plot_dir)
+            yield f'plot_venn2 {PLOTTED_OPTIONS} options', lambda: decision, \
+                lambda d: d.plot_venn2(options, output=plot_dir)
+
+    if n_options > PROMPT_LIMIT:
+        reason = f'the interactive mutators print every option, only run up to {PROMPT_LIMIT:,} options'
+        for case in ('update_option_list add', 'update_option_list remove', 'update_feature_list remove'):
+            yield case, reason, None
+    else:
+        def prompted(mutate):
+            def run(d):
+                with scripted_prompts():
+                    mutate(d)
+            return run
+
+        yield 'update_option_list add', lambda: clone(decision), \
+            prompted(lambda d: d.update_option_list('benchmark option'))
+        yield 'update_option_list remove', lambda: clone(decision), \
+            prompted(lambda d: d.update_option_list(d.option_list[0]))
+        yield 'update_feature_list remove', lambda: clone(decision), \
+            prompted(lambda d: d.update_feature_list(d.feature_list[-1]))
+    return
+
+
+def run_suite(preset, repeat, only, memory):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write = not only or any('from_csv'.startswith(name) for name in only)
+        for dataset, decision, ingest in datasets(preset, tmp_dir, write):
+            n_options, n_features = len(decision.store.options), int(decision.store.active().sum())
+            print(f'{dataset}: {n_options:,} options x {n_features} features', flush=True)
+            for case, setup, run in cases(decision, ingest, tmp_dir):
+                if only and not any(case.startswith(name) for name in only):
+                    continue
+                result = {'dataset': dataset, 'case': case, 'options': n_options, 'features': n_features}
+                if run is None:
+                    result['skipped'] = setup
+                    print(f'  {case:32} skipped')
+                else:
+                    result.update(measure(setup, run, repeat, memory))
+                    peak = '' if result['peak_bytes'] is None else f'{result["peak_bytes"]/2**20:10.1f} MB peak'
+                    print(f'  {case:32} {result["seconds"]*1e3:10.2f} ms {peak}', flush=True)
+                results.append(result)
+            del decision
+    return results
+
+
+def environment(preset, repeat):
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count(), 'preset': preset, 'repeat': repeat,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+#---------------------------------------------------------------------
+# COMPARING
+#---------------------------------------------------------------------
+def compare(baseline, current, threshold=0.2, min_seconds=0.001, min_bytes=2**20):
+    """
+    Matches the cases of two runs and lists the ones that got slower or used more memory
+
+    A case regresses when it takes more than (1 + threshold) times as long and at least min_seconds
+    longer, or allocates more than (1 + threshold) times as many bytes and at least min_bytes more.
+
+    Returns
+    -------
+    rows: list
+        (dataset, case, old seconds, new seconds, old peak, new peak, flags) for every case in both runs
+
+    regressions: int
+        number of flagged cases
+    """
+    old = {(result['dataset'], result['case']): result for result in baseline['results'] if 'seconds' in result}
+    rows, regressions = [], 0
+    for result in current['results']:
+        key = (result['dataset'], result['case'])
+        if 'seconds' not in result or key not in old:
+            continue
+        before = old[key]
+        flags = []
+        if result['seconds'] > before['seconds']*(1 + threshold) and result['seconds'] - before['seconds'] > min_seconds:
+            flags.append('SLOWER')
+        if before.get('peak_bytes') is not None and result.get('peak_bytes') is not None \
+                and result['peak_bytes'] > before['peak_bytes']*(1 + threshold) \
+                and result['peak_bytes'] - before['peak_bytes'] > min_bytes:
+            flags.append('MORE MEMORY')
+        regressions += bool(flags)
+        rows.append(key + (before['seconds'], result['seconds'], before.get('peak_bytes'), result.get('peak_bytes'), flags))
+    return rows, regressions
+
+
+def print_comparison(rows):
+    def megabytes(peak):
+        return f'{"":>8}' if peak is None else f'{peak/2**20:6.1f}MB'
+    
+    print(f'{"dataset":28} {"case":32} {"before":>10} {"after":>10} {"change":>8} {"peak before":>12} {"after":>8}')
+    for dataset, case, before, after, peak_before, peak_after, flags in rows:
+        print(f'{dataset:28} {case:32} {before*1e3:8.2f}ms {after*1e3:8.2f}ms {(after/before - 1)*100:+7.1f}% '
+              f'{megabytes(peak_before):>12} {megabytes(peak_after)} ' + ' '.join(flags))
+    return
+
+
+#---------------------------------------------------------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark suite for decisionclass')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks and write JSON results')
+    run_parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--only', nargs='*', default=None, help='case names (or prefixes) to run')
+    run_parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run of every case')
+    run_parser.add_argument('--output', default='benchmark-results.json')
+    compare_parser = commands.add_parser('compare', help='flag regressions between two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, 0.2 is 20%%')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.001, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_suite(args.preset, args.repeat, args.only, not args.no_memory)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(args.preset, args.repeat), 'results': results}, f, indent=1)
+        print(f'Wrote {len(results)} results to {args.output}')
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        rows, regressions = compare(baseline, current, args.threshold, args.min_seconds)
+        print_comparison(rows)
+        print(f'{regressions} regression{"" if regressions == 1 else "s"} over {args.threshold:.0%}')
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,127 @@
+"""
+ScoreCache in memory and on disk, and the results decisions keep in it
+"""
+import os
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.cache import ScoreCache, result_key, content_hash
+
+WEIGHTS = {'a': 0.2, 'b': 0.3, 'c': 0.5}
+
+
+@pytest.fixture
+def decision_file(tmp_path):
+    rng = np.random.default_rng(0)
+    decision = hmd.Decision.from_ratings(['a', 'b', 'c'], [2, 3, 5], [f'o{i}' for i in range(50)],
+                                         rng.integers(0, 11, (50, 3)))
+    path = str(tmp_path / 'decision.hmd')
+    decision.save(path)
+    return path
+
+
+def expected_scores(decision, weights=WEIGHTS):
+    return np.nan_to_num(decision.store.ratings.astype(float)) @ decision._weight_vector(weights)
+
+
+def test_keys_depend_on_everything_the_result_does():
+    weights = np.array([0.5, 0.5])
+    key = result_key('content', 'scores', weights)
+    assert key.startswith('content-scores-')
+    assert key == result_key('content', 'scores', weights.copy())
+    assert len({key, result_key('other', 'scores', weights), result_key('content', 'ranking', weights),
+                result_key('content', 'scores', weights[::-1]*[1, 2]), result_key('content', 'scores', weights, [0, 1]),
+                result_key('content', 'scores', weights, None, 3)}) == 6
+    ratings = np.zeros((2, 2), dtype=np.int8)
+    assert content_hash(ratings, ['x', 'y']) != content_hash(ratings, ['x', 'z'])
+
+
+def test_memory_tier_is_least_recently_used():
+    cache = ScoreCache(max_entries=2)
+    first = cache.put('k1', (np.arange(3),))
+    cache.put('k2', (np.arange(3),))
+    assert cache.get('k1') is first
+    cache.put('k3', (np.arange(3),))
+    assert cache.get('k2') is None and cache.get('k1') is first and cache.get('k3') is not None
+    assert cache.stats()['evictions'] == 1
+    with pytest.raises(ValueError):
+        first[0][0] = 1
+
+    # Results bigger than max_bytes are returned but not kept
+    small = ScoreCache(max_bytes=100)
+    small.put('big', (np.zeros(100),))
+    assert small.get('big') is None and small.nbytes == 0
+
+
+def test_decision_results_come_from_the_cache(decision_file):
+    decision = hmd.Decision.load(decision_file)
+    cache = decision.use_score_cache()
+    scores = decision.score_options(weights=WEIGHTS)
+    assert decision.score_options(weights=WEIGHTS) is scores
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_allclose(scores, expected_scores(decision))
+    np.testing.assert_allclose(decision.score_options(['o3', 'o1'], WEIGHTS), expected_scores(decision)[[3, 1]])
+    names, _ = decision.rank_options(weights=WEIGHTS)
+    assert [option for option, _ in decision.top_k(5, weights=WEIGHTS)] == list(names[:5])
+
+
+def test_disk_tier_survives_a_restart(decision_file, tmp_path):
+    directory = str(tmp_path / 'cache')
+    first = hmd.Decision.load(decision_file)
+    first.use_score_cache(directory=directory)
+    scores = first.score_options(weights=WEIGHTS)
+
+    again = hmd.Decision.load(decision_file)
+    cache = again.use_score_cache(directory=directory)
+    np.testing.assert_array_equal(again.score_options(weights=WEIGHTS), scores)
+    assert cache.stats()['disk_hits'] == 1 and cache.stats()['misses'] == 0
+
+
+def test_edits_drop_results_from_memory_and_keep_them_on_disk(decision_file, tmp_path):
+    directory = str(tmp_path / 'cache')
+    decision = hmd.Decision.load(decision_file)
+    cache = decision.use_score_cache(directory=directory)
+    decision.score_options(weights=WEIGHTS)
+    old = decision.content_hash()
+    decision.set_rating('o0', 'a', 10 - decision.store.ratings[0, 0])
+
+    assert not any(key.startswith(old) for key in cache._entries)
+    assert any(name.startswith(old) for name in os.listdir(directory))
+    # The edited decision never sees the old results
+    np.testing.assert_allclose(decision.score_options(weights=WEIGHTS), expected_scores(decision))
+
+    # The saved file still holds the old ratings, and their results are still on disk
+    original = hmd.Decision.load(decision_file)
+    reloaded = original.use_score_cache(directory=directory)
+    np.testing.assert_allclose(original.score_options(weights=WEIGHTS), expected_scores(original))
+    assert reloaded.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_deletes_the_least_recently_used_files(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = ScoreCache(directory=directory)
+    for i in range(5):
+        cache.put(f'k{i}', (np.zeros(100),))
+        os.utime(os.path.join(directory, f'k{i}.npz'), (1000 + i, 1000 + i))
+    size = os.path.getsize(os.path.join(directory, 'k0.npz'))
+    assert cache.disk_bytes == 5*size
+
+    # A disk hit makes k0 the most recently used file
+    restarted = ScoreCache(directory=directory, max_disk_bytes=3*size)
+    assert restarted.disk_bytes == 5*size
+    assert restarted.get('k0') is not None
+    restarted.put('k5', (np.zeros(100),))
+    assert sorted(os.listdir(directory)) == ['k0.npz', 'k4.npz', 'k5.npz']
+    assert restarted.stats()['disk_evictions'] == 3 and restarted.disk_bytes == 3*size
+
+
+def test_damaged_files_are_misses(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = ScoreCache(directory=directory)
+    cache.put('k', (np.arange(1000),))
+    path = os.path.join(directory, 'k.npz')
+    with open(path, 'rb') as f:
+        content = f.read()
+    with open(path, 'wb') as f:
+        f.write(content[:len(content)//2])
+    assert ScoreCache(directory=directory).get('k') is None
@@ -0,0 +1,61 @@
+"""
+Decisions between sub-decisions, re-aggregated one branch at a time, against scoring the whole tree again
+"""
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.scoring import aggregate_scores
+
+FEATURES = ['a', 'b', 'c']
+
+
+def make_tree(rng, n_groups=6, per_group=20, fan_out=3):
+    leaves = [hmd.Decision.from_ratings(FEATURES, [3, 2, 5], [f'g{g}-o{i}' for i in range(per_group)],
+                                        rng.integers(0, 11, (per_group, len(FEATURES))))
+              for g in range(n_groups)]
+    middles = [hmd.Decision.from_subdecisions({f'g{g}': leaves[g] for g in range(start, start + fan_out)},
+                                              aggregate='top_k_mean', k=3)
+               for start in range(0, n_groups, fan_out)]
+    top = hmd.Decision.from_subdecisions({f'm{m}': middle for m, middle in enumerate(middles)}, aggregate='mean')
+    return top, middles, leaves
+
+
+def rescored(top, middles, leaves):
+    # Every aggregate computed from scratch, straight from the leaves' ratings
+    def score(decision):
+        ratings = np.nan_to_num(decision.store.ratings.astype(float))
+        return ratings @ decision.store.percents
+
+    middle_scores = []
+    for middle in middles:
+        ratings = [aggregate_scores(score(middle.children[option]['decision']), 'top_k_mean', 3)
+                   for option in middle.store.options]
+        middle_scores.append(np.array(ratings))
+    return np.array([aggregate_scores(scores, 'mean') for scores in middle_scores])
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_leaf_edits_reach_the_top(seed):
+    rng = np.random.default_rng(seed)
+    top, middles, leaves = make_tree(rng)
+    np.testing.assert_allclose(top.score_options(), rescored(top, middles, leaves))
+    for _ in range(30):
+        leaf = leaves[rng.integers(len(leaves))]
+        option, feature = leaf.store.options[rng.integers(20)], FEATURES[rng.integers(len(FEATURES))]
+        if rng.random() < 0.2:
+            leaf.set_feature_weight(feature, int(rng.integers(1, 10)))
+        else:
+            leaf.set_rating(option, feature, float(rng.choice([rng.integers(0, 11), rng.uniform(0, 10)])))
+        np.testing.assert_allclose(top.score_options(), rescored(top, middles, leaves), rtol=1e-6)
+
+
+def test_restaurants_aggregate_their_best_item():
+    rng = np.random.default_rng(0)
+    menus = {name: hmd.Decision.from_ratings(FEATURES, [1, 1, 1], [f'{name}{i}' for i in range(5)],
+                                             rng.integers(0, 11, (5, 3)))
+             for name in ('diner', 'cafe')}
+    restaurants = hmd.Decision.from_subdecisions(menus)
+    for name, menu in menus.items():
+        assert restaurants.score_options([name])[0] == pytest.approx(menu.score_options().max())
+    with pytest.raises(ValueError):
+        menus['diner'].add_subdecision('loop', restaurants)
@@ -0,0 +1,62 @@
+"""
+Scores moved one edit at a time against scores recalculated from the rating matrix
+"""
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+
+FEATURES = ['a', 'b', 'c', 'd']
+
+
+def make_decision(rng, n_options=40):
+    return hmd.Decision.from_ratings(FEATURES, [3, 2, 5, 1], [f'o{i}' for i in range(n_options)],
+                                     rng.integers(0, 11, (n_options, len(FEATURES))).astype(np.int8))
+
+
+def recalculated(decision):
+    fresh = hmd.Decision.from_ratings(decision.store.features, decision.store.values, decision.store.options,
+                                      decision.store.ratings.astype(float), decision.total_importance)
+    return fresh.score_options()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_set_rating_and_weight_match_a_full_recalculation(seed):
+    rng = np.random.default_rng(seed)
+    decision = make_decision(rng)
+    decision.score_options()
+    for _ in range(60):
+        option, feature = f'o{rng.integers(40)}', FEATURES[rng.integers(len(FEATURES))]
+        if rng.random() < 0.2:
+            decision.set_feature_weight(feature, int(rng.integers(0, 10)))
+        else:
+            # Whole ratings, ratings the store rounds to float32, and missing ratings
+            rating = rng.choice([int(rng.integers(0, 11)), float(rng.uniform(0, 10)), np.nan])
+            decision.set_rating(option, feature, rating)
+        incremental = decision.point_scores.copy()
+        decision.update_scores()
+        np.testing.assert_array_equal(incremental, decision.point_scores)
+    np.testing.assert_allclose(decision.score_options(), recalculated(decision))
+
+
+def test_float_rating_moves_the_score_by_the_stored_value():
+    decision = make_decision(np.random.default_rng(0))
+    decision.score_options()
+    decision.set_rating('o1', 'a', 7.3)
+    decision.set_rating('o1', 'a', np.nan)
+    decision.set_rating('o1', 'a', 4)
+    incremental = decision.point_scores.copy()
+    decision.update_scores()
+    np.testing.assert_array_equal(incremental, decision.point_scores)
+    assert np.isfinite(incremental).all()
+
+
+def test_cached_results_follow_edits():
+    decision = make_decision(np.random.default_rng(1))
+    decision.use_score_cache()
+    weights = {'a': 0.5, 'c': 0.5}
+    decision.score_options(weights=weights)
+    decision.set_rating('o2', 'a', 10 - decision.store.ratings[2, 0])
+    expected = np.nan_to_num(decision.store.ratings.astype(float)) @ decision._weight_vector(weights)
+    np.testing.assert_allclose(decision.score_options(weights=weights), expected)
+    assert [option for option, _ in decision.top_k(3, weights=weights)] == \
+        [decision.store.options[row] for row in np.argsort(-expected, kind='stable')[:3]]
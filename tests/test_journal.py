@@ -0,0 +1,106 @@
+"""
+Decisions rebuilt from a snapshot and its journal against the decision that made the edits
+"""
+import builtins
+import os
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.journal import read_journal
+
+
+def state(decision):
+    store = decision.store
+    return (list(store.options), list(store.features), np.nan_to_num(np.asarray(store.ratings, dtype=float)).tolist(),
+            store.values.tolist(), store.percents.tolist(), store.weighted.tolist(), store.rated.tolist(),
+            list(decision.feature_list), list(decision.option_list))
+
+
+@pytest.fixture
+def decision():
+    rng = np.random.default_rng(0)
+    return hmd.Decision.from_ratings([f'f{i}' for i in range(5)], [1, 2, 3, 4, 5], [f'o{i}' for i in range(100)],
+                                     rng.integers(0, 11, (100, 5)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'decision.hmd')
+
+
+def test_replaying_the_journal_rebuilds_every_edit(decision, path, monkeypatch, capsys):
+    decision.start_journal(path, sync_every=8)
+    decision.set_rating('o3', 'f1', 7)
+    decision.set_rating('o4', 'f2', 2.5)
+    decision.set_rating('o5', 'f2', np.nan)
+    decision.set_feature_weight('f0', 4)
+    decision.append_options(['new1', 'new2'], [[1, 2, 3, 4, 5], [5, 4, 3, 2, 1]])
+    # The interactive edits, answering every question with 6
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': '6')
+    monkeypatch.setattr(hmd.time, 'sleep', lambda seconds: None)
+    decision.update_option_list('added')
+    decision.update_option_list('o10')
+    decision.update_feature_list('f9')
+    decision.update_feature_list('f1')
+    decision.set_rating('added', 'f9', 3)
+    decision.journal.sync()
+
+    ops = [entry['op'] for entry in read_journal(path + '.journal')]
+    assert {'set_rating', 'set_weight', 'append_options', 'add_option', 'remove_option', 'add_feature',
+            'set_feature_dict'} <= set(ops)
+    loaded = hmd.Decision.load(path)
+    assert state(loaded) == state(decision)
+    np.testing.assert_allclose(loaded.score_options(), decision.score_options())
+    decision.close_journal()
+
+
+def test_many_edits_replay_to_the_same_ratings(decision, path):
+    rng = np.random.default_rng(1)
+    decision.start_journal(path, sync_every=64)
+    for row, column, rating in zip(rng.integers(100, size=500), rng.integers(5, size=500), rng.integers(0, 11, size=500)):
+        decision.set_rating(f'o{row}', f'f{column}', int(rating))
+    decision.close_journal()
+    np.testing.assert_array_equal(hmd.Decision.load(path).store.ratings, decision.store.ratings)
+
+
+def test_a_torn_tail_is_cut_off(decision, path):
+    decision.start_journal(path)
+    decision.snapshot()
+    assert os.path.getsize(path + '.journal') == 0
+    decision.set_rating('o5', 'f3', 9)
+    decision.journal.sync()
+    with open(path + '.journal', 'ab') as f:
+        f.write(b'\x10\x00\x00\x00garbage')
+
+    reopened = hmd.Decision.open_journaled(path)
+    assert state(reopened) == state(decision)
+    reopened.set_rating('o6', 'f3', 1)
+    reopened.close_journal()
+    loaded = hmd.Decision.load(path)
+    assert loaded.store.ratings[6, 3] == 1 and loaded.store.ratings[5, 3] == 9
+    assert [entry['seq'] for entry in read_journal(path + '.journal')] == [1, 2]
+
+
+def test_snapshots_empty_the_journal_without_replaying_twice(decision, path):
+    decision.save(path)
+    journaled = hmd.Decision.open_journaled(path, snapshot_every=3)
+    for rating in range(7):
+        journaled.set_rating('o1', 'f0', rating)
+    journaled.journal.sync()
+    assert len(list(read_journal(path + '.journal'))) == journaled.journal.entries < 3
+    journaled.close_journal()
+    assert hmd.Decision.load(path).store.ratings[1, 0] == 6
+
+    # Normalizing rewrites every rating, so it snapshots instead of journaling
+    journaled = hmd.Decision.open_journaled(path)
+    journaled.normalize()
+    assert os.path.getsize(path + '.journal') == 0
+    journaled.close_journal()
+
+
+def test_saving_elsewhere_removes_a_stale_journal(decision, tmp_path):
+    other = str(tmp_path / 'other.hmd')
+    with open(other + '.journal', 'w') as f:
+        f.write('junk')
+    decision.save(other)
+    assert not os.path.exists(other + '.journal')
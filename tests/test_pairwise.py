@@ -0,0 +1,82 @@
+"""
+PairwiseMatrix counts against a comparison of every pair, one pair at a time
+"""
+import tracemalloc
+import numpy as np
+import pytest
+from decisionclass.pairwise import PairwiseMatrix, METRICS
+
+
+def brute_force(ratings, weights, scores):
+    n = len(ratings)
+    expected = {metric: np.zeros((n, n)) for metric in METRICS}
+    for i in range(n):
+        for j in range(n):
+            # Comparisons with NaN are False, so a missing rating neither wins, loses nor ties
+            greater, less = ratings[i] > ratings[j], ratings[i] < ratings[j]
+            expected['score_difference'][i, j] = scores[i] - scores[j]
+            expected['features_won'][i, j] = greater.sum()
+            expected['features_lost'][i, j] = less.sum()
+            expected['features_tied'][i, j] = (ratings[i] == ratings[j]).sum()
+            expected['margin'][i, j] = weights[greater].sum() - weights[less].sum()
+    return expected
+
+
+def random_case(rng):
+    n_options, n_features = rng.integers(1, 25), rng.integers(1, 6)
+    ratings = rng.integers(0, rng.integers(1, 11), size=(n_options, n_features)).astype(float)
+    ratings[rng.random(ratings.shape) < 0.2] = np.nan
+    weights = rng.dirichlet(np.ones(n_features))
+    return ratings, weights, rng.uniform(0, 10, n_options)
+
+
+# max_slots=0 compares one feature at a time, max_block_bytes=512 splits the rows and columns into many blocks
+@pytest.mark.parametrize('max_slots', [4096, 0])
+@pytest.mark.parametrize('max_block_bytes', [2**26, 512])
+def test_matrix_matches_brute_force(max_slots, max_block_bytes):
+    rng = np.random.default_rng(max_slots + max_block_bytes)
+    for _ in range(50):
+        ratings, weights, scores = random_case(rng)
+        pairwise = PairwiseMatrix(ratings, weights, scores, max_slots=max_slots, max_block_bytes=max_block_bytes)
+        matrix = pairwise.matrix()
+        expected = brute_force(ratings, weights, scores)
+        for metric in METRICS:
+            np.testing.assert_allclose(matrix[metric], expected[metric], atol=1e-5, err_msg=metric)
+
+
+@pytest.mark.parametrize('max_slots', [4096, 0])
+def test_against_beating_and_majority_wins(max_slots):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        ratings, weights, scores = random_case(rng)
+        pairwise = PairwiseMatrix(ratings, weights, scores, max_slots=max_slots, max_block_bytes=512)
+        expected = brute_force(ratings, weights, scores)
+        option = int(rng.integers(len(ratings)))
+        against = pairwise.against(option)
+        for metric in METRICS:
+            np.testing.assert_allclose(against[metric], expected[metric][:, option], atol=1e-5, err_msg=metric)
+
+        winners, comparison = pairwise.beating(option)
+        won = expected['features_won'][:, option]
+        assert set(winners) == set(np.flatnonzero(won > 0)) - {option}
+        assert (np.diff(comparison['features_won']) <= 0).all()
+        np.testing.assert_array_equal(pairwise.majority_wins(),
+                                      (expected['features_won'] > expected['features_lost']).sum(axis=1))
+
+
+def test_memory_stays_within_the_block_budget():
+    # 40 features of 100 distinct ratings each is 4000 slots: indicators of every option would be 320 MB
+    rng = np.random.default_rng(2)
+    ratings = rng.integers(0, 100, size=(20000, 40)).astype(float)
+    budget = 2**22
+    tracemalloc.start()
+    try:
+        pairwise = PairwiseMatrix(ratings, np.full(40, 1/40), max_block_bytes=budget)
+        block = pairwise.block(np.arange(10))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert pairwise.n_slots == 4000
+    assert block['features_won'].shape == (10, 20000)
+    # The float32 copy and rating codes of the options, plus the block's results and indicators
+    assert peak < 2*ratings.size*4 + 3*budget
@@ -0,0 +1,50 @@
+"""
+Pareto fronts against a comparison of every option with every other
+"""
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.pareto import pareto_front, _front_bnl, _unique_rows
+
+
+def brute_force(points):
+    # Every option against every other, with missing ratings the worst possible like pareto_front
+    points = np.where(np.isnan(points), -np.inf, points)
+    at_least = (points[:, None, :] >= points[None, :, :]).all(axis=2)
+    better = (points[:, None, :] > points[None, :, :]).any(axis=2)
+    return ~(at_least & better).any(axis=0)
+
+
+@pytest.mark.parametrize('n_features', [1, 2, 3, 4, 6])
+def test_front_matches_brute_force_with_missing_ratings(n_features):
+    # Few distinct ratings and many missing ones, so ties and -inf groups come up in every method,
+    # and a small block size makes the block-nested-loop carry its front across blocks
+    rng = np.random.default_rng(n_features)
+    for _ in range(100):
+        points = rng.integers(0, 4, (rng.integers(1, 60), n_features)).astype(float)
+        points[rng.random(points.shape) < 0.25] = np.nan
+        expected = brute_force(points)
+        np.testing.assert_array_equal(pareto_front(points), expected, err_msg=str(points))
+        unique, inverse = _unique_rows(np.where(np.isnan(points), -np.inf, points))
+        np.testing.assert_array_equal(_front_bnl(unique, block_size=7)[inverse], expected, err_msg=str(points))
+
+
+def test_undominated_option_missing_its_second_rating_stays_on_the_front():
+    points = np.array([[5, np.nan], [4, 3], [3, 4]])
+    assert pareto_front(points).tolist() == [True, True, True]
+
+
+def test_lower_is_better():
+    points = np.array([[100, 5], [200, 5], [150, 8]], dtype=float)
+    assert pareto_front(points, [True, False]).tolist() == [True, False, True]
+    assert pareto_front(points).tolist() == [False, True, True]
+
+
+def test_decision_pareto_front():
+    decision = hmd.Decision.from_ratings(['calories', 'taste'], [1, 1], ['a', 'b', 'c', 'd'],
+                                         [[1, 5], [2, 5], [1.5, 8], [1.5, 7]])
+    assert decision.pareto_front(lower_is_better=['calories']) == ['a', 'c']
+    assert decision.pareto_front(['taste']) == ['c']
+    assert decision.pareto_front(option_list=['b', 'a']) == ['b']
+    with pytest.raises(KeyError):
+        decision.pareto_front(['taste'], lower_is_better=['calories'])
@@ -0,0 +1,74 @@
+"""
+RatingStore edits keep the compact int8 ratings unless the new ratings need float32
+"""
+import tracemalloc
+import numpy as np
+import pytest
+from decisionclass.ratings import RatingStore, compact_ratings
+
+
+def make_store(n_options=5, n_features=3):
+    ratings = np.arange(n_options*n_features).reshape(n_options, n_features) % 11
+    return RatingStore.from_arrays([f'o{i}' for i in range(n_options)], [f'f{i}' for i in range(n_features)],
+                                   ratings, np.ones(n_features), np.full(n_features, 1/n_features))
+
+
+def test_whole_ratings_stay_int8():
+    store = make_store()
+    store.add_option('new', {'f0': 3, 'f1': 4, 'f2': 10})
+    store.append_options(['a', 'b'], [[1, 2, 3], [4, 5, 6]])
+    store.add_feature('f3', {option: 7 for option in store.options})
+    store.add_feature('f0', {option: 1 for option in store.options})
+    store.set_rating(0, 1, 9)
+    assert store.ratings.dtype == np.int8
+    assert store.ratings[5].tolist() == [1, 4, 10, 7]
+    assert store.ratings[:, 0].tolist() == [1]*8
+    assert store.ratings[0, 1] == 9
+
+
+@pytest.mark.parametrize('edit, changed', [
+    (lambda store: store.add_option('new', {'f0': 2.5, 'f1': 4, 'f2': 1}), (5, 0, 2.5)),
+    (lambda store: store.add_option('new', {'f0': 2}), (5, 1, np.nan)),
+    (lambda store: store.append_options(['a'], [[1, 200, 3]]), (5, 1, 200)),
+    (lambda store: store.add_feature('f3', {'o1': 5}), (0, 3, np.nan)),
+    (lambda store: store.add_feature('f1', {option: 0.5 for option in store.options}), (4, 1, 0.5)),
+    (lambda store: store.set_rating(0, 0, np.nan), (0, 0, np.nan)),
+    (lambda store: store.set_rating(0, 0, 7.25), (0, 0, 7.25)),
+])
+def test_ratings_that_do_not_fit_int8_switch_to_float32(edit, changed):
+    store = make_store()
+    before = store.ratings.astype(np.float32)
+    edit(store)
+    row, column, rating = changed
+    assert store.ratings.dtype == np.float32
+    np.testing.assert_array_equal(store.ratings[row, column], np.float32(rating))
+    # Ratings the edit did not touch are unchanged
+    untouched = np.ones(before.shape, dtype=bool)
+    untouched[:, column:column + 1] = False
+    np.testing.assert_array_equal(store.ratings[:5, :3][untouched], before[untouched])
+
+
+def test_edits_match_a_store_built_from_dictionaries():
+    store = make_store()
+    store.add_option('new', {'f0': 2.5, 'f2': 1})
+    store.add_feature('f3', {'o1': 5, 'new': 6})
+    store.remove_option('o2')
+    expected = RatingStore()
+    expected.set_option_dict(store.option_dict())
+    assert list(expected.options) == list(store.options)
+    for option, ratings in expected.option_dict().items():
+        assert ratings == store.option_dict()[option]
+    np.testing.assert_array_equal(compact_ratings(store.ratings), store.ratings)
+
+
+def test_adding_an_option_copies_the_compact_array_only():
+    store = make_store(1_000_000, 10)
+    tracemalloc.start()
+    try:
+        store.add_option('new', {f'f{i}': 1 for i in range(10)})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert store.ratings.dtype == np.int8
+    # One new int8 array, where a float64 copy would be 80 MB
+    assert peak < 2*store.ratings.nbytes
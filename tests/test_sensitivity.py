@@ -0,0 +1,80 @@
+"""
+Weight sensitivity counts and flips against sorting and trying every sample and transfer
+"""
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.sensitivity import rank_counts, sample_weights, smallest_flips
+
+
+def sorted_counts(ratings, weight_matrix, top_ranks):
+    # Every sample's scores sorted in full, earlier option first among ties
+    scores = weight_matrix @ np.nan_to_num(ratings).T
+    counts = np.zeros((len(ratings), min(top_ranks, len(ratings))), dtype=int)
+    for sample_scores in scores:
+        for place, option in enumerate(np.argsort(-sample_scores, kind='stable')[:top_ranks]):
+            counts[option, place] += 1
+    return counts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rank_counts_match_sorting_every_sample(seed):
+    # Few distinct ratings make ties common, and tiny blocks split the samples
+    rng = np.random.default_rng(seed)
+    for trial in range(10):
+        n_options, n_features = rng.integers(1, 60), rng.integers(1, 8)
+        ratings = rng.integers(0, 4, (n_options, n_features)).astype(np.float32)
+        if trial % 3 == 0:
+            ratings[rng.random(ratings.shape) < 0.2] = np.nan
+        weight_matrix = sample_weights(rng.random(n_features)*(rng.random(n_features) > 0.2), 200, 5, trial)
+        top_ranks = int(rng.integers(1, 6))
+        counts = rank_counts(ratings, weight_matrix, top_ranks, max_block_bytes=int(rng.integers(4, 5000)))
+        np.testing.assert_array_equal(counts, sorted_counts(ratings, weight_matrix, top_ranks))
+
+
+def test_ties_go_to_the_earlier_option():
+    ratings = np.array([[5, 5], [7, 7], [7, 7], [1, 1]], dtype=np.float32)
+    counts = rank_counts(ratings, sample_weights([0.5, 0.5], 100), 3)
+    assert counts[:, 0].tolist() == [0, 100, 0, 0]
+    assert counts[:, 1].tolist() == [0, 0, 100, 0]
+    assert counts[:, 2].tolist() == [100, 0, 0, 0]
+
+
+def test_smallest_flips_match_trying_every_transfer():
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        n_options, n_features = rng.integers(2, 20), rng.integers(2, 6)
+        ratings = rng.integers(0, 11, (n_options, n_features)).astype(float)
+        percents = rng.random(n_features)
+        percents /= percents.sum()
+        winner = int(np.argmax(ratings @ percents))
+        amount, source, target = smallest_flips(ratings, percents, winner)
+        assert np.isinf(amount[winner])
+        for option in range(n_options):
+            if option == winner:
+                continue
+            ahead = ratings[winner] - ratings[option]
+            lead = max(ahead @ percents, 0)
+            best = 0 if lead == 0 else np.inf
+            for f in range(n_features):
+                for g in range(n_features):
+                    gain = ahead[f] - ahead[g]
+                    if f != g and lead > 0 and gain > 0 and lead/gain <= percents[f]:
+                        best = min(best, lead/gain)
+            assert amount[option] == pytest.approx(best) or (np.isinf(best) and np.isinf(amount[option]))
+            if np.isfinite(amount[option]) and amount[option] > 0:
+                moved = percents.copy()
+                moved[source[option]] -= amount[option]
+                moved[target[option]] += amount[option]
+                assert ratings[option] @ moved >= ratings[winner] @ moved - 1e-9
+
+
+def test_weight_sensitivity():
+    rng = np.random.default_rng(0)
+    decision = hmd.Decision.from_ratings(['a', 'b', 'c'], [5, 3, 2], [f'o{i}' for i in range(30)],
+                                         rng.integers(0, 11, (30, 3)))
+    result = decision.weight_sensitivity(2000)
+    assert result['win_probability'].sum() == pytest.approx(1)
+    assert result['winner'] == next(decision.top_k(1))[0]
+    assert result['rank_counts'].sum(axis=0).tolist() == [2000]*result['rank_counts'].shape[1]
+    assert len(decision.weight_sensitivity(500, option_list=['o1', 'o2', 'o3'])['options']) == 3
@@ -0,0 +1,152 @@
+"""
+The decision service against a local server on an ephemeral port
+"""
+import asyncio
+import json
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass import service as service_module
+from decisionclass.service import DecisionService
+
+FEATURES = ['price', 'taste', 'health']
+WEIGHTS = {'price': 0.5, 'taste': 0.3, 'health': 0.2}
+
+
+def make_decision(ratings):
+    return hmd.Decision.from_ratings(FEATURES, [5, 3, 2], [f'option{i}' for i in range(len(ratings))], ratings)
+
+
+@pytest.fixture
+def ratings():
+    # Unrounded ratings, so no two options tie and the rank order is unique
+    return np.random.default_rng(0).uniform(0, 10, size=(60, len(FEATURES)))
+
+
+async def request(port, method, target, payload=None, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    if body is None:
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+                 f'Connection: close\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+def run(service, *requests):
+    # Starts the service on a free port and sends the requests concurrently
+    async def main():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(request(port, *arguments) for arguments in requests))
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        service.close()
+
+
+def assert_results(results, expected):
+    assert [option for option, _ in results] == [option for option, _ in expected]
+    np.testing.assert_allclose([score for _, score in results], [score for _, score in expected], rtol=1e-6)
+
+
+def test_score_top_k_and_what_if_match_the_decision(ratings):
+    decision = make_decision(ratings)
+    changed = ratings.copy()
+    changed[7, 1] = 10
+    changed[3, 0] = 0
+    (score_status, score), (top_status, top), (own_status, own), (what_if_status, what_if) = run(
+        DecisionService({'d': make_decision(ratings)}),
+        ('POST', '/decisions/d/score', {'options': ['option3', 'option7'], 'weights': WEIGHTS}),
+        ('POST', '/decisions/d/top_k', {'k': 5, 'weights': WEIGHTS}),
+        ('POST', '/decisions/d/top_k', {'k': 5}),
+        ('POST', '/decisions/d/what_if', {'k': 5, 'weights': WEIGHTS,
+                                          'ratings': {'option7': {'taste': 10}, 'option3': {'price': 0}}}))
+    assert (score_status, top_status, own_status, what_if_status) == (200, 200, 200, 200)
+    np.testing.assert_allclose([score['scores']['option3'], score['scores']['option7']],
+                               decision.score_options(['option3', 'option7'], WEIGHTS), rtol=1e-6)
+    assert_results(top['results'], list(decision.top_k(5, weights=WEIGHTS)))
+    assert_results(own['results'], list(decision.top_k(5)))
+    assert_results(what_if['results'], list(make_decision(changed).top_k(5, weights=WEIGHTS)))
+
+
+def test_what_if_leaves_the_decision_unchanged(ratings):
+    decision = make_decision(ratings)
+    before = decision.score_options().copy()
+    run(DecisionService({'d': decision}), ('POST', '/decisions/d/what_if', {'ratings': {'option1': {'taste': 0}}}))
+    np.testing.assert_array_equal(decision.score_options(), before)
+
+
+def test_bad_requests(ratings):
+    responses = run(
+        DecisionService({'d': make_decision(ratings)}),
+        ('POST', '/decisions/d/top_k', {'k': 'ten'}),
+        ('POST', '/decisions/d/top_k', {'k': 0}),
+        ('POST', '/decisions/d/top_k', {'kk': 3}),
+        ('POST', '/decisions/d/top_k', {'name': 'd'}),
+        ('POST', '/decisions/d/score', {'weights': {'colour': 1}}),
+        ('POST', '/decisions/d/score', {'options': ['nothing']}),
+        ('POST', '/decisions/d/what_if', {'ratings': {'option1': {'taste': 'high'}}}),
+        ('POST', '/decisions/d/what_if', {'ratings': ['option1']}),
+        ('POST', '/decisions/d/top_k', None, b'{not json'),
+        ('POST', '/decisions/d/top_k', [1, 2]))
+    for status, payload in responses:
+        assert status == 400, payload
+        assert 'error' in payload
+
+
+def test_missing_decisions_and_endpoints(ratings):
+    responses = run(DecisionService({'d': make_decision(ratings)}),
+                    ('POST', '/decisions/nope/top_k', {}),
+                    ('POST', '/decisions/d/best', {}),
+                    ('GET', '/nowhere'))
+    assert [status for status, _ in responses] == [404, 404, 404]
+
+
+def test_wrong_methods(ratings):
+    responses = run(DecisionService({'d': make_decision(ratings)}),
+                    ('GET', '/decisions/d/top_k'),
+                    ('POST', '/decisions'),
+                    ('DELETE', '/cache'))
+    assert [status for status, _ in responses] == [405, 405, 405]
+
+
+def test_server_errors_are_not_blamed_on_the_request(ratings, monkeypatch):
+    # A TypeError from inside the scoring code is a bug in the service, not a bad request
+    def broken(self, batch):
+        raise TypeError('bug in the scoring code')
+
+    monkeypatch.setattr(service_module._Batcher, '_compute', broken)
+    (status, payload), = run(DecisionService({'d': make_decision(ratings)}, cache_size=0),
+                             ('POST', '/decisions/d/top_k', {'k': 3}))
+    assert status == 500
+    assert 'bug in the scoring code' in payload['error']
+
+
+def test_concurrent_requests_share_one_batch(ratings, monkeypatch):
+    batches = []
+    compute = service_module._Batcher._compute
+
+    def counted(self, batch):
+        batches.append([kind for kind, _, _, _ in batch])
+        return compute(self, batch)
+
+    monkeypatch.setattr(service_module._Batcher, '_compute', counted)
+    decision = make_decision(ratings)
+    other = {'price': 0.1, 'taste': 0.1, 'health': 0.8}
+    (first_status, first), (second_status, second) = run(
+        DecisionService({'d': make_decision(ratings)}, batch_window=0.2, cache_size=0),
+        ('POST', '/decisions/d/top_k', {'k': 3, 'weights': WEIGHTS}),
+        ('POST', '/decisions/d/top_k', {'k': 4, 'weights': other}))
+    assert (first_status, second_status) == (200, 200)
+    assert batches == [['top_k', 'top_k']]
+    assert_results(first['results'], list(decision.top_k(3, weights=WEIGHTS)))
+    assert_results(second['results'], list(decision.top_k(4, weights=other)))
@@ -0,0 +1,71 @@
+"""
+Catalogs scored from disk against the same options scored in memory
+"""
+import numpy as np
+import pytest
+import decisionclass.decision_functions as hmd
+from decisionclass.normalize import FeatureScaler
+from decisionclass.streaming import score_file
+
+pd = pytest.importorskip('pandas')
+FEATURES = [f'f{i}' for i in range(4)]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    rng = np.random.default_rng(0)
+    raw = rng.normal(100, 30, size=(5000, len(FEATURES))).astype(np.float32)
+    raw[rng.random(raw.shape) < 0.01] = np.nan
+    frame = pd.DataFrame(raw, columns=FEATURES)
+    frame.insert(0, 'name', [f'option{i}' for i in range(len(raw))])
+    # Ratings out of 10 of a feature the decision only gets after it was normalized
+    frame['taste'] = rng.integers(0, 11, len(raw))
+    path = str(tmp_path / 'catalog.csv')
+    frame.to_csv(path, index=False)
+    return path, frame
+
+
+def normalized_decision(path):
+    decision = hmd.Decision.from_csv(path, 'name', FEATURES, normalize='minmax', lower_is_better=['f1'])
+    decision.feature_dict = {feature: {'value': i + 1, 'percent': (i + 1)/10} for i, feature in enumerate(FEATURES)}
+    return decision
+
+
+def assert_same_top(result, expected):
+    assert [option for option, _ in result['top_k']] == [option for option, _ in expected]
+    np.testing.assert_allclose([score for _, score in result['top_k']], [score for _, score in expected], atol=1e-5)
+
+
+def test_score_file_matches_the_decision(catalog):
+    path, _ = catalog
+    decision = normalized_decision(path)
+    result = decision.score_file(path, 'name', k=7, batch_size=512)
+    assert result['rows'] == 5000
+    assert_same_top(result, list(decision.top_k(7)))
+    scores = decision.score_options()
+    assert result['stats']['mean'] == pytest.approx(scores.mean())
+    assert result['stats']['std'] == pytest.approx(scores.std())
+
+    # Fitting the scaler in a first pass over the file gives the same ratings
+    weights = {feature: (i + 1)/10 for i, feature in enumerate(FEATURES)}
+    assert_same_top(score_file(path, 'name', weights, 7, normalize='minmax', lower_is_better=['f1'], batch_size=1000),
+                    list(decision.top_k(7)))
+
+
+def test_features_added_after_normalize_are_read_as_ratings(catalog):
+    path, frame = catalog
+    decision = normalized_decision(path)
+    for option, rating in zip(frame['name'], frame['taste']):
+        decision.set_rating(option, 'taste', int(rating))
+    decision.set_feature_weight('taste', 5)
+    assert 'taste' not in decision.scaler.features
+    assert_same_top(decision.score_file(path, 'name', k=7, batch_size=512), list(decision.top_k(7)))
+
+
+def test_select_names_features_the_scaler_was_not_fitted_on():
+    scaler = FeatureScaler(['a', 'b'], 'minmax', ['b']).fit(np.array([[0, 5], [10, 15]]))
+    assert scaler.select(['b', 'a']).features == ['b', 'a']
+    with pytest.raises(ValueError, match='taste'):
+        scaler.select(['a', 'taste'])
+    partial = scaler.select(['b', 'taste'], missing='none')
+    np.testing.assert_allclose(partial.transform([[5, 3], [15, 7]]), [[10, 3], [0, 7]])